@@ -6,18 +6,32 @@
     'author': "Lema Core Technologies",
     'website': "https://www.lemacore.com",
     'category': 'Project',
-    'version': '1.0',
+    'version': '1.1',
     'depends': ['base', 'project'],
     'data': [
         'security/res_groups.xml',
         'security/ir.model.access.csv',
+        'security/ir_rules.xml',
+
+        'data/ir_config_parameter_data.xml',
+        'data/ir_cron_data.xml',
 
         'wizard/res_users_git_credential_views.xml',
         'wizard/project_github_connect_repository_views.xml',
+        'wizard/project_github_file_browser_views.xml',
 
         'views/project_views.xml',
+        'views/project_github_repository_templates.xml',
         'views/project_github_repository_views.xml',
         'views/project_github_branch_views.xml',
+        'views/project_github_commit_views.xml',
+        'views/project_github_pull_request_views.xml',
+        'views/project_task_views.xml',
+        'views/project_github_rate_limit_views.xml',
+        'views/project_github_job_views.xml',
+        'views/project_github_webhook_delivery_views.xml',
+        'views/project_github_issue_outbox_views.xml',
+        'views/project_github_metric_views.xml',
         'views/res_config_settings_views.xml',
         'views/res_users_views.xml',
     ],
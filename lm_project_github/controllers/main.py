@@ -0,0 +1,61 @@
+import hmac
+import logging
+
+from odoo import http
+from odoo.http import request, Response
+
+from ..models.project_github_repository import WEBHOOK_EVENTS
+from ..models.project_github_webhook_delivery import verify_signature
+
+_logger = logging.getLogger(__name__)
+
+
+class GithubWebhookController(http.Controller):
+
+    @http.route('/lm_project_github/webhook/<int:repository_id>', type='http', auth='public',
+                methods=['POST'], csrf=False, save_session=False)
+    def github_webhook(self, repository_id, **kwargs):
+        """Receive a signed GitHub webhook delivery
+
+        The signature is checked against the raw body before anything is
+        parsed, the delivery is queued and applied by a cron so that GitHub
+        gets its answer well within its 10 seconds timeout.
+        """
+        headers = request.httprequest.headers
+        body = request.httprequest.get_data()
+        repository = request.env['project.github.repository'].sudo().browse(repository_id).exists()
+        if not repository or not verify_signature(
+                repository.webhook_secret, body, headers.get('X-Hub-Signature-256')):
+            _logger.warning(f"Rejected GitHub webhook delivery for repository {repository_id}: invalid signature")
+            return Response(status=401)
+
+        event = headers.get('X-GitHub-Event')
+        if event == 'ping':
+            return Response('pong', status=200)
+        if event not in WEBHOOK_EVENTS:
+            return Response(status=204)
+
+        # Redeliveries of an already received delivery are acknowledged as well
+        request.env['project.github.webhook.delivery'].sudo()._enqueue_delivery(
+            repository, event, headers.get('X-GitHub-Delivery'), body)
+        return Response(status=202)
+
+
+class GithubMetricsController(http.Controller):
+
+    @http.route('/lm_project_github/metrics', type='http', auth='public',
+                methods=['GET'], csrf=False, save_session=False)
+    def github_metrics(self, **kwargs):
+        """Expose the GitHub integration metrics in the Prometheus text format
+
+        The endpoint stays disabled until ``lm_project_github.metrics_token``
+        is set, scrapers then send it as a bearer token.
+        """
+        token = request.env['ir.config_parameter'].sudo().get_param('lm_project_github.metrics_token')
+        if not token:
+            return request.not_found()
+        authorization = request.httprequest.headers.get('Authorization') or ''
+        if not hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+            return Response(status=401, headers={'WWW-Authenticate': 'Bearer'})
+        body = request.env['project.github.metric'].sudo()._render_prometheus()
+        return Response(body, status=200, content_type='text/plain; version=0.0.4; charset=utf-8')
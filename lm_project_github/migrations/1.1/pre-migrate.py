@@ -0,0 +1,59 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Merge the repositories connected twice in a company before their unique constraint is added
+
+    The connection kept is the connected one, the most recent first. The
+    branches of the others are moved to it, unless it has a branch of the same
+    name, and every other reference to them is moved to it as well.
+    """
+    cr.execute("""
+        SELECT id, first_value(id) OVER (
+                   PARTITION BY repository_id, company_id
+                   ORDER BY is_connected IS TRUE DESC, id DESC
+               )
+          FROM project_github_repository
+         WHERE repository_id IS NOT NULL AND company_id IS NOT NULL
+    """)
+    duplicates = {duplicate_id: kept_id for duplicate_id, kept_id in cr.fetchall() if duplicate_id != kept_id}
+    if not duplicates:
+        return
+
+    for duplicate_id, kept_id in duplicates.items():
+        cr.execute("""
+            DELETE FROM project_github_branch branch
+             USING project_github_branch kept
+             WHERE branch.repository_id = %s
+               AND kept.repository_id = %s
+               AND kept.name = branch.name
+        """, [duplicate_id, kept_id])
+        cr.execute("UPDATE project_github_branch SET repository_id = %s WHERE repository_id = %s",
+                   [kept_id, duplicate_id])
+
+    # Every other column referencing a repository
+    cr.execute("""
+        SELECT source.relname, attribute.attname
+          FROM pg_constraint con
+          JOIN pg_class source ON source.oid = con.conrelid
+          JOIN pg_class target ON target.oid = con.confrelid
+          JOIN pg_attribute attribute ON attribute.attrelid = con.conrelid AND attribute.attnum = con.conkey[1]
+         WHERE con.contype = 'f'
+           AND target.relname = 'project_github_repository'
+           AND source.relname != 'project_github_branch'
+    """)
+    for table, column in cr.fetchall():
+        for duplicate_id, kept_id in duplicates.items():
+            cr.execute(f'UPDATE "{table}" SET "{column}" = %s WHERE "{column}" = %s', [kept_id, duplicate_id])
+    cr.execute("SELECT to_regclass('project_github_job')")
+    if cr.fetchone()[0]:
+        for duplicate_id, kept_id in duplicates.items():
+            cr.execute("""
+                UPDATE project_github_job SET res_id = %s
+                 WHERE res_model = 'project.github.repository' AND res_id = %s
+            """, [kept_id, duplicate_id])
+
+    cr.execute("DELETE FROM project_github_repository WHERE id IN %s", [tuple(duplicates)])
+    _logger.info(f"Merged {len(duplicates)} GitHub repositories connected twice in a company")
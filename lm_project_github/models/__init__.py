@@ -1,6 +1,20 @@
+from . import project_github_api
+from . import project_github_api_cache
+from . import project_github_rate_limit
+from . import project_github_metric
+from . import project_github_job
 
 from . import project_github_repository
+from . import project_github_repository_catalogue
+from . import project_github_mirror
+from . import project_github_object
+from . import project_github_ci_status
 from . import project_github_branch
+from . import project_github_commit
+from . import project_github_pull_request
+from . import project_github_issue_outbox
+from . import project_github_webhook_delivery
 from . import res_config_settings
 from . import project
+from . import project_task
 from . import res_users
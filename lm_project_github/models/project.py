@@ -1,6 +1,5 @@
 from odoo import fields, models, api, _
 from odoo.exceptions import UserError
-import requests
 from markupsafe import Markup
 
 
@@ -17,6 +16,11 @@ class Project(models.Model):
 
     # Commit management
     commit_prefix = fields.Char(string="Commit Prefix", help="Prefix to identify commits related to this project.")
+    github_commit_count = fields.Integer(string="Commit Count", compute="_compute_github_commit_count")
+    github_open_pull_request_count = fields.Integer(
+        string="Open Pull Requests",
+        compute="_compute_github_open_pull_request_count",
+    )
 
     # Branch management
     default_branch_id = fields.Many2one(
@@ -32,14 +36,52 @@ class Project(models.Model):
         help="Branches of the connected GitHub repository."
     )
 
+    github_job_id = fields.Many2one(
+        comodel_name="project.github.job",
+        string="Last Branch Synchronization",
+        compute="_compute_github_job_id",
+    )
+    github_job_state = fields.Selection(related="github_job_id.state", string="Synchronization State")
+    github_job_progress = fields.Float(related="github_job_id.progress", string="Synchronization Progress")
+
     # Webhook management
 
     # Issues management
     auto_create_issues = fields.Boolean(string="Auto-create Issues on Tasks Creation", default=False)
     auto_update_issues = fields.Boolean(string="Auto-update Issues on Tasks Update", default=False)
+    import_issues = fields.Boolean(
+        string="Import GitHub Issues as Tasks",
+        default=False,
+        help="Create and update tasks from the issues of the connected repository.",
+    )
     # create_issues_branch = fields.Boolean(string="Create Issues with New Branch on Tasks Creation", default=False)
     automation_workflow = fields.Boolean(string="Enable Automation Workflow", default=False)
 
+    @api.depends('repository_id')
+    def _compute_github_job_id(self):
+        """Read the last branch synchronisation of all the projects in one grouped query"""
+        Job = self.env['project.github.job'].sudo()
+        last_job_ids = dict(Job._read_group([
+            ('job_type', '=', 'sync_branches'),
+            ('res_model', '=', 'project.github.repository'),
+            ('res_id', 'in', self.repository_id.ids),
+        ], ['res_id'], ['id:max'])) if self.repository_id else {}
+        for project in self:
+            job_id = last_job_ids.get(project.repository_id.id)
+            project.github_job_id = Job.browse(job_id) if job_id else False
+
+    def _compute_github_commit_count(self):
+        counts = dict(self.env['project.github.commit']._read_group(
+            [('project_id', 'in', self.ids)], ['project_id'], ['__count']))
+        for project in self:
+            project.github_commit_count = counts.get(project, 0)
+
+    def _compute_github_open_pull_request_count(self):
+        counts = dict(self.env['project.github.pull_request']._read_group(
+            [('project_id', 'in', self.ids), ('state', 'in', ('open', 'draft'))], ['project_id'], ['__count']))
+        for project in self:
+            project.github_open_pull_request_count = counts.get(project, 0)
+
     @api.onchange('automation_workflow')
     def _onchange_automation_workflow(self):
         if not self.automation_workflow:
@@ -55,16 +97,6 @@ class Project(models.Model):
             if not project.auto_create_issues:
                 raise UserError(_("To enable 'Automation Workflow', 'Auto-create Issues on Tasks Creation' must be enabled."))
 
-    def _header_authentication(self):
-        token = self.env.user.git_token
-        if not token:
-            raise UserError(_("GitHub token not found in user settings. Please set it to proceed."))
-        return {
-            'Authorization': f'Bearer {token}',
-            'Accept': 'application/vnd.github.v3+json',
-            'Content-Type': 'application/json',
-        }
-
     def action_connect_repository(self):
         action = self.env.ref('lm_project_github.action_project_github_connect_repository').read()[0]
         action['context'] = {'default_project_id': self.id, 'default_github_username': self.env.user.git_username}
@@ -86,56 +118,114 @@ class Project(models.Model):
         if not self.repository_id:
             raise UserError(_("No repository linked to revoke."))
         repo_name = self.repository_id.full_name
-        headers = self._header_authentication()
-        base_url = f'https://api.github.com/repos/{repo_name}'
-
-        try:
-            response = requests.delete(f'{base_url}/hooks', headers=headers)
-            if response.status_code not in [204, 404]:
-                raise UserError(_("Failed to delete webhooks on GitHub."))
-            self.repository_id.unlink()
-            self.enable_github = False
-            self.is_connected_github = False
-            self.github_url = False
-            self.message_post(body=_("Disconnected from GitHub repository %s." % repo_name))
-        except requests.RequestException as e:
-            raise UserError(_("Error during disconnection: %s" % str(e)))
+
+        # The webhook is deleted on GitHub in the background
+        if self.repository_id.webhook_id:
+            self.env['project.github.job']._enqueue(
+                'delete_webhooks', payload={'full_name': repo_name, 'hook_id': self.repository_id.webhook_id},
+                name=_("Delete webhooks of %s", repo_name),
+            )
+        self.repository_id.unlink()
+        self.enable_github = False
+        self.is_connected_github = False
+        self.github_url = False
+        self.message_post(body=_("Disconnected from GitHub repository %s." % repo_name))
 
     def action_sync_branches(self):
         self.ensure_one()
         if not self.is_connected_github:
             raise UserError(_("Repository is not connected. Please connect the repository first."))
 
-        base_url = self.env.company.github_instance_url or 'https://api.github.com'
+        job = self.env['project.github.job']._enqueue(
+            'sync_branches', self.repository_id,
+            name=_("Synchronize branches of %s", self.repository_id.full_name),
+        )
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': job.name,
+                'message': _("Branch synchronization queued, you will be notified when it is done."),
+                'type': 'info',
+                'sticky': False,
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            },
+        }
 
-        try:
-            response = requests.get(
-                f'{base_url}/repos/{self.repository_id.full_name}/branches',
-                headers=self._header_authentication(),
-                timeout=10
-            )
-            if response.status_code == 200:
-                branches = response.json()
-                existing_branch_names = self.branch_ids.mapped('name')
-                new_branches = []
-                for branch in branches:
-                    if branch['name'] not in existing_branch_names:
-                        new_branch = self.env['project.github.branch'].create({
-                            'name': branch['name'],
-                            'project_id': self.id,
-                            'repository_id': self.repository_id.id,
-                        })
-                        new_branches.append(new_branch)
-                if new_branches:
-                    self.branch_ids = [(4, b.id) for b in new_branches]
-                    self.message_post(
-                        body=_("Synchronized branches successfully. Added %d new branches." % len(new_branches)))
-                else:
-                    raise UserError(_("No new branches found to synchronize."))
-            else:
-                raise UserError(_("Failed to fetch branches from GitHub. Status Code: %s" % response.status_code))
-        except requests.RequestException as e:
-            raise UserError(_("An error occurred while connecting to GitHub: %s" % str(e)))
+    def action_sync_commits(self):
+        self.ensure_one()
+        if not self.is_connected_github:
+            raise UserError(_("Repository is not connected. Please connect the repository first."))
+
+        job = self.env['project.github.job']._enqueue(
+            'sync_commits', self.repository_id,
+            name=_("Synchronize commits of %s", self.repository_id.full_name),
+        )
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': job.name,
+                'message': _("Commit synchronization queued, you will be notified when it is done."),
+                'type': 'info',
+                'sticky': False,
+            },
+        }
+
+    def action_import_issues(self):
+        self.ensure_one()
+        if not self.is_connected_github:
+            raise UserError(_("Repository is not connected. Please connect the repository first."))
+
+        job = self.env['project.github.job']._enqueue(
+            'import_issues', self.repository_id,
+            name=_("Import issues of %s", self.repository_id.full_name),
+        )
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': job.name,
+                'message': _("Issue import queued, you will be notified when it is done."),
+                'type': 'info',
+                'sticky': False,
+            },
+        }
+
+    def action_view_commits(self):
+        self.ensure_one()
+        action = self.env['ir.actions.act_window']._for_xml_id('lm_project_github.project_github_commit_act_window')
+        action['domain'] = [('project_id', '=', self.id)]
+        action['context'] = {'default_project_id': self.id}
+        return action
+
+    def action_view_pull_requests(self):
+        self.ensure_one()
+        action = self.env['ir.actions.act_window']._for_xml_id(
+            'lm_project_github.project_github_pull_request_act_window')
+        action['domain'] = [('project_id', '=', self.id)]
+        action['context'] = {'search_default_open': 1}
+        return action
+
+    def action_sync_pull_requests(self):
+        self.ensure_one()
+        if not self.is_connected_github:
+            raise UserError(_("Repository is not connected. Please connect the repository first."))
+
+        job = self.env['project.github.job']._enqueue(
+            'sync_pull_requests', self.repository_id,
+            name=_("Synchronize pull requests of %s", self.repository_id.full_name),
+        )
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': job.name,
+                'message': _("Pull request synchronization queued, you will be notified when it is done."),
+                'type': 'info',
+                'sticky': False,
+            },
+        }
 
     def _get_log_message_template(self):
         """Return HTML template for log message."""
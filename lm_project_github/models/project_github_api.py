@@ -0,0 +1,492 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+from .project_github_metric import record_cache, record_request
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = 'https://api.github.com'
+DEFAULT_TIMEOUT = 30
+
+# Connection pool sizing of every pooled session
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+MAX_SESSIONS = 64
+
+# Retries of server errors and secondary rate limits (jittered exponential back-off)
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+MAX_RETRY_DELAY = 30
+# High priority calls wait for a rate limit that lifts within this delay (seconds)
+MAX_BUDGET_WAIT = 10
+# Share of the hourly budget that low priority calls (background syncs) leave untouched
+LOW_PRIORITY_RESERVE = 0.2
+
+# Paginated listings: page cap and number of concurrent page fetches
+DEFAULT_MAX_PAGES = 50
+DEFAULT_MAX_WORKERS = 8
+
+# Sessions are kept per worker process and per token. The pid is part of the
+# key so that a forked worker never reuses sockets inherited from its parent.
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def token_digest(token):
+    """Return a stable, non reversible key for a GitHub token"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_github_datetime(value):
+    """Return the naive UTC datetime of a GitHub ISO-8601 timestamp"""
+    if not value:
+        return False
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class GithubRateLimitError(UserError):
+    """The GitHub rate limit budget of a token is exhausted or reserved"""
+
+    def __init__(self, message, retry_at=None):
+        super().__init__(message)
+        self.retry_at = retry_at
+
+
+def remaining_budget(response):
+    """Return the remaining calls advertised by a response (infinite when unknown)"""
+    remaining = response.headers.get('X-RateLimit-Remaining') or ''
+    return int(remaining) if remaining.isdigit() else float('inf')
+
+
+def is_primary_rate_limit(response):
+    """Return whether a response was rejected because the hourly budget is spent"""
+    return response.status_code in (403, 429) and response.headers.get('X-RateLimit-Remaining') == '0'
+
+
+def is_secondary_rate_limit(response):
+    """Return whether a response was rejected by a secondary (abuse) rate limit"""
+    if response.status_code not in (403, 429) or is_primary_rate_limit(response):
+        return False
+    if response.headers.get('Retry-After'):
+        return True
+    try:
+        message = response.json().get('message') or ''
+    except (ValueError, AttributeError):
+        message = ''
+    return 'secondary rate limit' in message.lower()
+
+
+def retry_delay(method, response, attempt):
+    """Return the seconds to wait before retrying a response, or None if it must not be retried"""
+    # A POST failing with a server error may still have been applied, it is not retried
+    if not (is_secondary_rate_limit(response) or (response.status_code >= 500 and method != 'POST')):
+        return None
+    retry_after = response.headers.get('Retry-After')
+    if retry_after and retry_after.isdigit():
+        delay = int(retry_after)
+    else:
+        # Full jitter: spreads the retries of concurrent workers
+        delay = random.uniform(0, BACKOFF_BASE * 2 ** attempt)
+    return delay if delay <= MAX_RETRY_DELAY else None
+
+
+def send_with_retry(session, method, url, observe=None, **kwargs):
+    """Send a request, retrying server errors and secondary rate limits
+
+    Only uses the session, so it is safe to call from worker threads.
+    ``observe`` is called with the method, URL, status, duration and retry
+    flag of every attempt.
+    """
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except requests.RequestException:
+            if observe:
+                observe(method, url, 'error', time.perf_counter() - start, attempt > 0)
+            raise
+        if observe:
+            observe(method, url, response.status_code, time.perf_counter() - start, attempt > 0)
+        delay = retry_delay(method, response, attempt) if attempt < MAX_RETRIES else None
+        if delay is None:
+            return response
+        _logger.info(f"GitHub API {method} {url} answered {response.status_code}, retrying in {delay:.1f}s")
+        time.sleep(delay)
+        attempt += 1
+
+
+class ProjectGithubApi(models.AbstractModel):
+    _name = 'project.github.api'
+    _description = 'GitHub API Client'
+
+    @api.model
+    def _get_base_url(self):
+        """Return the GitHub API base URL configured on the current company"""
+        return (self.env.company.github_instance_url or DEFAULT_API_URL).rstrip('/')
+
+    @api.model
+    def _get_token(self, user=None):
+        """Return the GitHub token of the given user (current user by default)"""
+        token = (user or self.env.user).git_token
+        if not token:
+            raise UserError(_('GitHub token is not configured. Please set up your GitHub token in user preferences.'))
+        return token
+
+    @api.model
+    def _get_session(self, token):
+        """Return the pooled keep-alive session of this worker for the given token"""
+        key = (os.getpid(), token_digest(token))
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is not None:
+                _sessions.move_to_end(key)
+                return session
+
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=POOL_MAXSIZE,
+                max_retries=0,
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({
+                'Authorization': f'Bearer {token}',
+                'Accept': 'application/vnd.github.v3+json',
+                'Accept-Encoding': 'gzip, deflate',
+                'Connection': 'keep-alive',
+                'User-Agent': 'Odoo-lm_project_github',
+            })
+            _sessions[key] = session
+
+            # Drop the least recently used sessions (revoked or rotated tokens)
+            while len(_sessions) > MAX_SESSIONS:
+                _key, stale = _sessions.popitem(last=False)
+                stale.close()
+        return session
+
+    @api.model
+    def _get_url(self, path):
+        """Return the absolute URL of an API path"""
+        if path.startswith(('http://', 'https://')):
+            return path
+        return f"{self._get_base_url()}/{path.lstrip('/')}"
+
+    @api.model
+    def _is_low_priority(self):
+        """Background callers flag their calls with the ``github_priority`` context key"""
+        return self.env.context.get('github_priority') == 'low'
+
+    @api.model
+    def _check_budget(self, token, cost=1, resource='core'):
+        """Wait for or refuse a call that the rate limit budget of the token cannot afford
+
+        High priority calls wait for a limit lifting within MAX_BUDGET_WAIT
+        seconds. Low priority calls also keep a reserve of the hourly budget
+        for interactive use and are refused (to be retried later) as soon as
+        the budget drains into it.
+        """
+        budget = self.env['project.github.rate.limit']._get_budget(token, resource)
+        if not budget:
+            return
+        now = fields.Datetime.now()
+        retry_at = None
+        if budget['blocked_until'] and budget['blocked_until'] > now:
+            retry_at = budget['blocked_until']
+        elif budget['reset_at'] and budget['reset_at'] > now and budget['remaining'] is not None:
+            reserve = int((budget['limit'] or 0) * LOW_PRIORITY_RESERVE) if self._is_low_priority() else 0
+            if budget['remaining'] - cost < reserve:
+                retry_at = budget['reset_at']
+        if not retry_at:
+            return
+        wait = (retry_at - now).total_seconds()
+        if not self._is_low_priority() and wait <= MAX_BUDGET_WAIT:
+            time.sleep(wait)
+            return
+        raise GithubRateLimitError(
+            _('GitHub API rate limit budget exhausted, retry after %s UTC.') % retry_at.strftime('%H:%M:%S'),
+            retry_at=retry_at,
+        )
+
+    @api.model
+    def _record_rate_limit(self, token, response):
+        """Account the budget advertised by a response in the shared storage"""
+        user = self.env.user if self.env.user.git_token == token else None
+        self.env['project.github.rate.limit']._record(token, response, user=user)
+
+    @api.model
+    def _get_observer(self):
+        """Return the callback accounting the responses in the metrics of this database"""
+        return functools.partial(record_request, self.env.cr.dbname)
+
+    @api.model
+    def _request(self, method, path, token=None, params=None, json=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+        """Send a request to the GitHub API through the pooled session
+
+        The call is scheduled against the rate limit budget of the token,
+        server errors and secondary rate limits are retried with jittered
+        exponential back-off, and the budget advertised by the response is
+        recorded for all workers.
+        """
+        token = token or self._get_token()
+        url = self._get_url(path)
+        self._check_budget(token, resource='graphql' if url == self._get_graphql_url() else 'core')
+        try:
+            response = send_with_retry(
+                self._get_session(token), method, url, observe=self._get_observer(),
+                params=params, json=json, timeout=timeout, **kwargs
+            )
+        except requests.RequestException as e:
+            _logger.error(f"Error calling GitHub API {method} {url}: {e}")
+            raise UserError(_('Failed to connect to GitHub: %s') % str(e))
+        self._record_rate_limit(token, response)
+        self.env['project.github.metric']._flush()
+        return response
+
+    @api.model
+    def _check_response(self, response, not_found_message=None):
+        """Raise a UserError describing a failed GitHub API response"""
+        if response.ok:
+            return response
+        if response.status_code == 401:
+            raise UserError(_('GitHub authentication failed. Please check your token.'))
+        if is_primary_rate_limit(response):
+            reset = response.headers.get('X-RateLimit-Reset')
+            retry_at = datetime.utcfromtimestamp(int(reset)) if reset and reset.isdigit() else None
+            raise GithubRateLimitError(
+                _('GitHub API rate limit exceeded, it resets at %s UTC.') % (
+                    retry_at.strftime('%H:%M:%S') if retry_at else '?'),
+                retry_at=retry_at,
+            )
+        if is_secondary_rate_limit(response):
+            retry_after = response.headers.get('Retry-After')
+            retry_at = fields.Datetime.now() + timedelta(seconds=int(retry_after)) \
+                if retry_after and retry_after.isdigit() else None
+            raise GithubRateLimitError(
+                _('GitHub secondary rate limit hit. Please slow down and try again in a minute.'),
+                retry_at=retry_at,
+            )
+        if response.status_code in (403, 404):
+            message = ''
+            try:
+                message = response.json().get('message') or ''
+            except ValueError:
+                pass
+            if response.status_code == 403:
+                raise UserError(_('GitHub denied access: %s. Please check your token permissions.') % message)
+            raise UserError(not_found_message or _('GitHub resource not found. Please check your token permissions.'))
+        raise UserError(_('GitHub API error: %s') % response.text)
+
+    @api.model
+    def _prepare_get(self, url, token, params=None, use_cache=True, headers=None):
+        """Return the cache key, cached entry and conditional headers of a GET"""
+        cache = self.env['project.github.api.cache']
+        key = cache._make_key(token, url, params) if use_cache else None
+        entry = cache._lookup(key) if key else None
+
+        headers = dict(headers or {})
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        elif entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return key, entry, headers
+
+    @api.model
+    def _finish_get(self, url, key, entry, response, not_found_message=None):
+        """Return the payload and headers of a GET response, updating the cache"""
+        cache = self.env['project.github.api.cache']
+        if key:
+            record_cache(self.env.cr.dbname, url, hit=response.status_code == 304 and bool(entry))
+        if response.status_code == 304 and entry:
+            cache._touch(key)
+            cached_headers = CaseInsensitiveDict(response.headers)
+            if entry['link']:
+                cached_headers['Link'] = entry['link']
+            return json.loads(entry['body']), cached_headers
+
+        self._check_response(response, not_found_message=not_found_message)
+        if key and (response.headers.get('ETag') or response.headers.get('Last-Modified')):
+            cache._store(key, url, response)
+        return response.json(), response.headers
+
+    @api.model
+    def _get_json(self, path, token=None, params=None, use_cache=True, not_found_message=None, **kwargs):
+        """GET a JSON resource, revalidating the shared response cache
+
+        Returns the decoded payload and the response headers. A cached entry is
+        revalidated with If-None-Match / If-Modified-Since: a 304 is served
+        from the cache and is not counted against the GitHub rate limit.
+        """
+        token = token or self._get_token()
+        url = self._get_url(path)
+        key, entry, headers = self._prepare_get(
+            url, token, params=params, use_cache=use_cache, headers=kwargs.pop('headers', None))
+        response = self._request('GET', url, token=token, params=params, headers=headers, **kwargs)
+        return self._finish_get(url, key, entry, response, not_found_message=not_found_message)
+
+    @api.model
+    def _get_last_page(self, headers):
+        """Return the last page number advertised by a Link header"""
+        for link in requests.utils.parse_header_links(headers.get('Link') or ''):
+            if link.get('rel') == 'last':
+                page = parse_qs(urlparse(link['url']).query).get('page')
+                if page and page[0].isdigit():
+                    return int(page[0])
+        return 1
+
+    @api.model
+    def _get_json_pages(self, path, token=None, params=None, max_pages=None, not_found_message=None,
+                        timeout=DEFAULT_TIMEOUT):
+        """GET every page of a paginated collection
+
+        The first page is fetched alone to read the ``rel="last"`` Link header,
+        the remaining pages are then fetched concurrently on the pooled session.
+        Cache lookups and writes stay in the calling thread since the ORM
+        cursor must not be shared. Returns the items and whether the listing
+        was truncated by ``max_pages``.
+        """
+        token = token or self._get_token()
+        url = self._get_url(path)
+        ICP = self.env['ir.config_parameter'].sudo()
+        if not max_pages:
+            max_pages = int(ICP.get_param('lm_project_github.fetch_max_pages', DEFAULT_MAX_PAGES))
+        max_workers = int(ICP.get_param('lm_project_github.fetch_max_workers', DEFAULT_MAX_WORKERS))
+        params = dict(params or {}, per_page=(params or {}).get('per_page', 100), page=1)
+
+        items, headers = self._get_json(
+            url, token=token, params=params, not_found_message=not_found_message, timeout=timeout)
+        items = list(items)
+        last_page = self._get_last_page(headers)
+        page_count = min(last_page, max_pages)
+        if page_count < 2:
+            return items, last_page > max_pages
+
+        prepared = []
+        for page in range(2, page_count + 1):
+            page_params = dict(params, page=page)
+            key, entry, page_headers = self._prepare_get(url, token, params=page_params)
+            prepared.append((page_params, key, entry, page_headers))
+
+        self._check_budget(token, cost=len(prepared))
+        session = self._get_session(token)
+        observe = self._get_observer()
+
+        def send(item):
+            page_params, _key, _entry, page_headers = item
+            return send_with_retry(
+                session, 'GET', url, observe=observe, params=page_params, headers=page_headers, timeout=timeout)
+
+        _logger.info(f"Fetching {len(prepared)} more pages from GitHub API: {url}")
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, POOL_MAXSIZE, len(prepared)))) as executor:
+                responses = list(executor.map(send, prepared))
+        except requests.RequestException as e:
+            _logger.error(f"Error calling GitHub API GET {url}: {e}")
+            raise UserError(_('Failed to connect to GitHub: %s') % str(e))
+
+        # One budget update for the whole batch, from the most recent response
+        self._record_rate_limit(token, min(responses, key=remaining_budget))
+        for (_params, key, entry, _headers), response in zip(prepared, responses):
+            page_items, _page_headers = self._finish_get(
+                url, key, entry, response, not_found_message=not_found_message)
+            items.extend(page_items)
+        self.env['project.github.metric']._flush()
+        return items, last_page > max_pages
+
+    @api.model
+    def _has_next_page(self, headers):
+        """Return whether a Link header advertises a next page"""
+        links = requests.utils.parse_header_links(headers.get('Link') or '')
+        return any(link.get('rel') == 'next' for link in links)
+
+    @api.model
+    def _iter_json_pages(self, path, token=None, params=None, max_pages=None, use_cache=False,
+                         not_found_message=None, first_page=1):
+        """Yield the pages of a paginated collection one at a time
+
+        Unlike ``_get_json_pages`` the pages are requested sequentially, the
+        next one only once the caller consumed the previous one, so that long
+        listings are processed in bounded memory. ``max_pages`` pages are read
+        from ``first_page``.
+        """
+        token = token or self._get_token()
+        url = self._get_url(path)
+        params = dict(params or {}, per_page=(params or {}).get('per_page', 100))
+        for page in range(first_page, first_page + (max_pages or DEFAULT_MAX_PAGES)):
+            items, headers = self._get_json(
+                url, token=token, params=dict(params, page=page), use_cache=use_cache,
+                not_found_message=not_found_message)
+            if items:
+                yield items
+            if not items or not self._has_next_page(headers):
+                return
+
+    @api.model
+    def _get_graphql_url(self):
+        """Return the GraphQL endpoint matching the configured REST base URL"""
+        base_url = self._get_base_url()
+        # GitHub Enterprise Server serves REST on /api/v3 and GraphQL on /api/graphql
+        if base_url.endswith('/api/v3'):
+            return base_url[:-len('v3')] + 'graphql'
+        return f'{base_url}/graphql'
+
+    @api.model
+    def _use_graphql(self):
+        """Return whether bulk metadata should be fetched through GraphQL"""
+        return self.env.company.github_use_graphql
+
+    @api.model
+    def _graphql(self, query, variables=None, token=None, partial=False):
+        """Run a GraphQL query and return its ``data``
+
+        With ``partial``, errors on some of the requested nodes (deleted or
+        inaccessible repositories) are tolerated as long as data came back.
+        """
+        response = self._request(
+            'POST', self._get_graphql_url(), token=token,
+            json={'query': query, 'variables': variables or {}},
+        )
+        self._check_response(response)
+        payload = response.json()
+        if payload.get('errors') and not (partial and payload.get('data')):
+            messages = '; '.join(error.get('message', '') for error in payload['errors'])
+            raise UserError(_('GitHub GraphQL error: %s') % messages)
+        return payload.get('data') or {}
+
+    @api.model
+    def _get(self, path, **kwargs):
+        return self._request('GET', path, **kwargs)
+
+    @api.model
+    def _post(self, path, **kwargs):
+        return self._request('POST', path, **kwargs)
+
+    @api.model
+    def _patch(self, path, **kwargs):
+        return self._request('PATCH', path, **kwargs)
+
+    @api.model
+    def _delete(self, path, **kwargs):
+        return self._request('DELETE', path, **kwargs)
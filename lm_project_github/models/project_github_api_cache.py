@@ -0,0 +1,122 @@
+import hashlib
+import json
+import logging
+
+import psycopg2
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+from .project_github_api import token_digest
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_MAX_SIZE = 64  # MB
+
+
+class ProjectGithubApiCache(models.Model):
+    _name = 'project.github.api.cache'
+    _description = 'GitHub API Response Cache'
+    _order = 'last_used desc'
+    _log_access = False
+
+    key = fields.Char(string='Key', required=True, readonly=True)
+    url = fields.Char(string='URL', readonly=True)
+    etag = fields.Char(string='ETag', readonly=True)
+    last_modified = fields.Char(string='Last Modified', readonly=True)
+    link = fields.Char(string='Link Header', readonly=True)
+    body = fields.Text(string='Body', readonly=True)
+    size = fields.Integer(string='Size (bytes)', readonly=True)
+    last_used = fields.Datetime(string='Last Used', readonly=True, index=True)
+
+    _sql_constraints = [
+        ('unique_key', 'unique(key)', 'A cache entry with this key already exists.'),
+    ]
+
+    @api.model
+    def _make_key(self, token, url, params=None):
+        """Return the cache key of a request: (token hash, URL, params)"""
+        params = sorted((str(k), str(v)) for k, v in (params or {}).items())
+        raw = json.dumps([token_digest(token), url, params])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @api.model
+    def _lookup(self, key):
+        """Return the cached entry of a key as a dict, or None"""
+        self.env.cr.execute(SQL(
+            "SELECT etag, last_modified, link, body FROM %s WHERE key = %s",
+            SQL.identifier(self._table), key,
+        ))
+        return self.env.cr.dictfetchone()
+
+    @api.model
+    def _store(self, key, url, response):
+        """Insert or refresh the cached response of a key"""
+        body = response.text
+        self._execute_detached(SQL(
+            """
+            INSERT INTO %(table)s (key, url, etag, last_modified, link, body, size, last_used)
+            VALUES (%(key)s, %(url)s, %(etag)s, %(last_modified)s, %(link)s, %(body)s, %(size)s, now() at time zone 'UTC')
+            ON CONFLICT (key) DO UPDATE
+               SET url = EXCLUDED.url,
+                   etag = EXCLUDED.etag,
+                   last_modified = EXCLUDED.last_modified,
+                   link = EXCLUDED.link,
+                   body = EXCLUDED.body,
+                   size = EXCLUDED.size,
+                   last_used = EXCLUDED.last_used
+            """,
+            table=SQL.identifier(self._table),
+            key=key,
+            url=url,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            link=response.headers.get('Link'),
+            body=body,
+            size=len(body.encode()),
+        ))
+
+    @api.model
+    def _touch(self, key):
+        """Mark a cached entry as recently used"""
+        self._execute_detached(SQL(
+            "UPDATE %s SET last_used = now() at time zone 'UTC' WHERE key = %s",
+            SQL.identifier(self._table), key,
+        ))
+
+    @api.model
+    def _execute_detached(self, query):
+        """Run a cache write in its own short transaction
+
+        The cache is shared by all workers: writing it from the caller's
+        transaction would hold row locks until the end of the request and turn
+        concurrent refreshes of the same key into serialization failures.
+        """
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute(query)
+        except psycopg2.Error as e:
+            # The cache is best effort, a lost write only costs a refetch
+            _logger.debug(f"GitHub API cache write skipped: {e}")
+
+    @api.model
+    def _gc_cache(self):
+        """Evict the least recently used entries beyond the configured size cap"""
+        max_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            'lm_project_github.api_cache_max_size', DEFAULT_CACHE_MAX_SIZE))
+        self.env.cr.execute(SQL(
+            """
+            DELETE FROM %(table)s
+             WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, SUM(size) OVER (ORDER BY last_used DESC, id DESC) AS total
+                      FROM %(table)s
+                ) ranked
+                WHERE ranked.total > %(max_size)s
+             )
+            """,
+            table=SQL.identifier(self._table),
+            max_size=max_size * 1024 * 1024,
+        ))
+        if self.env.cr.rowcount:
+            _logger.info(f"Evicted {self.env.cr.rowcount} GitHub API cache entries")
@@ -1,6 +1,9 @@
 from odoo import fields, models, api
+from odoo.tools import SQL
 from random import randint
 
+from .project_github_ci_status import CI_STATES
+
 
 class ProjectGithubBranch(models.Model):
     _name = 'project.github.branch'
@@ -26,6 +29,7 @@ class ProjectGithubBranch(models.Model):
     project_id = fields.Many2one(
         'project.project',
         string='Project',
+        index='btree_not_null',
         help='Project associated with this branch',
     )
     is_default = fields.Boolean(
@@ -34,7 +38,94 @@ class ProjectGithubBranch(models.Model):
         help='Indicates if this branch is the default branch of the repository',
     )
     color = fields.Integer(string='Color Index', default=_get_default_color)
+    active = fields.Boolean(
+        string='Active',
+        default=True,
+        help='Branches deleted on GitHub are archived by the branch synchronisation',
+    )
+    head_sha = fields.Char(
+        string='Head Commit',
+        readonly=True,
+        help='SHA of the last commit of the branch at the last synchronisation',
+    )
+
+    pull_request_id = fields.Many2one(
+        'project.github.pull_request',
+        string='Pull Request',
+        compute='_compute_pull_request_id',
+        help='Open pull request of the branch, or its most recent one',
+    )
+    pull_request_state = fields.Selection(related='pull_request_id.state', string='Pull Request State')
+    ci_status_ids = fields.One2many(
+        'project.github.ci.status',
+        'branch_id',
+        string='Build Statuses',
+        readonly=True,
+    )
+    ci_state = fields.Selection(
+        CI_STATES,
+        string='Build',
+        compute='_compute_ci_state',
+        store=True,
+        help='Build state of the head commit of the branch, from its check suites and commit statuses',
+    )
+
+    commit_synced_sha = fields.Char(
+        string='Commits Read Up To',
+        readonly=True,
+        help='Head commit of the branch when its commits were last read',
+    )
+    commit_synced_at = fields.Datetime(
+        string='Commits Read Since',
+        readonly=True,
+        help='Date of the most recent commit read, the next read starts from it',
+    )
+    commit_backfill_until = fields.Datetime(
+        string='Commit Backfill Resume Date',
+        readonly=True,
+        help='Set while the history of the branch is partially read, the next read resumes below it',
+    )
+    commit_backfill_latest = fields.Datetime(string='Commit Backfill Latest Date', readonly=True)
 
     _sql_constraints = [
         ('unique_branch_repository', 'unique(name, repository_id)', 'A branch with this name already exists for the selected repository.'),
     ]
+
+    @api.depends('name', 'repository_id')
+    def _compute_pull_request_id(self):
+        """Read the pull requests of all the branches in one query on their (repository, head branch) index"""
+        pulls = self.env['project.github.pull_request'].search([
+            ('repository_id', 'in', self.repository_id.ids),
+            ('head_branch', 'in', list(set(self.mapped('name')))),
+        ], order='number desc')
+        by_head = {}
+        for pull in pulls:
+            key = (pull.repository_id.id, pull.head_branch)
+            current = by_head.get(key)
+            if not current or (pull.state in ('open', 'draft') and current.state not in ('open', 'draft')):
+                by_head[key] = pull
+        for branch in self:
+            branch.pull_request_id = by_head.get((branch.repository_id.id, branch.name), False)
+
+    @api.depends('head_sha', 'ci_status_ids.sha', 'ci_status_ids.conclusion')
+    def _compute_ci_state(self):
+        for branch in self:
+            status = branch.ci_status_ids.filtered(lambda status: status.sha == branch.head_sha)[:1]
+            branch.ci_state = status.conclusion or False
+
+    def action_refresh_ci_state(self):
+        """Read the build state of the head of the branches from GitHub"""
+        self.env['project.github.ci.status']._poll(self)
+
+    def init(self):
+        # The unique (name, repository_id) index does not serve the per repository lookups
+        self.env.cr.execute(SQL(
+            "CREATE INDEX IF NOT EXISTS %s ON %s (repository_id, name)",
+            SQL.identifier(f'{self._table}_repository_id_name_index'),
+            SQL.identifier(self._table),
+        ))
+        self.env.cr.execute(SQL(
+            "CREATE INDEX IF NOT EXISTS %s ON %s (repository_id) WHERE is_default",
+            SQL.identifier(f'{self._table}_repository_id_default_index'),
+            SQL.identifier(self._table),
+        ))
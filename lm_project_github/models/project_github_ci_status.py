@@ -0,0 +1,220 @@
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+# Summaries kept per branch, the summary of the head of the branch is always kept
+DEFAULT_CI_HISTORY = 20
+# Minutes after which a pending summary is polled, in case its completion was not delivered
+CI_POLL_DELAY = 15
+
+CI_STATES = [
+    ('pending', 'Running'),
+    ('success', 'Passing'),
+    ('failure', 'Failing'),
+]
+
+COMMIT_STATUS_STATES = {
+    'pending': 'pending',
+    'success': 'success',
+    'failure': 'failure',
+    'error': 'failure',
+}
+CHECK_SUITE_SUCCESS = {'success', 'neutral', 'skipped'}
+
+
+def commit_status_state(state):
+    """Return the CI state of a commit status (``status`` event or combined status)"""
+    return COMMIT_STATUS_STATES.get(state, 'pending')
+
+
+def check_suite_state(suite):
+    """Return the CI state of a check suite"""
+    if suite.get('status') != 'completed' or not suite.get('conclusion') or suite['conclusion'] == 'stale':
+        return 'pending'
+    return 'success' if suite['conclusion'] in CHECK_SUITE_SUCCESS else 'failure'
+
+
+def check_suite_key(suite):
+    # A re-run of the checks of an app replaces its previous suite
+    return f"check:{(suite.get('app') or {}).get('slug') or suite.get('id')}"
+
+
+class ProjectGithubCiStatus(models.Model):
+    """Build state of a commit of a branch
+
+    Every check suite and commit status of the commit is folded into a
+    single row: the state of each check by name, the counts and the overall
+    conclusion. Only the last summaries of each branch are kept.
+    """
+    _name = 'project.github.ci.status'
+    _description = 'GitHub Build Status'
+    _order = 'updated_at desc, id desc'
+
+    branch_id = fields.Many2one(
+        comodel_name='project.github.branch',
+        string='Branch',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+    )
+    repository_id = fields.Many2one(related='branch_id.repository_id', string='Repository')
+    sha = fields.Char(string='Commit', required=True, readonly=True)
+    checks = fields.Json(string='Checks', readonly=True, help='State of each check suite and commit status by name')
+    total_count = fields.Integer(string='Checks', readonly=True)
+    success_count = fields.Integer(string='Passed', readonly=True)
+    failure_count = fields.Integer(string='Failed', readonly=True)
+    pending_count = fields.Integer(string='Running', readonly=True)
+    conclusion = fields.Selection(CI_STATES, string='Build', required=True, readonly=True, default='pending')
+    updated_at = fields.Datetime(string='Updated At', readonly=True)
+
+    _sql_constraints = [
+        ('unique_branch_sha', 'unique(branch_id, sha)', 'The build status of this commit already exists.'),
+    ]
+
+    @api.model
+    def _summarize(self, checks):
+        """Return the counts and the conclusion of the states of the checks of a commit"""
+        states = list(checks.values())
+        counts = {state: states.count(state) for state, _label in CI_STATES}
+        if counts['failure']:
+            conclusion = 'failure'
+        elif counts['pending'] or not states:
+            conclusion = 'pending'
+        else:
+            conclusion = 'success'
+        return {
+            'checks': checks,
+            'total_count': len(states),
+            'success_count': counts['success'],
+            'failure_count': counts['failure'],
+            'pending_count': counts['pending'],
+            'conclusion': conclusion,
+            'updated_at': fields.Datetime.now(),
+        }
+
+    @api.model
+    def _fold(self, repository, checks_by_head, replace=False):
+        """Fold check states into the summaries of their commits
+
+        ``checks_by_head`` maps ``(branch name, sha)`` to the states of checks
+        by name. They update the checks already known for the commit, or
+        replace them with ``replace``. Branches and summaries are read with
+        one query each. Returns the summaries written.
+        """
+        if not checks_by_head:
+            return self.browse()
+        # Build statuses are read-only for users, the synchronisation of any user maintains them
+        Status = self.sudo()
+        branches = {
+            branch.name: branch
+            for branch in self.env['project.github.branch'].search([
+                ('repository_id', '=', repository.id),
+                ('name', 'in', list({name for name, _sha in checks_by_head})),
+            ])
+        }
+        existing = {
+            (status.branch_id.id, status.sha): status
+            for status in Status.search([
+                ('branch_id', 'in', [branch.id for branch in branches.values()]),
+                ('sha', 'in', list({sha for _name, sha in checks_by_head})),
+            ])
+        }
+        statuses = Status.browse()
+        to_create = []
+        for (name, sha), checks in checks_by_head.items():
+            branch = branches.get(name)
+            if not branch or not sha:
+                continue
+            status = existing.get((branch.id, sha))
+            if status:
+                status.write(self._summarize(checks if replace else dict(status.checks or {}, **checks)))
+                statuses |= status
+            else:
+                to_create.append(dict(self._summarize(checks), branch_id=branch.id, sha=sha))
+        return statuses | Status.create(to_create)
+
+    @api.model
+    def _poll(self, branches):
+        """Read the check suites and the combined status of the head of branches from GitHub"""
+        Api = self.env['project.github.api']
+        for repository in branches.repository_id:
+            checks_by_head = {}
+            for branch in branches.filtered(lambda branch: branch.repository_id == repository and branch.head_sha):
+                path = f'repos/{repository.full_name}/commits/{branch.head_sha}'
+                suites, _headers = Api._get_json(f'{path}/check-suites', params={'per_page': 100})
+                combined, _headers = Api._get_json(f'{path}/status', params={'per_page': 100})
+                checks = {check_suite_key(suite): check_suite_state(suite)
+                          for suite in suites.get('check_suites') or []}
+                checks.update({f"status:{status['context']}": commit_status_state(status.get('state'))
+                               for status in combined.get('statuses') or []})
+                checks_by_head[branch.name, branch.head_sha] = checks
+            self._fold(repository, checks_by_head, replace=True)
+
+    @api.model
+    def _cron_refresh_statuses(self, limit=50):
+        """Poll the pending builds that received no update for a while, then prune the history
+
+        Only the builds of branch heads are polled: the pending builds of
+        superseded commits are never updated again, they would otherwise
+        fill every run. They are pruned with the history.
+        """
+        self.env['project.github.branch'].flush_model(['head_sha', 'active'])
+        self.flush_model(['branch_id', 'sha', 'conclusion', 'updated_at'])
+        self.env.cr.execute(SQL(
+            """
+            SELECT status.id
+              FROM %(table)s status
+              JOIN %(branch_table)s branch ON branch.id = status.branch_id
+             WHERE status.conclusion = 'pending'
+               AND status.updated_at < %(before)s
+               AND status.sha = branch.head_sha
+               AND branch.active
+             ORDER BY status.updated_at ASC
+             LIMIT %(limit)s
+            """,
+            table=SQL.identifier(self._table),
+            branch_table=SQL.identifier(self.env['project.github.branch']._table),
+            before=fields.Datetime.now() - timedelta(minutes=CI_POLL_DELAY),
+            limit=limit,
+        ))
+        statuses = self.browse([row[0] for row in self.env.cr.fetchall()])
+        for repository in statuses.branch_id.repository_id:
+            branches = statuses.branch_id.filtered(lambda branch: branch.repository_id == repository)
+            try:
+                with self.env.cr.savepoint():
+                    self.with_user(repository.create_uid).with_context(github_priority='low')._poll(branches)
+            except UserError as e:
+                _logger.warning(f"Failed to read the build statuses of {repository.full_name}: {e}")
+            self.env.cr.commit()
+        self._gc_statuses()
+
+    @api.model
+    def _gc_statuses(self):
+        """Remove the summaries of each branch beyond the history window, except the one of its head"""
+        history = int(self.env['ir.config_parameter'].sudo().get_param(
+            'lm_project_github.ci_history', DEFAULT_CI_HISTORY))
+        self.env.cr.execute(SQL(
+            """
+            DELETE FROM %(table)s
+             WHERE id IN (
+                SELECT ranked.id FROM (
+                    SELECT status.id, status.sha, branch.head_sha,
+                           ROW_NUMBER() OVER (PARTITION BY status.branch_id
+                                              ORDER BY status.updated_at DESC, status.id DESC) AS position
+                      FROM %(table)s status
+                      JOIN %(branch_table)s branch ON branch.id = status.branch_id
+                ) ranked
+                WHERE ranked.position > %(history)s AND ranked.sha IS DISTINCT FROM ranked.head_sha
+             )
+            """,
+            table=SQL.identifier(self._table),
+            branch_table=SQL.identifier(self.env['project.github.branch']._table),
+            history=history,
+        ))
+        if self.env.cr.rowcount:
+            _logger.info(f"Removed {self.env.cr.rowcount} GitHub build statuses beyond the history window")
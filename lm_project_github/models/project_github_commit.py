@@ -0,0 +1,319 @@
+import functools
+import logging
+import re
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+from .project_github_api import parse_github_datetime
+from .project_github_job import try_advisory_lock
+from .project_github_metric import instrumented
+
+_logger = logging.getLogger(__name__)
+
+# Pages of 100 commits read per walk, a longer history is resumed by the next walk
+DEFAULT_COMMIT_MAX_PAGES = 100
+# Push payloads list at most this many commits
+PUSH_COMMITS_LIMIT = 2048
+
+
+@functools.lru_cache(maxsize=128)
+def _task_reference_pattern(prefix):
+    return re.compile(rf'(?<![\w-]){re.escape(prefix)}[-#]?(\d+)\b', re.IGNORECASE)
+
+
+def parse_task_references(prefix, message):
+    """Return the task ids referenced as ``<prefix>-<id>`` or ``<prefix>#<id>`` in a commit message"""
+    if not prefix or not message:
+        return set()
+    return {int(task_id) for task_id in _task_reference_pattern(prefix).findall(message)}
+
+
+def format_github_datetime(value):
+    """Return the ISO-8601 representation of a naive UTC datetime expected by GitHub"""
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class ProjectGithubCommit(models.Model):
+    _name = 'project.github.commit'
+    _description = 'GitHub Commit'
+    _order = 'committed_at desc, id desc'
+
+    sha = fields.Char(string='SHA', required=True, readonly=True)
+    name = fields.Char(string='Summary', readonly=True)
+    message = fields.Text(string='Message', readonly=True)
+    repository_id = fields.Many2one(
+        comodel_name='project.github.repository',
+        string='Repository',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+    )
+    project_id = fields.Many2one(
+        related='repository_id.project_id',
+        store=True,
+        index='btree_not_null',
+    )
+    branch_id = fields.Many2one(
+        comodel_name='project.github.branch',
+        string='Branch',
+        readonly=True,
+        ondelete='set null',
+        help='Branch the commit was first read from',
+    )
+    author_name = fields.Char(string='Author', readonly=True)
+    author_email = fields.Char(string='Author Email', readonly=True)
+    author_login = fields.Char(string='GitHub Login', readonly=True)
+    committed_at = fields.Datetime(string='Committed At', readonly=True)
+    html_url = fields.Char(string='URL', readonly=True)
+    additions = fields.Integer(string='Additions', readonly=True, help='Lines added, read from the local mirror')
+    deletions = fields.Integer(string='Deletions', readonly=True, help='Lines removed, read from the local mirror')
+    changed_files = fields.Integer(string='Changed Files', readonly=True)
+    task_ids = fields.Many2many(
+        comodel_name='project.task',
+        relation='project_github_commit_project_task_rel',
+        column1='commit_id',
+        column2='task_id',
+        string='Tasks',
+        readonly=True,
+    )
+
+    _sql_constraints = [
+        ('unique_repository_sha', 'unique(repository_id, sha)', 'This commit was already read for this repository.'),
+    ]
+
+    def _compute_display_name(self):
+        for commit in self:
+            commit.display_name = f"{(commit.sha or '')[:7]} {commit.name or ''}".strip()
+
+    @api.model
+    def _prepare_commit_row(self, commit):
+        """Return the row of a commit of the REST ``/commits`` listing"""
+        data = commit.get('commit') or {}
+        author = data.get('author') or {}
+        committer = data.get('committer') or {}
+        message = data.get('message') or ''
+        return {
+            'sha': commit['sha'],
+            'name': message.split('\n', 1)[0],
+            'message': message,
+            'author_name': author.get('name'),
+            'author_email': author.get('email'),
+            'author_login': (commit.get('author') or {}).get('login'),
+            'committed_at': parse_github_datetime(committer.get('date') or author.get('date')),
+            'html_url': commit.get('html_url'),
+        }
+
+    @api.model
+    def _prepare_push_commit_row(self, commit):
+        """Return the row of a commit of a push webhook payload"""
+        author = commit.get('author') or {}
+        message = commit.get('message') or ''
+        return {
+            'sha': commit['id'],
+            'name': message.split('\n', 1)[0],
+            'message': message,
+            'author_name': author.get('name'),
+            'author_email': author.get('email'),
+            'author_login': author.get('username'),
+            'committed_at': parse_github_datetime(commit.get('timestamp')),
+            'html_url': commit.get('url'),
+        }
+
+    @api.model
+    def _ingest_commits(self, repository, rows, branch=None):
+        """Insert commit rows in one statement, skipping the commits already known
+
+        The new commits are linked to the tasks their message references.
+        Returns the number of commits inserted.
+        """
+        if not rows:
+            return 0
+        values = SQL(', ').join(
+            SQL(
+                "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, "
+                "%s, now() at time zone 'UTC', %s, now() at time zone 'UTC')",
+                repository.id, repository.project_id.id or None, branch.id if branch else None,
+                row['sha'], row['name'], row['message'], row['author_name'] or None, row['author_email'] or None,
+                row['author_login'] or None, row['committed_at'] or None, row['html_url'] or None,
+                row.get('additions'), row.get('deletions'), row.get('changed_files'),
+                self.env.uid, self.env.uid,
+            )
+            for row in rows
+        )
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO %s (repository_id, project_id, branch_id, sha, name, message, author_name, author_email,
+                            author_login, committed_at, html_url, additions, deletions, changed_files,
+                            create_uid, create_date, write_uid, write_date)
+            VALUES %s
+            ON CONFLICT (repository_id, sha) DO NOTHING
+            RETURNING id, message
+            """,
+            SQL.identifier(self._table), values,
+        ))
+        inserted = self.env.cr.fetchall()
+        if inserted and repository.project_id:
+            self._link_tasks(repository.project_id, inserted)
+        return len(inserted)
+
+    @api.model
+    def _link_tasks(self, project, commits):
+        """Link ``(commit id, message)`` pairs to the tasks of the project they reference"""
+        references = {
+            commit_id: parse_task_references(project.commit_prefix, message)
+            for commit_id, message in commits
+        }
+        task_ids = set().union(*references.values())
+        if not task_ids:
+            return
+        tasks = self.env['project.task'].with_context(active_test=False).search([
+            ('id', 'in', list(task_ids)),
+            ('project_id', '=', project.id),
+        ])
+        valid_ids = set(tasks.ids)
+        pairs = [
+            SQL("(%s, %s)", commit_id, task_id)
+            for commit_id, referenced in references.items()
+            for task_id in referenced
+            if task_id in valid_ids
+        ]
+        if not pairs:
+            return
+        self.env.cr.execute(SQL(
+            "INSERT INTO project_github_commit_project_task_rel (commit_id, task_id) VALUES %s ON CONFLICT DO NOTHING",
+            SQL(', ').join(pairs),
+        ))
+        tasks.invalidate_recordset(['github_commit_ids'])
+
+    @api.model
+    @instrumented('sync_commits')
+    def _sync_branch_commits(self, branch, max_pages=None):
+        """Read the commits of a branch newer than its high-water mark
+
+        The history is streamed page by page, each page being inserted before
+        the next one is requested. A walk stopped by the page cap records the
+        date of the oldest commit read and the next walk resumes below it.
+        A walk that does not move below its resume date, more commits sharing
+        one commit date than the page cap, skips the rest of that second so
+        that the backfill always ends.
+        Returns the number of commits inserted and whether the walk is complete.
+        """
+        repository = branch.repository_id
+        if not branch.commit_backfill_until and branch.head_sha and branch.head_sha == branch.commit_synced_sha:
+            return 0, True
+        if not try_advisory_lock(self.env.cr, 'lm_project_github.sync_commits', branch.id):
+            _logger.info(f"Skipping the commits of {repository.full_name}@{branch.name}, another worker reads them")
+            return 0, True
+        if repository.mirror_enabled:
+            return self._sync_mirror_branch_commits(branch)
+        max_pages = max_pages or int(self.env['ir.config_parameter'].sudo().get_param(
+            'lm_project_github.commit_max_pages', DEFAULT_COMMIT_MAX_PAGES))
+        params = {'sha': branch.name, 'per_page': 100}
+        if branch.commit_synced_at:
+            params['since'] = format_github_datetime(branch.commit_synced_at)
+        if branch.commit_backfill_until:
+            params['until'] = format_github_datetime(branch.commit_backfill_until)
+
+        resumed = bool(branch.commit_backfill_until)
+        head_sha = None
+        newest = branch.commit_backfill_latest
+        oldest = None
+        count = pages = 0
+        for page in self.env['project.github.api']._iter_json_pages(
+                f'repos/{repository.full_name}/commits', params=params, max_pages=max_pages):
+            pages += 1
+            rows = [self._prepare_commit_row(commit) for commit in page]
+            if not resumed and not head_sha:
+                head_sha = rows[0]['sha']
+            dates = [row['committed_at'] for row in rows if row['committed_at']]
+            if dates:
+                newest = max([newest, *dates]) if newest else max(dates)
+                oldest = min(dates)
+            count += self._ingest_commits(repository, rows, branch)
+
+        complete = pages < max_pages or not oldest
+        if complete:
+            # A resumed walk excluded the commits pushed since it started, the next walk reads them
+            branch.write({
+                'commit_synced_sha': False if resumed else head_sha or branch.head_sha,
+                'commit_synced_at': newest or branch.commit_synced_at,
+                'commit_backfill_until': False,
+                'commit_backfill_latest': False,
+            })
+        else:
+            if branch.commit_backfill_until and oldest >= branch.commit_backfill_until:
+                _logger.warning(f"More than {max_pages} pages of commits of {repository.full_name}@{branch.name} "
+                                f"were committed at {oldest}, the others of that second are skipped")
+                oldest -= timedelta(seconds=1)
+            branch.write({'commit_backfill_until': oldest, 'commit_backfill_latest': newest})
+        _logger.info(f"Read {count} new commits of {repository.full_name}@{branch.name}")
+        return count, complete
+
+    @api.model
+    def _sync_mirror_branch_commits(self, branch):
+        """Read the commits of a branch from the local mirror, with their diff stats
+
+        The history below the high-water mark of the branch, or below the
+        one of the default branch for a branch never read, is not walked
+        again. Returns the number of commits inserted and True, a local walk
+        is never capped.
+        """
+        repository = branch.repository_id
+        Mirror = self.env['project.github.mirror']
+        head_sha = branch.head_sha or Mirror._get_heads(repository).get(branch.name)
+        if not head_sha:
+            return 0, True
+        if not Mirror._has_commit(repository, head_sha):
+            # The head was read from the API while another worker fetched the mirror, the next fetch brings it
+            _logger.info(f"Head of {repository.full_name}@{branch.name} is not in the mirror yet")
+            return 0, True
+        known = branch.commit_synced_sha
+        if not known and not branch.is_default:
+            known = repository.default_branch_id.commit_synced_sha
+        revisions = [head_sha]
+        if known and not branch.commit_backfill_until and Mirror._has_commit(repository, known):
+            revisions.append(f'^{known}')
+
+        count = 0
+        newest = branch.commit_synced_at
+        for rows in Mirror._iter_log(repository, revisions):
+            for row in rows:
+                row['html_url'] = f"{repository.html_url}/commit/{row['sha']}" if repository.html_url else None
+            dates = [row['committed_at'] for row in rows if row['committed_at']]
+            if dates:
+                newest = max([newest, *dates]) if newest else max(dates)
+            count += self._ingest_commits(repository, rows, branch)
+        branch.write({
+            'commit_synced_sha': head_sha,
+            'commit_synced_at': newest or False,
+            'commit_backfill_until': False,
+            'commit_backfill_latest': False,
+        })
+        _logger.info(f"Read {count} new commits of {repository.full_name}@{branch.name} from the local mirror")
+        return count, True
+
+    @api.model
+    def _ingest_push(self, repository, name, push):
+        """Insert the commits of the pushes to a branch, folded by the webhook consumer
+
+        When the pushes continue the high-water mark of the branch and list
+        all their commits, the mark moves to the new head so that the next
+        walk does not read them again.
+        """
+        branch = self.env['project.github.branch'].search([
+            ('repository_id', '=', repository.id),
+            ('name', '=', name),
+        ], limit=1)
+        rows = [self._prepare_push_commit_row(commit) for commit in push['commits']]
+        count = self._ingest_commits(repository, rows, branch)
+        if (branch and push['complete'] and not branch.commit_backfill_until
+                and branch.commit_synced_sha == push['before']):
+            dates = [row['committed_at'] for row in rows if row['committed_at']]
+            branch.write({
+                'commit_synced_sha': push['after'],
+                'commit_synced_at': max([branch.commit_synced_at, *dates]) if branch.commit_synced_at else (
+                    max(dates) if dates else False),
+            })
+        return count
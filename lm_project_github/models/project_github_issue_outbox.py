@@ -0,0 +1,179 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+from odoo.tools import SQL, html2plaintext
+
+from odoo.addons.project.models.project_task import CLOSED_STATES
+
+from .project_github_api import GithubRateLimitError
+
+_logger = logging.getLogger(__name__)
+
+# Sending attempts of a task before it is left failed
+MAX_OUTBOX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = timedelta(minutes=5)
+
+
+class ProjectGithubIssueOutbox(models.Model):
+    _name = 'project.github.issue.outbox'
+    _description = 'GitHub Issue Outbox'
+    _order = 'id'
+
+    task_id = fields.Many2one(
+        comodel_name='project.task',
+        string='Task',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+    )
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('failed', 'Failed'),
+    ], string='State', default='pending', required=True, readonly=True)
+    attempts = fields.Integer(string='Attempts', readonly=True)
+    eta = fields.Datetime(string='Send After', readonly=True, default=fields.Datetime.now)
+    error = fields.Text(string='Error', readonly=True)
+
+    def init(self):
+        # Every edit of a task waiting to be sent is coalesced in its pending row
+        self.env.cr.execute(SQL(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS %s ON %s (task_id)
+             WHERE state = 'pending'
+            """,
+            SQL.identifier(f'{self._table}_task_id_pending_uniq'),
+            SQL.identifier(self._table),
+        ))
+        self.env.cr.execute(SQL(
+            "CREATE INDEX IF NOT EXISTS %s ON %s (eta) WHERE state = 'pending'",
+            SQL.identifier(f'{self._table}_eta_pending_index'),
+            SQL.identifier(self._table),
+        ))
+
+    @api.model
+    def _enqueue_tasks(self, tasks):
+        """Queue the issue synchronisation of tasks in one statement
+
+        A task already waiting keeps its single pending row: the issue is
+        built from the task values when it is sent, so the edits in between
+        end up in one request.
+        """
+        if not tasks:
+            return
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO %(table)s (task_id, state, attempts, eta, create_uid, create_date, write_uid, write_date)
+            SELECT task_id, 'pending', 0, now() at time zone 'UTC',
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM unnest(%(task_ids)s) AS task_id
+            ON CONFLICT (task_id) WHERE state = 'pending'
+            DO UPDATE SET write_date = EXCLUDED.write_date
+            """,
+            table=SQL.identifier(self._table),
+            uid=self.env.uid,
+            task_ids=tasks.ids,
+        ))
+        # One wake up of the sender per transaction, however many tasks were saved
+        if not self.env.cr.precommit.data.get('lm_project_github.issue_outbox_trigger'):
+            self.env.cr.precommit.data['lm_project_github.issue_outbox_trigger'] = True
+            self.env.cr.precommit.add(self.env.ref('lm_project_github.ir_cron_github_issue_outbox')._trigger)
+
+    @api.model
+    def _prepare_issue_values(self, task):
+        """Return the GitHub issue payload of a task"""
+        return {
+            'title': task.name,
+            'body': html2plaintext(task.description or ''),
+            'state': 'closed' if task.state in CLOSED_STATES else 'open',
+        }
+
+    @api.model
+    def _send_task(self, github_api, token, task):
+        """Create or update the issue of a task"""
+        repository = task.project_id.repository_id
+        values = self._prepare_issue_values(task)
+        if task.github_issue_number:
+            response = github_api._patch(
+                f'repos/{repository.full_name}/issues/{task.github_issue_number}', token=token, json=values)
+            github_api._check_response(response)
+            return
+        # Issues are always created open
+        state = values.pop('state')
+        response = github_api._post(f'repos/{repository.full_name}/issues', token=token, json=values)
+        github_api._check_response(response)
+        issue = response.json()
+        if state == 'closed':
+            github_api._check_response(github_api._patch(
+                f"repos/{repository.full_name}/issues/{issue['number']}", token=token, json={'state': state}))
+        task.with_context(github_issue_sync=True).write({
+            'github_issue_id': str(issue['id']),
+            'github_issue_number': issue['number'],
+            'github_issue_url': issue.get('html_url'),
+        })
+
+    @api.model
+    def _cron_send_outbox(self, limit=200):
+        """Send the pending issue changes, repository by repository
+
+        Each repository batch is checked against the rate limit budget of the
+        token that connected the repository before its first request; an
+        exhausted budget postpones the whole batch to the reset of the limit.
+        A row is only cleared if its task was not saved again while it was
+        being sent.
+        """
+        rows = self.search([
+            ('state', '=', 'pending'),
+            ('eta', '<=', fields.Datetime.now()),
+        ], limit=limit)
+        seen_write_dates = {row.id: row.write_date for row in rows}
+        rows_by_repository = defaultdict(lambda: self.browse())
+        for row in rows:
+            rows_by_repository[row.task_id.project_id.repository_id] |= row
+
+        github_api = self.env['project.github.api'].with_context(github_priority='low')
+        for repository, batch in rows_by_repository.items():
+            if not repository or not repository.is_connected:
+                batch.unlink()
+                continue
+            try:
+                token = github_api._get_token(repository.create_uid)
+                github_api._check_budget(token, cost=len(batch))
+            except GithubRateLimitError as e:
+                batch.write({'eta': e.retry_at or fields.Datetime.now() + OUTBOX_RETRY_DELAY})
+                continue
+            except UserError as e:
+                batch.write({'state': 'failed', 'error': str(e)})
+                continue
+
+            for row in batch:
+                try:
+                    with self.env.cr.savepoint():
+                        self._send_task(github_api, token, row.task_id)
+                except GithubRateLimitError as e:
+                    row.write({'eta': e.retry_at or fields.Datetime.now() + OUTBOX_RETRY_DELAY})
+                    break
+                except Exception as e:
+                    _logger.warning(f"Failed to synchronize task {row.task_id.id} with a GitHub issue: {e}")
+                    attempts = row.attempts + 1
+                    row.write({
+                        'attempts': attempts,
+                        'error': str(e),
+                        'state': 'failed' if attempts >= MAX_OUTBOX_ATTEMPTS else 'pending',
+                        'eta': fields.Datetime.now() + OUTBOX_RETRY_DELAY * attempts,
+                    })
+                    continue
+                self.env.cr.execute(SQL(
+                    "DELETE FROM %s WHERE id = %s AND write_date = %s",
+                    SQL.identifier(self._table), row.id, seen_write_dates[row.id],
+                ))
+            self.env.cr.commit()
+
+        if len(rows) == limit:
+            self.env.ref('lm_project_github.ir_cron_github_issue_outbox')._trigger()
+
+    def action_retry(self):
+        self._enqueue_tasks(self.task_id)
+        self.filtered(lambda row: row.state == 'failed').unlink()
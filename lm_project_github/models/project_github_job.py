@@ -0,0 +1,291 @@
+import json
+import logging
+import zlib
+
+import psycopg2
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+from .project_github_api import GithubRateLimitError
+
+_logger = logging.getLogger(__name__)
+
+
+def try_advisory_lock(cr, name, res_id, wait=False):
+    """Take the transaction-level advisory lock ``name`` of a record
+
+    Returns False, without waiting, when another transaction holds it: that
+    transaction is already doing the same work on the record. With ``wait``
+    the lock is waited for. The lock is released when the transaction ends.
+    """
+    function = SQL('pg_advisory_xact_lock') if wait else SQL('pg_try_advisory_xact_lock')
+    cr.execute(SQL("SELECT %s(%s::int, %s::int)", function, zlib.crc32(name.encode()) & 0x7fffffff, res_id))
+    return wait or cr.fetchone()[0]
+
+
+class GithubJobCancelled(Exception):
+    """Raised in a running job once it has been cancelled"""
+
+
+class ProjectGithubJob(models.Model):
+    _name = 'project.github.job'
+    _description = 'GitHub Background Job'
+    _order = 'id desc'
+
+    name = fields.Char(string='Job', required=True, readonly=True)
+    job_type = fields.Selection([
+        ('refresh_catalogue', 'Refresh Repository Catalogue'),
+        ('sync_branches', 'Synchronize Branches'),
+        ('sync_commits', 'Synchronize Commits'),
+        ('import_issues', 'Import Issues'),
+        ('sync_pull_requests', 'Synchronize Pull Requests'),
+        ('register_webhook', 'Register Webhook'),
+        ('delete_webhooks', 'Delete Webhooks'),
+        ('sync_mirror', 'Fetch Local Mirror'),
+    ], string='Type', required=True, readonly=True)
+    res_model = fields.Char(string='Related Model', readonly=True)
+    res_id = fields.Many2oneReference(string='Related Record', model_field='res_model', readonly=True)
+    payload = fields.Json(string='Payload', readonly=True)
+    dedup_key = fields.Char(string='Deduplication Key', required=True, readonly=True, index=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ], string='State', default='pending', required=True, readonly=True, index=True)
+    priority = fields.Selection([
+        ('high', 'High'),
+        ('low', 'Low'),
+    ], string='Priority', default='high', required=True, readonly=True,
+        help='Low priority jobs leave a reserve of the GitHub rate limit to interactive calls')
+    progress = fields.Float(string='Progress (%)', readonly=True)
+    progress_message = fields.Char(string='Progress Message', readonly=True)
+    result_message = fields.Text(string='Result', readonly=True)
+    user_id = fields.Many2one('res.users', string='Requested By', required=True, readonly=True,
+                              default=lambda self: self.env.user, ondelete='cascade')
+    company_id = fields.Many2one('res.company', string='Company', required=True, readonly=True,
+                                 default=lambda self: self.env.company)
+    eta = fields.Datetime(string='Run After', readonly=True, default=fields.Datetime.now, index=True)
+    date_started = fields.Datetime(string='Started On', readonly=True)
+    date_done = fields.Datetime(string='Finished On', readonly=True)
+
+    def init(self):
+        # At most one pending or running job per deduplication key, also across workers
+        self.env.cr.execute(SQL(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS %s ON %s (dedup_key)
+             WHERE state IN ('pending', 'running')
+            """,
+            SQL.identifier(f'{self._table}_dedup_key_active_uniq'),
+            SQL.identifier(self._table),
+        ))
+
+    @api.model
+    def _enqueue(self, job_type, record=None, payload=None, name=None, priority='high'):
+        """Queue a job, or return the identical job already pending or running"""
+        payload = payload or {}
+        dedup_key = ':'.join([
+            job_type,
+            record._name if record else '',
+            str(record.id) if record else '',
+            json.dumps(payload, sort_keys=True),
+        ])
+        Job = self.sudo()
+        job = Job.search([('dedup_key', '=', dedup_key), ('state', 'in', ('pending', 'running'))], limit=1)
+        if job:
+            return job
+        vals = {
+            'name': name or dict(self._fields['job_type'].selection)[job_type],
+            'job_type': job_type,
+            'res_model': record._name if record else False,
+            'res_id': record.id if record else False,
+            'payload': payload,
+            'dedup_key': dedup_key,
+            'priority': priority,
+            'user_id': self.env.user.id,
+            'company_id': self.env.company.id,
+        }
+        try:
+            with self.env.cr.savepoint():
+                job = Job.create(vals)
+        except psycopg2.IntegrityError:
+            # Another worker queued the same job meanwhile
+            return Job.search([('dedup_key', '=', dedup_key), ('state', 'in', ('pending', 'running'))], limit=1)
+        self.env.ref('lm_project_github.ir_cron_github_job_runner')._trigger()
+        return job
+
+    def _get_record(self):
+        self.ensure_one()
+        if not self.res_model or not self.res_id:
+            return None
+        record = self.env[self.res_model].browse(self.res_id).exists()
+        if not record:
+            raise UserError(_('The record of this job no longer exists.'))
+        return record
+
+    def _set_progress(self, progress, message=None):
+        """Publish the progress of a running job and stop it if it was cancelled
+
+        The progress is written in its own transaction so that it is visible
+        while the job is still running.
+        """
+        self.ensure_one()
+        with self.env.registry.cursor() as cr:
+            cr.execute(SQL(
+                "UPDATE %s SET progress = %s, progress_message = %s WHERE id = %s RETURNING state",
+                SQL.identifier(self._table), progress, message, self.id,
+            ))
+            row = cr.fetchone()
+        if row and row[0] == 'cancelled':
+            raise GithubJobCancelled()
+
+    def _notify(self, message, notification_type):
+        self.ensure_one()
+        self.env['bus.bus']._sendone(self.user_id.partner_id, 'simple_notification', {
+            'title': self.name,
+            'message': message,
+            'type': notification_type,
+            'sticky': False,
+        })
+
+    def _run(self):
+        """Execute the job as the user who requested it"""
+        self.ensure_one()
+        job = self.with_user(self.user_id).with_company(self.company_id).with_context(
+            github_priority=self.priority)
+        return getattr(job, f'_run_{self.job_type}')()
+
+    def _run_refresh_catalogue(self):
+        user = self._get_record()
+        count = self.env['project.github.repository.catalogue']._refresh_user_catalogue(
+            user, full=bool((self.payload or {}).get('full')))
+        return _('%d repositories read from GitHub.', count)
+
+    def _run_sync_branches(self):
+        repository = self._get_record()
+        self._set_progress(10, _('Fetching branches'))
+        created, updated, pruned = repository._sync_branches()
+        message = _(
+            "Synchronized branches successfully. Added %(created)d new branches, "
+            "updated %(updated)d and removed %(pruned)d.",
+            created=len(created), updated=len(updated), pruned=len(pruned),
+        )
+        if repository.project_id and (created or updated or pruned):
+            repository.project_id.message_post(body=message)
+        return message if created or updated or pruned else _("No new branches found to synchronize.")
+
+    def _run_sync_commits(self):
+        repository = self._get_record()
+        branches = self.env['project.github.branch'].search([('repository_id', '=', repository.id)])
+        Commit = self.env['project.github.commit']
+        count = 0
+        for index, branch in enumerate(branches):
+            self._set_progress(100 * index / len(branches), _('Reading the commits of %s', branch.name))
+            complete = False
+            while not complete:
+                inserted, complete = Commit._sync_branch_commits(branch)
+                count += inserted
+                # Each chunk of a long history is kept even if the job stops later on
+                self.env.cr.commit()
+        return _('%(count)d new commits read from %(repository)s.', count=count, repository=repository.full_name)
+
+    def _run_import_issues(self):
+        repository = self._get_record()
+        count = 0
+        complete = False
+        while not complete:
+            self._set_progress(0, _('%d issues imported', count))
+            imported, complete = repository._import_issues()
+            count += imported
+            # The cursor moved with the chunk, a later failure resumes after it
+            self.env.cr.commit()
+        return _('%(count)d issues read from %(repository)s.', count=count, repository=repository.full_name)
+
+    def _run_sync_pull_requests(self):
+        repository = self._get_record()
+        self._set_progress(0, _('Reading the pull requests'))
+        count = repository._sync_pull_requests()
+        return _('%(count)d pull requests of %(repository)s read from GitHub.',
+                 count=count, repository=repository.full_name)
+
+    def _run_register_webhook(self):
+        repository = self._get_record()
+        if not repository._register_webhook():
+            return _('A webhook is already registered on %s.', repository.full_name)
+        return _('Webhook registered on %s.', repository.full_name)
+
+    def _run_delete_webhooks(self):
+        payload = self.payload or {}
+        full_name = payload.get('full_name')
+        response = self.env['project.github.api']._delete(f"repos/{full_name}/hooks/{payload.get('hook_id')}")
+        if response.status_code not in [204, 404]:
+            raise UserError(_("Failed to delete webhooks on GitHub."))
+        return _('Webhooks of %s deleted.', full_name)
+
+    def _run_sync_mirror(self):
+        repository = self._get_record()
+        self._set_progress(0, _('Fetching the mirror'))
+        count = repository._sync_mirror()
+        return _('%(count)d new commits read from the mirror of %(repository)s.',
+                 count=count, repository=repository.full_name)
+
+    @api.model
+    def _cron_process_jobs(self, limit=20):
+        """Run the pending jobs, committing after each one
+
+        The final state of a job is written in a new transaction, after its
+        work was committed or rolled back: progress reports and cancellations
+        update the job row from other transactions while it runs.
+        """
+        jobs = self.search([
+            ('state', '=', 'pending'),
+            ('eta', '<=', fields.Datetime.now()),
+        ], order='priority asc, id asc', limit=limit)
+        for job in jobs:
+            job.write({'state': 'running', 'date_started': fields.Datetime.now(), 'progress': 0})
+            self.env.cr.commit()
+            notification = None
+            try:
+                message = job._run()
+                self.env.cr.commit()
+                vals = {'state': 'done', 'progress': 100, 'result_message': message}
+                notification = (message, 'success')
+            except GithubJobCancelled:
+                self.env.cr.rollback()
+                vals = {'result_message': _('Cancelled.')}
+            except GithubRateLimitError as e:
+                # Requeue once the budget is available again
+                self.env.cr.rollback()
+                vals = {'state': 'pending', 'eta': e.retry_at or fields.Datetime.now(), 'progress_message': str(e)}
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.exception(f"GitHub job {job.id} ({job.job_type}) failed")
+                message = str(e.args[0] if isinstance(e, UserError) else e)
+                vals = {'state': 'failed', 'result_message': message}
+                notification = (message, 'danger')
+
+            job.invalidate_recordset(['state'])
+            if job.state == 'cancelled':
+                vals.pop('state', None)
+            if vals.get('state') != 'pending':
+                vals['date_done'] = fields.Datetime.now()
+            job.write(vals)
+            if notification:
+                job._notify(*notification)
+            self.env.cr.commit()
+
+        if len(jobs) == limit:
+            self.env.ref('lm_project_github.ir_cron_github_job_runner')._trigger()
+
+    def action_cancel(self):
+        """Cancel pending jobs, running jobs stop at their next progress report"""
+        for job in self:
+            if job.user_id != self.env.user and not self.env.is_system():
+                raise UserError(_('You can only cancel your own jobs.'))
+        self.sudo().filtered(lambda job: job.state in ('pending', 'running')).write({
+            'state': 'cancelled',
+            'date_done': fields.Datetime.now(),
+        })
@@ -0,0 +1,286 @@
+import functools
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import psycopg2
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Seconds between two writes of the metrics of a worker outside of an action
+FLUSH_INTERVAL = 30
+
+METRIC_PREFIX = 'lm_project_github'
+
+# Metrics are accumulated in memory per worker process and database, the API
+# client also records them from the threads fetching pages concurrently.
+_pending = defaultdict(lambda: defaultdict(lambda: [0, 0.0, 0]))
+_last_flush = {}
+_pending_lock = threading.Lock()
+
+
+def endpoint_of(url):
+    """Return the endpoint template of a GitHub API URL, ``/repos/:owner/:repo/branches`` for instance
+
+    Ids, commit SHAs and branch names are replaced by placeholders so that
+    every new commit or branch does not add an endpoint.
+    """
+    path = urlparse(url).path
+    path = re.sub(r'^/api/(v3/)?', '/', path)
+    path = re.sub(r'^/repos/[^/]+/[^/]+', '/repos/:owner/:repo', path)
+    # Branch names may contain slashes, the rest of the path is the name
+    path = re.sub(r'/branches/.+$', '/branches/:branch', path)
+    path = re.sub(r'/(git/trees|git/blobs|git/commits|commits)/[^/]+', r'/\1/:sha', path)
+    path = re.sub(r'/[0-9a-f]{40}(?=/|$)', '/:sha', path)
+    return re.sub(r'/\d+(?=/|$)', '/:id', path) or '/'
+
+
+def latency_bucket(seconds):
+    """Return the label of the histogram bucket of a duration"""
+    return next((f'{bound:g}' for bound in LATENCY_BUCKETS if seconds <= bound), '+Inf')
+
+
+def _add(dbname, metric, name, label='', total=0.0, queries=0):
+    entry = _pending[dbname][(metric, name, label)]
+    entry[0] += 1
+    entry[1] += total
+    entry[2] += queries
+
+
+def record_request(dbname, method, url, status, seconds, retried=False):
+    """Account a response of the GitHub API, safe to call from worker threads"""
+    endpoint = endpoint_of(url)
+    with _pending_lock:
+        _add(dbname, 'http_requests', endpoint, f'{method} {status}', total=seconds)
+        _add(dbname, 'http_latency', endpoint, latency_bucket(seconds))
+        if retried:
+            _add(dbname, 'http_retries', endpoint, method)
+
+
+def record_cache(dbname, url, hit):
+    """Account a conditional request answered from the response cache or not"""
+    with _pending_lock:
+        _add(dbname, 'cache', endpoint_of(url), 'hit' if hit else 'miss')
+
+
+def record_action(dbname, name, seconds, queries):
+    with _pending_lock:
+        _add(dbname, 'action', name, total=seconds, queries=queries)
+        _add(dbname, 'action_latency', name, latency_bucket(seconds))
+
+
+@contextmanager
+def track_action(env, name):
+    """Record the duration and the SQL queries of a block as the action ``name``"""
+    cr = env.cr
+    queries = cr.sql_log_count
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_action(cr.dbname, name, time.perf_counter() - start, cr.sql_log_count - queries)
+        env['project.github.metric']._flush(force=True)
+
+
+def instrumented(name):
+    """Decorate a model method to record its calls as the action ``name``"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with track_action(self.env, name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    return ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+
+
+class ProjectGithubMetric(models.Model):
+    _name = 'project.github.metric'
+    _description = 'GitHub Integration Metric'
+    _order = 'metric, name, label'
+    _log_access = False
+
+    metric = fields.Selection([
+        ('http_requests', 'API Requests'),
+        ('http_latency', 'API Latency Bucket'),
+        ('http_retries', 'API Retries'),
+        ('cache', 'Response Cache'),
+        ('action', 'Action'),
+        ('action_latency', 'Action Latency Bucket'),
+    ], string='Metric', required=True, readonly=True)
+    name = fields.Char(string='Endpoint / Action', required=True, readonly=True)
+    label = fields.Char(
+        string='Label',
+        readonly=True,
+        help='Method and status code of requests, result of cache lookups, upper bound of latency buckets',
+    )
+    count = fields.Integer(string='Count', readonly=True)
+    total_duration = fields.Float(string='Total Duration (s)', readonly=True, digits=(16, 3))
+    queries = fields.Integer(string='SQL Queries', readonly=True)
+    average_duration = fields.Float(string='Average Duration (s)', compute='_compute_averages', digits=(16, 3))
+    average_queries = fields.Float(string='Average Queries', compute='_compute_averages')
+    updated_at = fields.Datetime(string='Updated At', readonly=True)
+
+    _sql_constraints = [
+        ('unique_metric', 'unique(metric, name, label)', 'This metric is already recorded.'),
+    ]
+
+    @api.depends('count', 'total_duration', 'queries')
+    def _compute_averages(self):
+        for metric in self:
+            metric.average_duration = metric.total_duration / metric.count if metric.count else 0.0
+            metric.average_queries = metric.queries / metric.count if metric.count else 0.0
+
+    @api.model
+    def _flush(self, force=False):
+        """Add the metrics accumulated by this worker to the shared counters
+
+        Outside of the instrumented actions, the counters are written at most
+        once every FLUSH_INTERVAL seconds. The write runs in its own
+        transaction so that the counters of concurrent workers never lock each
+        other for longer than one statement.
+        """
+        dbname = self.env.cr.dbname
+        now = time.monotonic()
+        with _pending_lock:
+            if not _pending.get(dbname) or (not force and now - _last_flush.get(dbname, 0) < FLUSH_INTERVAL):
+                return
+            pending = _pending.pop(dbname)
+            _last_flush[dbname] = now
+
+        values = SQL(', ').join(
+            SQL("(%s, %s, %s, %s, %s, %s, now() at time zone 'UTC')", metric, name, label, count, total, queries)
+            for (metric, name, label), (count, total, queries) in pending.items()
+        )
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute(SQL(
+                    """
+                    INSERT INTO %(table)s AS metric (metric, name, label, count, total_duration, queries, updated_at)
+                    VALUES %(values)s
+                    ON CONFLICT (metric, name, label) DO UPDATE
+                       SET count = metric.count + EXCLUDED.count,
+                           total_duration = metric.total_duration + EXCLUDED.total_duration,
+                           queries = metric.queries + EXCLUDED.queries,
+                           updated_at = EXCLUDED.updated_at
+                    """,
+                    table=SQL.identifier(self._table),
+                    values=values,
+                ))
+        except psycopg2.Error as e:
+            # Metrics are best effort, a lost write only loses samples
+            _logger.debug(f"GitHub metrics write skipped: {e}")
+
+    def action_reset(self):
+        """Reset every counter"""
+        self._flush(force=True)
+        self.env.cr.execute(SQL("DELETE FROM %s", SQL.identifier(self._table)))
+        return {'type': 'ir.actions.client', 'tag': 'reload'}
+
+    @api.model
+    def _histogram_lines(self, family, label_name, totals, buckets):
+        """Return the Prometheus lines of a histogram from per-bucket counts"""
+        lines = []
+        for name, (count, total) in sorted(totals.items()):
+            cumulative = 0
+            for bound in [f'{bound:g}' for bound in LATENCY_BUCKETS]:
+                cumulative += buckets.get((name, bound), 0)
+                lines.append(f'{family}_bucket{{{_format_labels({label_name: name, "le": bound})}}} {cumulative}')
+            lines.append(f'{family}_bucket{{{_format_labels({label_name: name, "le": "+Inf"})}}} {count}')
+            lines.append(f'{family}_sum{{{_format_labels({label_name: name})}}} {total:.6f}')
+            lines.append(f'{family}_count{{{_format_labels({label_name: name})}}} {count}')
+        return lines
+
+    @api.model
+    def _render_prometheus(self):
+        """Return the counters and the rate limit budgets in the Prometheus text exposition format"""
+        self._flush(force=True)
+        self.env.cr.execute(SQL(
+            "SELECT metric, name, label, count, total_duration, queries FROM %s ORDER BY metric, name, label",
+            SQL.identifier(self._table),
+        ))
+        rows = self.env.cr.fetchall()
+
+        requests_totals = defaultdict(lambda: [0, 0.0])
+        action_totals = {}
+        buckets = {'http_latency': {}, 'action_latency': {}}
+        cache = defaultdict(lambda: {'hit': 0, 'miss': 0})
+        request_lines, retry_lines, query_lines = [], [], []
+        for metric, name, label, count, total, queries in rows:
+            if metric == 'http_requests':
+                method, _sep, status = label.partition(' ')
+                labels = _format_labels({'endpoint': name, 'method': method, 'status': status})
+                request_lines.append(f'{METRIC_PREFIX}_http_requests_total{{{labels}}} {count}')
+                requests_totals[name][0] += count
+                requests_totals[name][1] += total
+            elif metric in buckets:
+                buckets[metric][(name, label)] = count
+            elif metric == 'http_retries':
+                labels = _format_labels({'endpoint': name, 'method': label})
+                retry_lines.append(f'{METRIC_PREFIX}_http_retries_total{{{labels}}} {count}')
+            elif metric == 'cache':
+                cache[name][label] = count
+            elif metric == 'action':
+                action_totals[name] = (count, total)
+                query_lines.append(f'{METRIC_PREFIX}_action_queries_total{{{_format_labels({"action": name})}}} '
+                                   f'{queries}')
+
+        lines = [
+            f'# HELP {METRIC_PREFIX}_http_requests_total GitHub API responses by endpoint, method and status.',
+            f'# TYPE {METRIC_PREFIX}_http_requests_total counter',
+            *request_lines,
+            f'# HELP {METRIC_PREFIX}_http_request_duration_seconds Latency of the GitHub API calls.',
+            f'# TYPE {METRIC_PREFIX}_http_request_duration_seconds histogram',
+            *self._histogram_lines(f'{METRIC_PREFIX}_http_request_duration_seconds', 'endpoint',
+                                   {name: tuple(value) for name, value in requests_totals.items()},
+                                   buckets['http_latency']),
+            f'# HELP {METRIC_PREFIX}_http_retries_total GitHub API calls retried after a server error '
+            f'or a secondary rate limit.',
+            f'# TYPE {METRIC_PREFIX}_http_retries_total counter',
+            *retry_lines,
+            f'# HELP {METRIC_PREFIX}_cache_requests_total Cacheable GET requests by result.',
+            f'# TYPE {METRIC_PREFIX}_cache_requests_total counter',
+        ]
+        for name, results in sorted(cache.items()):
+            for result, count in results.items():
+                lines.append(f'{METRIC_PREFIX}_cache_requests_total'
+                             f'{{{_format_labels({"endpoint": name, "result": result})}}} {count}')
+        hits = sum(results['hit'] for results in cache.values())
+        lookups = hits + sum(results['miss'] for results in cache.values())
+        lines += [
+            f'# HELP {METRIC_PREFIX}_cache_hit_ratio Share of the cacheable GET requests served from the cache.',
+            f'# TYPE {METRIC_PREFIX}_cache_hit_ratio gauge',
+            f'{METRIC_PREFIX}_cache_hit_ratio {hits / lookups if lookups else 0:.6f}',
+            f'# HELP {METRIC_PREFIX}_action_duration_seconds Duration of the GitHub integration actions.',
+            f'# TYPE {METRIC_PREFIX}_action_duration_seconds histogram',
+            *self._histogram_lines(f'{METRIC_PREFIX}_action_duration_seconds', 'action',
+                                   action_totals, buckets['action_latency']),
+            f'# HELP {METRIC_PREFIX}_action_queries_total SQL queries run by the GitHub integration actions.',
+            f'# TYPE {METRIC_PREFIX}_action_queries_total counter',
+            *query_lines,
+            f'# HELP {METRIC_PREFIX}_rate_limit_remaining Remaining GitHub API calls of the token of a user.',
+            f'# TYPE {METRIC_PREFIX}_rate_limit_remaining gauge',
+        ]
+        for budget in self.env['project.github.rate.limit'].sudo().search([('remaining', '!=', False)]):
+            labels = _format_labels({
+                'user': budget.user_id.login or budget.token_hash[:12],
+                'resource': budget.resource,
+            })
+            lines.append(f'{METRIC_PREFIX}_rate_limit_remaining{{{labels}}} {budget.remaining}')
+        return '\n'.join(lines) + '\n'
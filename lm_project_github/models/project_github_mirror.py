@@ -0,0 +1,202 @@
+import base64
+import fcntl
+import io
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import config
+
+from .project_github_api import parse_github_datetime
+
+_logger = logging.getLogger(__name__)
+
+GIT_TIMEOUT = 60
+# A first fetch of a large repository can take a while
+GIT_FETCH_TIMEOUT = 1800
+# Commits read from ``git log`` per insert statement
+MIRROR_LOG_CHUNK = 1000
+
+LOG_FORMAT = '%x1e%H%x1f%an%x1f%ae%x1f%cI%x1f%B%x1f'
+_numstat_line = re.compile(r'^(\d+|-)\t(\d+|-)\t')
+
+
+def parse_log_record(record):
+    """Return the commit row of a ``git log --numstat`` record written with LOG_FORMAT"""
+    sha, author_name, author_email, date, rest = record.split('\x1f', 4)
+    message, _sep, stats = rest.rpartition('\x1f')
+    additions = deletions = changed_files = 0
+    for line in stats.splitlines():
+        match = _numstat_line.match(line)
+        if match:
+            changed_files += 1
+            additions += int(match.group(1)) if match.group(1).isdigit() else 0
+            deletions += int(match.group(2)) if match.group(2).isdigit() else 0
+    message = message.strip()
+    return {
+        'sha': sha.strip(),
+        'name': message.split('\n', 1)[0],
+        'message': message,
+        'author_name': author_name,
+        'author_email': author_email,
+        'author_login': None,
+        'committed_at': parse_github_datetime(date),
+        'html_url': None,
+        'additions': additions,
+        'deletions': deletions,
+        'changed_files': changed_files,
+    }
+
+
+class ProjectGithubMirror(models.AbstractModel):
+    _name = 'project.github.mirror'
+    _description = 'GitHub Repository Local Mirror'
+
+    @api.model
+    def _get_root(self):
+        """Return the directory holding the mirrors of this database"""
+        root = self.env['ir.config_parameter'].sudo().get_param('lm_project_github.mirror_path') or os.path.join(
+            config['data_dir'], 'lm_project_github', 'mirrors')
+        return os.path.join(root, self.env.cr.dbname)
+
+    @api.model
+    def _get_path(self, repository):
+        return os.path.join(self._get_root(), f'{repository.repository_id or repository.id}.git')
+
+    @api.model
+    def _get_env(self, token=None):
+        """Return the environment of the git commands
+
+        The token is passed as an HTTP header through the ``GIT_CONFIG_*``
+        variables so that it never appears in the command line nor in the
+        configuration of the mirror.
+        """
+        env = dict(os.environ, GIT_TERMINAL_PROMPT='0', LC_ALL='C')
+        if token:
+            credentials = base64.b64encode(f'x-access-token:{token}'.encode()).decode()
+            env.update({
+                'GIT_CONFIG_COUNT': '1',
+                'GIT_CONFIG_KEY_0': 'http.extraHeader',
+                'GIT_CONFIG_VALUE_0': f'Authorization: Basic {credentials}',
+            })
+        return env
+
+    @api.model
+    def _git(self, path, *args, token=None, timeout=GIT_TIMEOUT, check=True):
+        """Run a git command on a mirror and return its output"""
+        if not shutil.which('git'):
+            raise UserError(_('Git is not installed on the server, local mirrors are not available.'))
+        command = ['git', '--git-dir', path, *args] if path else ['git', *args]
+        try:
+            result = subprocess.run(command, env=self._get_env(token), capture_output=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise UserError(_('Git %s timed out on the local mirror.', args[0]))
+        if check and result.returncode:
+            raise UserError(_(
+                'Git %(command)s failed on the local mirror: %(error)s',
+                command=args[0], error=result.stderr.decode(errors='replace').strip(),
+            ))
+        return result.stdout.decode(errors='replace')
+
+    @api.model
+    def _fetch(self, repository):
+        """Create or update the bare mirror of a repository with ``git fetch``
+
+        Only the branches are mirrored. Returns False without waiting when
+        another worker is already fetching the same mirror.
+        """
+        path = self._get_path(repository)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        url = repository.clone_url
+        if not url:
+            raise UserError(_('Repository "%s" has no clone URL.', repository.full_name))
+        token = None
+        if url.startswith(('http://', 'https://')):
+            token = self.env.user.git_token or self.env['project.github.api']._get_token(repository.create_uid)
+
+        with open(f'{path}.lock', 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                _logger.info(f"Mirror of {repository.full_name} is already being fetched")
+                return False
+            if not os.path.isdir(path):
+                self._git(None, 'init', '--bare', '--quiet', path)
+            self._git(path, 'config', 'remote.origin.url', url)
+            self._git(path, 'config', '--replace-all', 'remote.origin.fetch', '+refs/heads/*:refs/heads/*')
+            self._git(path, 'fetch', '--prune', '--no-tags', '--quiet', 'origin', token=token,
+                      timeout=GIT_FETCH_TIMEOUT)
+        repository.sudo().mirror_fetched_at = fields.Datetime.now()
+        _logger.info(f"Fetched the mirror of {repository.full_name}")
+        return True
+
+    @api.model
+    def _get_heads(self, repository):
+        """Return the head commit SHA of every branch of the mirror by name"""
+        output = self._git(
+            self._get_path(repository), 'for-each-ref', '--format=%(refname:strip=2)%00%(objectname)', 'refs/heads/')
+        return dict(line.split('\0', 1) for line in output.splitlines() if '\0' in line)
+
+    @api.model
+    def _has_commit(self, repository, sha):
+        if not sha:
+            return False
+        path = self._get_path(repository)
+        return not subprocess.run(
+            ['git', '--git-dir', path, 'cat-file', '-e', f'{sha}^{{commit}}'],
+            env=self._get_env(), capture_output=True, timeout=GIT_TIMEOUT,
+        ).returncode
+
+    @api.model
+    def _iter_log(self, repository, revisions, chunk_size=MIRROR_LOG_CHUNK):
+        """Yield the commits of ``git log <revisions>`` by chunks of rows, with their diff stats
+
+        The output is streamed so that a long history is read in bounded
+        memory.
+        """
+        command = [
+            'git', '--git-dir', self._get_path(repository), 'log', '--numstat', '--no-renames',
+            f'--format={LOG_FORMAT}', *revisions, '--',
+        ]
+        rows = []
+        with tempfile.TemporaryFile() as stderr, subprocess.Popen(
+                command, stdout=subprocess.PIPE, stderr=stderr, env=self._get_env()) as process:
+            stdout = io.TextIOWrapper(process.stdout, encoding='utf-8', errors='replace')
+            buffer = ''
+            for block in iter(lambda: stdout.read(65536), ''):
+                records = (buffer + block).split('\x1e')
+                buffer = records.pop()
+                rows.extend(parse_log_record(record) for record in records if record.strip())
+                if len(rows) >= chunk_size:
+                    yield rows
+                    rows = []
+            if buffer.strip():
+                rows.append(parse_log_record(buffer))
+            if process.wait():
+                stderr.seek(0)
+                raise UserError(_(
+                    'Git log failed on the local mirror: %s', stderr.read().decode(errors='replace').strip()))
+        if rows:
+            yield rows
+
+    @api.model
+    def _gc_mirrors(self):
+        """Remove the mirrors of the repositories that no longer use one"""
+        root = self._get_root()
+        if not os.path.isdir(root):
+            return
+        repositories = self.env['project.github.repository'].sudo().with_context(active_test=False).search([
+            ('mirror_enabled', '=', True),
+        ])
+        keep = {os.path.basename(self._get_path(repository)) for repository in repositories}
+        for name in os.listdir(root):
+            if name.endswith('.git') and name not in keep:
+                _logger.info(f"Removing the unused GitHub mirror {name}")
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+                if os.path.exists(os.path.join(root, f'{name}.lock')):
+                    os.unlink(os.path.join(root, f'{name}.lock'))
@@ -0,0 +1,168 @@
+import base64
+import json
+import logging
+
+import psycopg2
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_OBJECT_CACHE_MAX_SIZE = 512  # MB
+# Blobs larger than this are not fetched, the browser links to GitHub instead
+MAX_BLOB_SIZE = 1024 * 1024
+# Seconds between two updates of the last use of a cached object
+TOUCH_INTERVAL = 600
+
+
+class ProjectGithubObject(models.Model):
+    """Git objects read from GitHub, keyed by their SHA
+
+    Blobs and trees are immutable: an object is fetched once and shared by
+    every repository and user browsing it, until it is evicted by the size
+    cap. The content is kept in the filestore.
+    """
+    _name = 'project.github.object'
+    _description = 'GitHub Git Object Cache'
+    _order = 'last_used desc'
+
+    sha = fields.Char(string='SHA', required=True, readonly=True)
+    type = fields.Selection([
+        ('commit', 'Commit'),
+        ('tree', 'Recursive Tree'),
+        ('blob', 'Blob'),
+        ('markdown', 'Rendered Markdown'),
+    ], string='Type', required=True, readonly=True)
+    content = fields.Binary(string='Content', attachment=True, readonly=True)
+    size = fields.Integer(string='Size (bytes)', readonly=True)
+    last_used = fields.Datetime(string='Last Used', readonly=True, index=True)
+
+    _sql_constraints = [
+        ('unique_sha_type', 'unique(sha, type)', 'This git object is already cached.'),
+    ]
+
+    @api.model
+    def _lookup(self, sha, object_type):
+        """Return the cached content of an object as bytes, or None"""
+        obj = self.sudo().search([('sha', '=', sha), ('type', '=', object_type)], limit=1)
+        if not obj:
+            return None
+        self._touch(obj)
+        return base64.b64decode(obj.content or b'')
+
+    @api.model
+    def _store(self, sha, object_type, data):
+        """Cache the content of an object, concurrent workers may store the same one"""
+        try:
+            with self.env.cr.savepoint():
+                self.sudo().create({
+                    'sha': sha,
+                    'type': object_type,
+                    'content': base64.b64encode(data),
+                    'size': len(data),
+                    'last_used': fields.Datetime.now(),
+                })
+        except psycopg2.IntegrityError:
+            pass
+        return data
+
+    @api.model
+    def _touch(self, obj):
+        """Mark an object as recently used, at most once every TOUCH_INTERVAL seconds"""
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute(SQL(
+                    """
+                    UPDATE %(table)s SET last_used = now() at time zone 'UTC'
+                     WHERE id = %(id)s AND last_used < now() at time zone 'UTC' - %(interval)s * interval '1 second'
+                    """,
+                    table=SQL.identifier(self._table), id=obj.id, interval=TOUCH_INTERVAL,
+                ))
+        except psycopg2.Error as e:
+            _logger.debug(f"GitHub object cache touch skipped: {e}")
+
+    @api.model
+    def _get_tree(self, repository, commit_sha):
+        """Return the recursive tree of a commit: its entries and whether GitHub truncated it
+
+        The commit and tree objects are fetched together in one call of the
+        git trees API, every entry carries its path, type, SHA and size.
+        """
+        tree_sha = self._lookup(commit_sha, 'commit')
+        tree = self._lookup(tree_sha.decode(), 'tree') if tree_sha else None
+        if tree is None:
+            payload, _headers = self.env['project.github.api']._get_json(
+                f'repos/{repository.full_name}/git/trees/{commit_sha}',
+                params={'recursive': 1},
+                use_cache=False,
+                not_found_message=_('Commit %s was not found on GitHub.', commit_sha),
+            )
+            tree = json.dumps({
+                'truncated': payload.get('truncated', False),
+                'entries': [
+                    {'path': entry['path'], 'type': entry['type'], 'sha': entry['sha'], 'size': entry.get('size', 0)}
+                    for entry in payload.get('tree', [])
+                ],
+            }).encode()
+            self._store(payload['sha'], 'tree', tree)
+            self._store(commit_sha, 'commit', payload['sha'].encode())
+        tree = json.loads(tree)
+        return tree['entries'], tree['truncated']
+
+    @api.model
+    def _get_blob(self, repository, sha, size=0):
+        """Return the content of a blob as bytes"""
+        if size > MAX_BLOB_SIZE:
+            raise UserError(_('This file is too large to be displayed, please open it on GitHub.'))
+        data = self._lookup(sha, 'blob')
+        if data is not None:
+            return data
+        payload, _headers = self.env['project.github.api']._get_json(
+            f'repos/{repository.full_name}/git/blobs/{sha}',
+            use_cache=False,
+            not_found_message=_('File %s was not found on GitHub.', sha),
+        )
+        if payload.get('encoding') == 'base64':
+            data = base64.b64decode(payload.get('content') or '')
+        else:
+            data = (payload.get('content') or '').encode()
+        return self._store(sha, 'blob', data)
+
+    @api.model
+    def _render_markdown(self, repository, sha, size=0):
+        """Return the HTML of a Markdown blob rendered by GitHub"""
+        html = self._lookup(sha, 'markdown')
+        if html is not None:
+            return html.decode()
+        text = self._get_blob(repository, sha, size=size).decode(errors='replace')
+        response = self.env['project.github.api']._post('markdown', json={
+            'text': text,
+            'mode': 'gfm',
+            'context': repository.full_name,
+        })
+        self.env['project.github.api']._check_response(response)
+        return self._store(sha, 'markdown', response.text.encode()).decode()
+
+    @api.model
+    def _gc_objects(self):
+        """Evict the least recently used objects beyond the configured size cap"""
+        max_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            'lm_project_github.object_cache_max_size', DEFAULT_OBJECT_CACHE_MAX_SIZE))
+        self.env.cr.execute(SQL(
+            """
+            SELECT id FROM (
+                SELECT id, SUM(size) OVER (ORDER BY last_used DESC, id DESC) AS total
+                  FROM %(table)s
+            ) ranked
+            WHERE ranked.total > %(max_size)s
+            """,
+            table=SQL.identifier(self._table),
+            max_size=max_size * 1024 * 1024,
+        ))
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        if ids:
+            # Through the ORM so that the attachments leave the filestore too
+            self.sudo().browse(ids).unlink()
+            _logger.info(f"Evicted {len(ids)} GitHub git objects from the cache")
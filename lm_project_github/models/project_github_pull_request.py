@@ -0,0 +1,159 @@
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+from .project_github_api import parse_github_datetime
+from .project_github_commit import parse_task_references
+
+
+class ProjectGithubPullRequest(models.Model):
+    _name = 'project.github.pull_request'
+    _description = 'GitHub Pull Request'
+    _order = 'updated_at desc, id desc'
+
+    name = fields.Char(string='Title', required=True, readonly=True)
+    number = fields.Integer(string='Number', required=True, readonly=True)
+    github_id = fields.Char(string='GitHub ID', readonly=True)
+    repository_id = fields.Many2one(
+        comodel_name='project.github.repository',
+        string='Repository',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+    )
+    project_id = fields.Many2one(
+        comodel_name='project.project',
+        string='Project',
+        related='repository_id.project_id',
+        store=True,
+        index='btree_not_null',
+    )
+    state = fields.Selection([
+        ('open', 'Open'),
+        ('draft', 'Draft'),
+        ('merged', 'Merged'),
+        ('closed', 'Closed'),
+    ], string='State', required=True, readonly=True, default='open')
+    head_branch = fields.Char(string='Head Branch', readonly=True)
+    head_sha = fields.Char(string='Head Commit', readonly=True)
+    base_branch = fields.Char(string='Base Branch', readonly=True)
+    branch_id = fields.Many2one(
+        comodel_name='project.github.branch',
+        string='Branch',
+        readonly=True,
+        ondelete='set null',
+        index='btree_not_null',
+        help='Head branch of the pull request, unless it comes from a fork',
+    )
+    task_id = fields.Many2one(
+        comodel_name='project.task',
+        string='Task',
+        readonly=True,
+        ondelete='set null',
+        index='btree_not_null',
+        help='Task referenced with the commit prefix of the project in the head branch, title or description',
+    )
+    author_login = fields.Char(string='Author', readonly=True)
+    html_url = fields.Char(string='URL', readonly=True)
+    created_at = fields.Datetime(string='Created At', readonly=True)
+    updated_at = fields.Datetime(string='Updated At', readonly=True)
+    closed_at = fields.Datetime(string='Closed At', readonly=True)
+    merged_at = fields.Datetime(string='Merged At', readonly=True)
+
+    _sql_constraints = [
+        ('unique_pull_request_number', 'unique(repository_id, number)',
+         'This pull request already exists for the repository.'),
+    ]
+
+    def init(self):
+        # Branches read the pull requests of their head through this index
+        self.env.cr.execute(SQL(
+            "CREATE INDEX IF NOT EXISTS %s ON %s (repository_id, head_branch)",
+            SQL.identifier(f'{self._table}_repository_id_head_branch_index'),
+            SQL.identifier(self._table),
+        ))
+
+    @api.depends('repository_id', 'number', 'name')
+    def _compute_display_name(self):
+        for pull in self:
+            pull.display_name = f"#{pull.number} {pull.name}"
+
+    @api.model
+    def _prepare_vals(self, repository, pull):
+        """Return the values of a pull request payload of the REST API or of a webhook"""
+        if pull.get('merged_at') or pull.get('merged'):
+            state = 'merged'
+        elif pull.get('state') == 'closed':
+            state = 'closed'
+        else:
+            state = 'draft' if pull.get('draft') else 'open'
+        head = pull.get('head') or {}
+        head_repository = (head.get('repo') or {}).get('full_name')
+        vals = {
+            'name': pull.get('title') or '',
+            'number': pull['number'],
+            'github_id': str(pull['id']),
+            'state': state,
+            # Branches of forks are not branches of the repository
+            'head_branch': head.get('ref') if head_repository in (None, repository.full_name) else False,
+            'head_sha': head.get('sha'),
+            'base_branch': (pull.get('base') or {}).get('ref'),
+            'author_login': (pull.get('user') or {}).get('login'),
+            'html_url': pull.get('html_url'),
+            'created_at': parse_github_datetime(pull.get('created_at')),
+            'updated_at': parse_github_datetime(pull.get('updated_at')),
+            'closed_at': parse_github_datetime(pull.get('closed_at')),
+            'merged_at': parse_github_datetime(pull.get('merged_at')),
+        }
+        return {name: False if value is None else value for name, value in vals.items()}
+
+    @api.model
+    def _upsert_pull_requests(self, repository, pulls):
+        """Create or update the pull requests of a chunk of payloads
+
+        The existing pull requests, the head branches and the referenced
+        tasks of the chunk are each read with one query. Returns the created
+        and updated pull requests.
+        """
+        vals_by_number = {pull['number']: self._prepare_vals(repository, pull) for pull in pulls}
+        if not vals_by_number:
+            return self.browse(), self.browse()
+
+        branch_names = {vals['head_branch'] for vals in vals_by_number.values() if vals['head_branch']}
+        branches = {
+            branch.name: branch.id
+            for branch in self.env['project.github.branch'].search([
+                ('repository_id', '=', repository.id),
+                ('name', 'in', list(branch_names)),
+            ])
+        }
+        project = repository.project_id
+        references = {}
+        for pull in pulls:
+            vals = vals_by_number[pull['number']]
+            text = '\n'.join(filter(None, [vals['head_branch'], vals['name'], pull.get('body')]))
+            references[pull['number']] = sorted(parse_task_references(project.commit_prefix, text))
+        referenced_ids = {task_id for ids in references.values() for task_id in ids}
+        task_ids = set(self.env['project.task'].with_context(active_test=False).search([
+            ('id', 'in', list(referenced_ids)),
+            ('project_id', '=', project.id),
+        ]).ids) if referenced_ids else set()
+        for number, vals in vals_by_number.items():
+            vals['branch_id'] = branches.get(vals['head_branch'], False)
+            vals['task_id'] = next((task_id for task_id in references[number] if task_id in task_ids), False)
+
+        # Pull requests are read-only for users, the synchronisation of any user maintains them
+        PullRequest = self.sudo()
+        existing = PullRequest.search([
+            ('repository_id', '=', repository.id),
+            ('number', 'in', list(vals_by_number)),
+        ])
+        updated = PullRequest.browse()
+        for pull in existing:
+            vals = vals_by_number.pop(pull.number)
+            changed = {name: value for name, value in vals.items()
+                       if (pull[name].id if isinstance(pull[name], models.BaseModel) else pull[name]) != value}
+            if changed:
+                pull.write(changed)
+                updated |= pull
+        created = PullRequest.create([dict(vals, repository_id=repository.id) for vals in vals_by_number.values()])
+        return created, updated
@@ -0,0 +1,102 @@
+import logging
+from datetime import datetime, timedelta
+
+import psycopg2
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+from .project_github_api import token_digest
+
+_logger = logging.getLogger(__name__)
+
+
+class ProjectGithubRateLimit(models.Model):
+    _name = 'project.github.rate.limit'
+    _description = 'GitHub API Rate Limit Budget'
+    _order = 'remaining asc, id'
+    _log_access = False
+
+    token_hash = fields.Char(string='Token Hash', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='User', readonly=True, ondelete='cascade')
+    resource = fields.Char(string='Resource', required=True, readonly=True, default='core')
+    limit = fields.Integer(string='Limit', readonly=True)
+    remaining = fields.Integer(string='Remaining', readonly=True)
+    used = fields.Integer(string='Used', readonly=True)
+    reset_at = fields.Datetime(string='Resets At', readonly=True)
+    blocked_until = fields.Datetime(
+        string='Blocked Until',
+        readonly=True,
+        help='Set when GitHub answers with a secondary rate limit or a Retry-After delay',
+    )
+    last_status = fields.Integer(string='Last Status', readonly=True)
+    updated_at = fields.Datetime(string='Updated At', readonly=True)
+
+    _sql_constraints = [
+        ('unique_token_resource', 'unique(token_hash, resource)', 'A budget already exists for this token and resource.'),
+    ]
+
+    @api.model
+    def _get_budget(self, token, resource='core'):
+        """Return the last known budget of a token as a dict, or None
+
+        The budget is read in a fresh transaction so that the updates made by
+        the other workers since the start of the current transaction are seen.
+        """
+        query = SQL(
+            "SELECT \"limit\", remaining, reset_at, blocked_until FROM %s WHERE token_hash = %s AND resource = %s",
+            SQL.identifier(self._table), token_digest(token), resource,
+        )
+        with self.env.registry.cursor() as cr:
+            cr.execute(query)
+            return cr.dictfetchone()
+
+    @api.model
+    def _record(self, token, response, user=None):
+        """Store the budget advertised by the rate limit headers of a response"""
+        headers = response.headers
+        retry_after = headers.get('Retry-After')
+        blocked_until = None
+        if retry_after and retry_after.isdigit():
+            blocked_until = fields.Datetime.now() + timedelta(seconds=int(retry_after))
+        if 'X-RateLimit-Remaining' not in headers and not blocked_until:
+            return
+
+        def header_int(name):
+            value = headers.get(name)
+            return int(value) if value and value.isdigit() else None
+
+        reset = header_int('X-RateLimit-Reset')
+        query = SQL(
+            """
+            INSERT INTO %(table)s (token_hash, user_id, resource, "limit", remaining, used, reset_at,
+                                   blocked_until, last_status, updated_at)
+            VALUES (%(token_hash)s, %(user_id)s, %(resource)s, %(limit)s, %(remaining)s, %(used)s, %(reset_at)s,
+                    %(blocked_until)s, %(status)s, now() at time zone 'UTC')
+            ON CONFLICT (token_hash, resource) DO UPDATE
+               SET user_id = COALESCE(EXCLUDED.user_id, %(table)s.user_id),
+                   "limit" = COALESCE(EXCLUDED."limit", %(table)s."limit"),
+                   remaining = COALESCE(EXCLUDED.remaining, %(table)s.remaining),
+                   used = COALESCE(EXCLUDED.used, %(table)s.used),
+                   reset_at = COALESCE(EXCLUDED.reset_at, %(table)s.reset_at),
+                   blocked_until = EXCLUDED.blocked_until,
+                   last_status = EXCLUDED.last_status,
+                   updated_at = EXCLUDED.updated_at
+            """,
+            table=SQL.identifier(self._table),
+            token_hash=token_digest(token),
+            user_id=user.id if user else None,
+            resource=headers.get('X-RateLimit-Resource') or 'core',
+            limit=header_int('X-RateLimit-Limit'),
+            remaining=header_int('X-RateLimit-Remaining'),
+            used=header_int('X-RateLimit-Used'),
+            reset_at=datetime.utcfromtimestamp(reset) if reset else None,
+            blocked_until=blocked_until,
+            status=response.status_code,
+        )
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute(query)
+        except psycopg2.Error as e:
+            # Budget accounting is advisory, the next response will refresh it
+            _logger.debug(f"GitHub rate limit budget update skipped: {e}")
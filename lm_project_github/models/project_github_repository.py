@@ -1,9 +1,87 @@
+import logging
 import requests
+import secrets
+from collections import defaultdict
 from datetime import datetime
 from markupsafe import Markup
-from odoo import fields, models, api, _
+from odoo import fields, models, api, tools, Command, _
 import base64
 from odoo.exceptions import UserError
+from odoo.tools import SQL, split_every
+
+from .project_github_api import GithubRateLimitError, parse_github_datetime
+from .project_github_commit import format_github_datetime
+from .project_github_job import try_advisory_lock
+from .project_github_metric import instrumented
+
+_logger = logging.getLogger(__name__)
+
+
+DEFAULT_BRANCH_MAX_PAGES = 50
+# Pages of 100 issues imported per run, a longer backlog continues from the cursor
+DEFAULT_ISSUE_MAX_PAGES = 20
+# Pages of 100 pull requests read per run, newest update first
+DEFAULT_PULL_REQUEST_MAX_PAGES = 10
+
+# Events applied incrementally by the webhook consumer
+WEBHOOK_EVENTS = ['push', 'create', 'delete', 'repository', 'issues', 'pull_request', 'check_suite', 'status']
+
+# Fields shown by the information table, its rendering is cached on their values
+REPOSITORY_INFO_FIELDS = [
+    'name', 'owner', 'full_name', 'repository_id', 'description', 'private', 'visibility', 'language',
+    'html_url', 'clone_url', 'ssh_url', 'stars_count', 'forks_count', 'open_issues_count', 'archive',
+    'disabled', 'created_at', 'updated_at',
+]
+
+# Repositories whose metadata is refreshed per cron run, the fleet is covered over several runs
+DEFAULT_METADATA_REFRESH_BATCH = 500
+# Node ids per GraphQL ``nodes`` query, the maximum accepted by GitHub
+GRAPHQL_NODES_PER_QUERY = 100
+
+REPOSITORY_GRAPHQL_FRAGMENT = """
+fragment RepositoryMetadata on Repository {
+  id
+  databaseId
+  name
+  nameWithOwner
+  description
+  isPrivate
+  url
+  sshUrl
+  visibility
+  stargazerCount
+  forkCount
+  isArchived
+  isDisabled
+  createdAt
+  updatedAt
+  primaryLanguage { name }
+  issues(states: OPEN) { totalCount }
+  defaultBranchRef { name target { oid } }
+}
+"""
+
+# Repository metadata, default branch, open issues and one page of branch heads in one query
+REPOSITORY_GRAPHQL_QUERY = REPOSITORY_GRAPHQL_FRAGMENT + """
+query($owner: String!, $name: String!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    ...RepositoryMetadata
+    refs(refPrefix: "refs/heads/", first: 100, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes { name target { oid } }
+    }
+  }
+}
+"""
+
+# Metadata of up to GRAPHQL_NODES_PER_QUERY repositories in one query
+REPOSITORY_NODES_GRAPHQL_QUERY = REPOSITORY_GRAPHQL_FRAGMENT + """
+query($ids: [ID!]!) {
+  nodes(ids: $ids) {
+    ...RepositoryMetadata
+  }
+}
+"""
 
 
 class ProjectGithubRepository(models.Model):
@@ -11,11 +89,11 @@ class ProjectGithubRepository(models.Model):
     _description = "Project Github Repository"
 
     name = fields.Char(string="Repository Name", required=True)
-    repository_id = fields.Char(string="ID", readonly=True)
+    repository_id = fields.Char(string="ID", readonly=True, index=True)
     owner = fields.Char(string="Owner", required=True)
     description = fields.Text(string="Description", readonly=True)
     private = fields.Boolean(string="Private", readonly=True)
-    full_name = fields.Char(string="Full Name", readonly=True)
+    full_name = fields.Char(string="Full Name", readonly=True, index=True)
     html_url = fields.Char(string="URL", readonly=True)
     clone_url = fields.Char(string="Clone URL", readonly=True)
     ssh_url = fields.Char(string="SSH URL", readonly=True)
@@ -45,16 +123,660 @@ class ProjectGithubRepository(models.Model):
         string="Company",
     )
     is_connected = fields.Boolean(string="Is Connected", default=False)
+    node_id = fields.Char(string="GraphQL Node ID", readonly=True, copy=False)
+    metadata_refreshed_at = fields.Datetime(string="Metadata Refreshed At", readonly=True, copy=False)
+    issue_synced_at = fields.Datetime(
+        string="Issues Imported Up To",
+        readonly=True,
+        copy=False,
+        help="Last update date of the issues imported, the next import starts from it",
+    )
+    pull_request_synced_at = fields.Datetime(
+        string="Pull Requests Read Up To",
+        readonly=True,
+        copy=False,
+        help="Last update date of the pull requests read, the next synchronisation stops at it",
+    )
+    pull_request_resume_page = fields.Integer(
+        string="Pull Request Resume Page",
+        readonly=True,
+        copy=False,
+        help="Set while more pull requests changed than one synchronisation reads, the next one resumes at it",
+    )
+    pull_request_resume_at = fields.Datetime(string="Pull Request Resume Date", readonly=True, copy=False)
+    webhook_id = fields.Char(
+        string="Webhook ID",
+        readonly=True,
+        copy=False,
+        help="ID of the webhook registered on GitHub for this repository",
+    )
+    webhook_secret = fields.Char(
+        string="Webhook Secret",
+        readonly=True,
+        copy=False,
+        groups="base.group_system",
+    )
+    mirror_enabled = fields.Boolean(
+        string="Local Mirror",
+        readonly=True,
+        copy=False,
+        help="Keep a bare clone of the repository on the server and read the branches and commits from it "
+             "instead of the GitHub API",
+    )
+    mirror_fetched_at = fields.Datetime(string="Mirror Fetched At", readonly=True, copy=False)
 
     repository_info_html = fields.Html(
         string="Repository Info",
         compute="_compute_repository_info_html",
     )
 
+    _sql_constraints = [
+        ('unique_repository_company', 'unique(repository_id, company_id)',
+         'This GitHub repository is already connected in this company.'),
+    ]
+
     def _compute_display_name(self):
         for repo in self:
             repo.display_name = f"{repo.owner}/{repo.name}"
 
+    @api.model
+    def _lookup_by_github_id(self, github_id, company=None):
+        """Return the repository connected for a GitHub numeric id, through the unique index"""
+        company = company or self.env.company
+        return self.with_context(active_test=False).search([
+            ('repository_id', '=', str(github_id)),
+            ('company_id', 'in', [company.id, False]),
+        ], limit=1)
+
+    @api.model
+    def _create_connection(self, vals):
+        """Create the connection of a GitHub repository, unless it is already connected in the company
+
+        The row is claimed with ``INSERT ... ON CONFLICT DO NOTHING`` on the
+        unique (repository, company) index, so two users connecting the same
+        repository at once get one connection and no constraint error. Returns
+        the new repository, or an empty recordset when it already existed.
+        """
+        self.flush_model()
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO %(table)s (name, owner, repository_id, company_id, project_id, is_connected,
+                                   create_uid, create_date, write_uid, write_date)
+            VALUES (%(name)s, %(owner)s, %(github_id)s, %(company_id)s, %(project_id)s, TRUE,
+                    %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC')
+            ON CONFLICT (repository_id, company_id) DO NOTHING
+            RETURNING id
+            """,
+            table=SQL.identifier(self._table),
+            name=vals['name'],
+            owner=vals['owner'],
+            github_id=str(vals['repository_id']),
+            company_id=vals.get('company_id') or self.env.company.id,
+            project_id=vals.get('project_id') or None,
+            uid=self.env.uid,
+        ))
+        row = self.env.cr.fetchone()
+        if not row:
+            return self.browse()
+        repository = self.browse(row[0])
+        repository.invalidate_recordset()
+        repository.write({
+            name: value for name, value in vals.items()
+            if name not in ('name', 'owner', 'repository_id', 'company_id', 'project_id', 'is_connected')
+        })
+        repository.modified(['name', 'owner', 'project_id'])
+        return repository
+
+    def _fetch_branch_heads(self):
+        """Return the head commit SHA of every remote branch by name, and whether the listing is complete"""
+        self.ensure_one()
+        if self.mirror_enabled:
+            # One fetch instead of a page of API calls per 100 branches
+            Mirror = self.env['project.github.mirror']
+            if Mirror._fetch(self):
+                return Mirror._get_heads(self), True
+            # Another worker is fetching the mirror, which may be stale or not cloned yet
+            _logger.info(f"Reading the branches of {self.full_name} from the API while its mirror is fetched")
+        max_pages = int(self.env['ir.config_parameter'].sudo().get_param(
+            'lm_project_github.branch_max_pages', DEFAULT_BRANCH_MAX_PAGES))
+        branches, truncated = self.env['project.github.api']._get_json_pages(
+            f'repos/{self.full_name}/branches',
+            params={'per_page': 100},
+            max_pages=max_pages,
+        )
+        return {branch['name']: (branch.get('commit') or {}).get('sha') for branch in branches}, not truncated
+
+    def _apply_branch_heads(self, heads, complete=True):
+        """Reconcile the branches of the repository with the remote branch heads
+
+        New branches are created in one batch, branches whose head moved get
+        their new SHA, unchanged branches are not written at all. When
+        ``heads`` is the complete remote listing, branches missing from it are
+        archived or removed according to ``lm_project_github.branch_prune_mode``.
+        Returns the created, updated and pruned branches.
+        """
+        self.ensure_one()
+        Branch = self.env['project.github.branch'].with_context(active_test=False)
+        existing = {branch.name: branch for branch in Branch.search([('repository_id', '=', self.id)])}
+        created, updated = self._upsert_branches({
+            name: sha for name, sha in heads.items()
+            if name not in existing or (sha and existing[name].head_sha != sha) or not existing[name].active
+        })
+
+        pruned = Branch
+        if complete:
+            pruned = Branch.browse([
+                branch.id for name, branch in existing.items()
+                if name not in heads and branch.active and not branch.is_default
+            ])
+            self._prune_branches(pruned)
+
+        _logger.info(f"Synchronized branches of {self.full_name}: {len(created)} created, "
+                     f"{len(updated)} updated, {len(pruned)} pruned")
+        return created, updated, pruned
+
+    def _upsert_branches(self, heads, is_default=False):
+        """Create the branches ``heads`` (name: head SHA) or update the existing ones, in one statement
+
+        Concurrent synchronisations of the repository, a webhook delivery
+        racing a manual sync for instance, may create the same branch: the
+        insert falls back to an update of the existing row instead of failing
+        on the unique (name, repository) constraint. A head of None keeps the
+        known head. Unchanged branches are not written. Returns the created
+        and updated branches.
+        """
+        self.ensure_one()
+        Branch = self.env['project.github.branch'].with_context(active_test=False)
+        if not heads:
+            return Branch, Branch
+        Branch.flush_model()
+        values = SQL(', ').join(
+            SQL("(%s, %s, %s, %s, %s, TRUE, %s, %s, now() at time zone 'UTC', %s, now() at time zone 'UTC')",
+                name, self.id, self.project_id.id or None, sha, is_default, Branch._get_default_color(),
+                self.env.uid, self.env.uid)
+            for name, sha in heads.items()
+        )
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO %(table)s AS branch (name, repository_id, project_id, head_sha, is_default, active, color,
+                                             create_uid, create_date, write_uid, write_date)
+            VALUES %(values)s
+            ON CONFLICT (name, repository_id) DO UPDATE
+               SET head_sha = COALESCE(EXCLUDED.head_sha, branch.head_sha),
+                   is_default = branch.is_default OR EXCLUDED.is_default,
+                   active = TRUE,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+             WHERE branch.head_sha IS DISTINCT FROM COALESCE(EXCLUDED.head_sha, branch.head_sha)
+                OR (EXCLUDED.is_default AND NOT branch.is_default)
+                OR NOT branch.active
+            RETURNING id, xmax = 0
+            """,
+            table=SQL.identifier(Branch._table),
+            values=values,
+        ))
+        rows = self.env.cr.fetchall()
+        created = Branch.browse([branch_id for branch_id, inserted in rows if inserted])
+        updated = Branch.browse([branch_id for branch_id, inserted in rows if not inserted])
+        # The rows were written behind the ORM: refresh the cache and recompute the build state of the heads
+        (created | updated).invalidate_recordset()
+        (created | updated).modified(['head_sha', 'active'])
+        if created and self.project_id:
+            self.project_id.write({'branch_ids': [Command.link(branch.id) for branch in created]})
+        return created, updated
+
+    def _try_lock(self, operation):
+        """Return whether this transaction may run ``operation`` on the repository
+
+        Returns False when another worker is already running it, the caller
+        then skips the work instead of racing it.
+        """
+        self.ensure_one()
+        locked = try_advisory_lock(self.env.cr, f'lm_project_github.{operation}', self.id)
+        if not locked:
+            _logger.info(f"Skipping {operation} of {self.full_name}, another worker is running it")
+        return locked
+
+    def _prune_branches(self, branches):
+        """Archive or remove branches deleted on GitHub according to ``lm_project_github.branch_prune_mode``"""
+        prune_mode = self.env['ir.config_parameter'].sudo().get_param(
+            'lm_project_github.branch_prune_mode', 'archive')
+        if prune_mode == 'unlink':
+            branches.unlink()
+        else:
+            branches.write({'active': False})
+
+    def _remove_branches(self, names):
+        """Prune the branches ``names`` of the repository, the default branch is kept"""
+        self.ensure_one()
+        branches = self.env['project.github.branch'].search([
+            ('repository_id', '=', self.id),
+            ('name', 'in', names),
+            ('is_default', '=', False),
+        ])
+        self._prune_branches(branches)
+        return branches
+
+    def _fetch_graphql_metadata(self):
+        """Return the metadata values, default branch name and branch heads of the repository
+
+        Everything is read through cursor-paginated GraphQL queries: one query
+        per 100 branches instead of one REST call per resource type.
+        """
+        self.ensure_one()
+        github_api = self.env['project.github.api']
+        max_pages = int(self.env['ir.config_parameter'].sudo().get_param(
+            'lm_project_github.branch_max_pages', DEFAULT_BRANCH_MAX_PAGES))
+        variables = {'owner': self.owner, 'name': self.name, 'cursor': None}
+        heads = {}
+        complete = False
+        for _page in range(max_pages):
+            repository = github_api._graphql(REPOSITORY_GRAPHQL_QUERY, variables).get('repository')
+            if not repository:
+                raise UserError(_('Repository "%s" was not found on GitHub.') % self.full_name)
+            refs = repository['refs']
+            heads.update({ref['name']: (ref.get('target') or {}).get('oid') for ref in refs['nodes']})
+            if not refs['pageInfo']['hasNextPage']:
+                complete = True
+                break
+            variables['cursor'] = refs['pageInfo']['endCursor']
+
+        default_branch = repository.get('defaultBranchRef') or {}
+        if default_branch.get('name'):
+            heads.setdefault(default_branch['name'], (default_branch.get('target') or {}).get('oid'))
+        return self._prepare_graphql_metadata_vals(repository), default_branch.get('name'), heads, complete
+
+    @api.model
+    def _prepare_graphql_metadata_vals(self, repository):
+        """Return the metadata values of a GraphQL ``RepositoryMetadata`` node"""
+        visibility = (repository.get('visibility') or '').lower()
+        return {
+            'node_id': repository['id'],
+            'repository_id': str(repository['databaseId']),
+            'name': repository['name'],
+            'full_name': repository['nameWithOwner'],
+            'description': repository.get('description') or False,
+            'private': repository['isPrivate'],
+            'html_url': repository['url'],
+            'clone_url': f"{repository['url']}.git",
+            'ssh_url': repository.get('sshUrl') or False,
+            'language': (repository.get('primaryLanguage') or {}).get('name') or False,
+            'stars_count': repository['stargazerCount'],
+            'forks_count': repository['forkCount'],
+            'open_issues_count': repository['issues']['totalCount'],
+            'archive': repository['isArchived'],
+            'disabled': repository['isDisabled'],
+            'visibility': visibility or False,
+            'created_at': parse_github_datetime(repository.get('createdAt')),
+            'updated_at': parse_github_datetime(repository.get('updatedAt')),
+        }
+
+    @api.model
+    def _prepare_metadata_vals(self, repo):
+        """Return the metadata values of a REST or webhook repository payload"""
+        vals = self.env['project.github.repository.catalogue']._prepare_catalogue_vals(repo)
+        vals = {name: value for name, value in vals.items() if name in self._fields}
+        if repo.get('node_id'):
+            vals['node_id'] = repo['node_id']
+        return vals
+
+    def _apply_metadata(self, metadata):
+        """Write the metadata values that actually changed"""
+        self.ensure_one()
+        changed = {name: value for name, value in metadata.items() if self[name] != value}
+        if changed:
+            self.write(changed)
+        return changed
+
+    def _fetch_fleet_metadata(self, token):
+        """Return the metadata values and default branch name of the repositories
+
+        With GraphQL, the repositories whose node id is known are read by 100
+        in one ``nodes`` query. The others are read from REST with a
+        conditional request, a 304 costs no rate limit, and their node id is
+        recorded for the next refresh. Repositories GitHub no longer returns
+        are left out.
+        """
+        github_api = self.env['project.github.api']
+        result = {}
+        rest = self
+        if github_api._use_graphql():
+            rest = self.filtered(lambda repo: not repo.node_id)
+            for chunk in split_every(GRAPHQL_NODES_PER_QUERY, (self - rest).ids, self.browse):
+                data = github_api._graphql(
+                    REPOSITORY_NODES_GRAPHQL_QUERY, {'ids': chunk.mapped('node_id')}, token=token, partial=True)
+                nodes = {node['id']: node for node in data.get('nodes') or [] if node}
+                for repo in chunk:
+                    node = nodes.get(repo.node_id)
+                    if node:
+                        result[repo] = (
+                            self._prepare_graphql_metadata_vals(node),
+                            (node.get('defaultBranchRef') or {}).get('name'),
+                        )
+        for repo in rest:
+            try:
+                data, _headers = github_api._get_json(f'repos/{repo.full_name}', token=token)
+            except GithubRateLimitError:
+                raise
+            except UserError as e:
+                _logger.warning(f"Failed to refresh the metadata of {repo.full_name}: {e}")
+                continue
+            result[repo] = (self._prepare_metadata_vals(data), data.get('default_branch'))
+        return result
+
+    @instrumented('refresh_metadata')
+    def _refresh_metadata(self, token):
+        """Refresh the metadata of the repositories, writing only what changed
+
+        Repositories with the same changes are written together.
+        """
+        changes = defaultdict(lambda: self.browse())
+        for repo, (vals, default_branch) in self._fetch_fleet_metadata(token).items():
+            changed = {name: value for name, value in vals.items() if repo[name] != value}
+            if changed:
+                changes[tuple(sorted(changed.items()))] |= repo
+            if default_branch and default_branch != repo.default_branch_id.name:
+                repo._apply_branch_heads({default_branch: None}, complete=False)
+                repo._set_default_branch(default_branch)
+        for changed, repos in changes.items():
+            repos.write(dict(changed))
+        self.write({'metadata_refreshed_at': fields.Datetime.now()})
+        return sum(len(repos) for repos in changes.values())
+
+    @api.model
+    def _cron_refresh_metadata(self, limit=None):
+        """Refresh the least recently refreshed connected repositories
+
+        Repositories are grouped by the token of the user who connected them
+        and by company, which decides between GraphQL and REST.
+        """
+        limit = limit or int(self.env['ir.config_parameter'].sudo().get_param(
+            'lm_project_github.metadata_refresh_batch', DEFAULT_METADATA_REFRESH_BATCH))
+        repositories = self.search(
+            [('is_connected', '=', True)],
+            order='metadata_refreshed_at asc nulls first, id',
+            limit=limit,
+        )
+        batches = defaultdict(lambda: self.browse())
+        for repository in repositories:
+            batches[repository.create_uid, repository.company_id] |= repository
+
+        github_api = self.env['project.github.api']
+        for (user, company), batch in batches.items():
+            try:
+                with self.env.cr.savepoint():
+                    batch = batch.with_company(company or user.company_id).with_context(github_priority='low')
+                    updated = batch._refresh_metadata(github_api._get_token(user))
+                _logger.info(f"Refreshed the metadata of {len(batch)} GitHub repositories, {updated} changed")
+            except UserError as e:
+                _logger.warning(f"Failed to refresh the metadata of the GitHub repositories of {user.login}: {e}")
+            self.env.cr.commit()
+
+    @instrumented('sync_branches')
+    def _sync_branches(self):
+        """Synchronise the branches of the repository with GitHub
+
+        With the GraphQL transport enabled on the company, the repository
+        metadata is refreshed in the same queries. Repositories with a local
+        mirror read their branches from it.
+        """
+        self.ensure_one()
+        if not self._try_lock('sync_branches'):
+            Branch = self.env['project.github.branch']
+            return Branch, Branch, Branch
+        if not self.mirror_enabled and self.env['project.github.api']._use_graphql():
+            metadata, default_branch, heads, complete = self._fetch_graphql_metadata()
+            self._apply_metadata(metadata)
+            result = self._apply_branch_heads(heads, complete=complete)
+            if default_branch and default_branch != self.default_branch_id.name:
+                self._set_default_branch(default_branch)
+            return result
+        heads, complete = self._fetch_branch_heads()
+        return self._apply_branch_heads(heads, complete=complete)
+
+    def _sync_mirror(self):
+        """Fetch the local mirror and read the new branches and commits from it
+
+        Returns the number of new commits.
+        """
+        self.ensure_one()
+        if not self._try_lock('sync_mirror'):
+            return 0
+        self._sync_branches()
+        Commit = self.env['project.github.commit']
+        count = 0
+        branches = self.env['project.github.branch'].search([('repository_id', '=', self.id)])
+        # The default branch first: the other branches only walk the history it does not cover
+        for branch in branches.sorted(lambda branch: not branch.is_default):
+            count += Commit._sync_branch_commits(branch)[0]
+        return count
+
+    @api.model
+    def _cron_fetch_mirrors(self, limit=20):
+        """Fetch the local mirrors least recently fetched, then remove the unused ones"""
+        repositories = self.search([
+            ('is_connected', '=', True),
+            ('mirror_enabled', '=', True),
+        ], order='mirror_fetched_at asc nulls first', limit=limit)
+        for repository in repositories:
+            try:
+                with self.env.cr.savepoint():
+                    repository.with_user(repository.create_uid).with_context(github_priority='low')._sync_mirror()
+            except UserError as e:
+                _logger.warning(f"Failed to fetch the mirror of {repository.full_name}: {e}")
+            self.env.cr.commit()
+        self.env['project.github.mirror']._gc_mirrors()
+
+    def action_enable_mirror(self):
+        if not self.env.is_system():
+            raise UserError(_('Only administrators can manage the local mirrors.'))
+        self.write({'mirror_enabled': True})
+        return self.action_fetch_mirror()
+
+    def action_disable_mirror(self):
+        if not self.env.is_system():
+            raise UserError(_('Only administrators can manage the local mirrors.'))
+        # The mirror itself is removed by the next run of the fetch cron
+        self.write({'mirror_enabled': False, 'mirror_fetched_at': False})
+
+    def action_fetch_mirror(self):
+        self.ensure_one()
+        job = self.env['project.github.job']._enqueue(
+            'sync_mirror', self,
+            name=_("Fetch the local mirror of %s", self.full_name),
+        )
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': job.name,
+                'message': _("Mirror fetch queued, you will be notified when it is done."),
+                'type': 'info',
+                'sticky': False,
+            },
+        }
+
+    def _set_default_branch(self, name):
+        """Flag the branch ``name`` as the default branch of the repository"""
+        self.ensure_one()
+        branches = self.env['project.github.branch'].search([('repository_id', '=', self.id)])
+        default = branches.filtered(lambda branch: branch.name == name)
+        (branches.filtered('is_default') - default).write({'is_default': False})
+        if default:
+            default.write({'is_default': True})
+            self.default_branch_id = default
+
+    @instrumented('import_issues')
+    def _import_issues(self, max_pages=None):
+        """Import the issues updated since the cursor of the repository as tasks
+
+        Issues are listed oldest update first so that the cursor moves forward
+        after every page: an interrupted import resumes where it stopped.
+        Returns the number of issues read and whether the backlog is drained.
+        """
+        self.ensure_one()
+        if not self._try_lock('import_issues'):
+            return 0, True
+        max_pages = max_pages or int(self.env['ir.config_parameter'].sudo().get_param(
+            'lm_project_github.issue_max_pages', DEFAULT_ISSUE_MAX_PAGES))
+        params = {'state': 'all', 'sort': 'updated', 'direction': 'asc', 'per_page': 100}
+        if self.issue_synced_at:
+            params['since'] = format_github_datetime(self.issue_synced_at)
+
+        Task = self.env['project.task']
+        count = pages = 0
+        for page in self.env['project.github.api']._iter_json_pages(
+                f'repos/{self.full_name}/issues', params=params, max_pages=max_pages):
+            pages += 1
+            Task._upsert_github_issues(self.project_id, page)
+            count += len(page)
+            cursor = parse_github_datetime(page[-1].get('updated_at'))
+            if cursor:
+                self.issue_synced_at = cursor
+        _logger.info(f"Imported {count} issues of {self.full_name}")
+        return count, pages < max_pages
+
+    @api.model
+    def _cron_import_issues(self, limit=20):
+        """Import the issues of the repositories of projects importing them"""
+        repositories = self.search([
+            ('is_connected', '=', True),
+            ('project_id.import_issues', '=', True),
+        ], order='issue_synced_at asc nulls first', limit=limit)
+        for repository in repositories:
+            try:
+                with self.env.cr.savepoint():
+                    repository.with_user(repository.create_uid).with_context(
+                        github_priority='low')._import_issues()
+            except UserError as e:
+                _logger.warning(f"Failed to import the GitHub issues of {repository.full_name}: {e}")
+            self.env.cr.commit()
+
+    @instrumented('sync_pull_requests')
+    def _sync_pull_requests(self, max_pages=None):
+        """Read the pull requests updated since the cursor of the repository
+
+        GitHub lists pull requests without a ``since`` filter: they are read
+        most recently updated first, until the cursor is reached. A run
+        stopped by the page cap records the next page and the next run resumes
+        there: pull requests updated meanwhile only move to the top of the
+        listing, the unread ones are never skipped. The cursor only moves once
+        the listing reached it. The first run reads the most recent
+        ``max_pages`` pages. Returns the number of pull requests read.
+        """
+        self.ensure_one()
+        if not self._try_lock('sync_pull_requests'):
+            return 0
+        max_pages = max_pages or int(self.env['ir.config_parameter'].sudo().get_param(
+            'lm_project_github.pull_request_max_pages', DEFAULT_PULL_REQUEST_MAX_PAGES))
+        params = {'state': 'all', 'sort': 'updated', 'direction': 'desc', 'per_page': 100}
+
+        PullRequest = self.env['project.github.pull_request']
+        cursor = self.pull_request_synced_at
+        first_page = self.pull_request_resume_page or 1
+        latest = self.pull_request_resume_at
+        count = read = 0
+        reached = True
+        pages = self.env['project.github.api']._iter_json_pages(
+            f'repos/{self.full_name}/pulls', params=params, max_pages=max_pages, first_page=first_page)
+        for page in pages:
+            read += 1
+            latest = latest or parse_github_datetime(page[0].get('updated_at'))
+            pulls = [pull for pull in page if not cursor or parse_github_datetime(pull.get('updated_at')) >= cursor]
+            PullRequest._upsert_pull_requests(self, pulls)
+            count += len(pulls)
+            if len(pulls) < len(page):
+                reached = True
+                break
+            reached = read < max_pages or len(page) < 100
+        if reached or not cursor:
+            self.write({
+                'pull_request_synced_at': latest or cursor,
+                'pull_request_resume_page': 0,
+                'pull_request_resume_at': False,
+            })
+        else:
+            self.write({'pull_request_resume_page': first_page + read, 'pull_request_resume_at': latest})
+        _logger.info(f"Read {count} pull requests of {self.full_name}")
+        return count
+
+    @api.model
+    def _cron_sync_pull_requests(self, limit=20):
+        """Read the updated pull requests of the connected repositories"""
+        repositories = self.search([
+            ('is_connected', '=', True),
+        ], order='pull_request_synced_at asc nulls first', limit=limit)
+        for repository in repositories:
+            try:
+                with self.env.cr.savepoint():
+                    repository.with_user(repository.create_uid).with_context(
+                        github_priority='low')._sync_pull_requests()
+            except UserError as e:
+                _logger.warning(f"Failed to read the GitHub pull requests of {repository.full_name}: {e}")
+            self.env.cr.commit()
+
+    def _get_webhook_url(self):
+        self.ensure_one()
+        return f"{self.get_base_url()}/lm_project_github/webhook/{self.id}"
+
+    def _register_webhook(self):
+        """Register the webhook delivering the repository events to this database
+
+        Each repository gets its own secret, used by the controller to check
+        the signature of the deliveries. Returns False when a webhook is
+        already registered.
+        """
+        self.ensure_one()
+        if self.webhook_id:
+            return False
+        github_api = self.env['project.github.api']
+        secret = secrets.token_hex(32)
+        response = github_api._post(f'repos/{self.full_name}/hooks', json={
+            'name': 'web',
+            'active': True,
+            'events': WEBHOOK_EVENTS,
+            'config': {
+                'url': self._get_webhook_url(),
+                'content_type': 'json',
+                'secret': secret,
+                'insecure_ssl': '0',
+            },
+        })
+        github_api._check_response(
+            response,
+            not_found_message=_('Admin rights on repository "%s" are required to register a webhook.') % self.full_name,
+        )
+        self.sudo().write({'webhook_id': str(response.json()['id']), 'webhook_secret': secret})
+        return True
+
+    def action_register_webhook(self):
+        self.ensure_one()
+        job = self.env['project.github.job']._enqueue(
+            'register_webhook', self,
+            name=_("Register the webhook of %s", self.full_name),
+        )
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': job.name,
+                'message': _("Webhook registration queued, you will be notified when it is done."),
+                'type': 'info',
+                'sticky': False,
+            },
+        }
+
+    def action_browse_files(self):
+        """Open the file browser at the default branch"""
+        self.ensure_one()
+        browser = self.env['project.github.file.browser'].create({
+            'repository_id': self.id,
+            'branch_id': self.default_branch_id.id,
+        })
+        if browser.branch_id:
+            browser._load()
+        return browser._get_action()
+
     def action_view_form(self):
         self.ensure_one()
         return {
@@ -66,40 +788,30 @@ class ProjectGithubRepository(models.Model):
             "target": "new",
         }
 
-    @api.depends("repository_id")
     def _compute_repository_info_html(self):
         for record in self:
-            fields_config = [
-                {'label': 'Name', 'value': record.name or ''},
-                {'label': 'ID', 'value': record.repository_id or ''},
-                {'label': 'Owner', 'value': record.owner or ''},
-                {'label': 'Description', 'value': record.description or ''},
-                {'label': 'Private', 'value': 'Yes' if record.private else 'No'},
-                {'label': 'Full Name', 'value': record.full_name or ''},
-                {'label': 'URL', 'value': f'<a href="{record.html_url}" target="_blank">{record.html_url}</a>' if record.html_url else ''},
-                {'label': 'Clone URL', 'value': record.clone_url or ''},
-                {'label': 'SSH URL', 'value': record.ssh_url or ''},
-                {'label': 'Primary Language', 'value': record.language or ''},
-                {'label': 'Stars', 'value': record.stars_count or 0},
-                {'label': 'Forks', 'value': record.forks_count or 0},
-                {'label': 'Open Issues', 'value': record.open_issues_count or 0},
-                {'label': 'Archived', 'value': 'Yes' if record.archive else 'No'},
-                {'label': 'Disabled', 'value': 'Yes' if record.disabled else 'No'},
-                {'label': 'Visibility', 'value': f'Public' if record.visibility == 'public' else ("Private" if record.visibility == "private" else record.visibility)},
-                {'label': 'Created At', 'value': fields.Datetime.to_string(record.created_at) if record.created_at else ''},
-                {'label': 'Updated At', 'value': fields.Datetime.to_string(record.updated_at) if record.updated_at else ''},
-            ]
-            html = '<table style="width: 100%; border-collapse: collapse; margin: 10px;">'
-            for field_data in fields_config:
-                html += f'''
-                            <tr>
-                                <td style="padding: 8px; border: 1px solid #ddd; font-weight: bold; background-color: #f5f5f5; width: 200px;">
-                                    {field_data['label']}
-                                </td>
-                                <td style="padding: 8px; border: 1px solid #ddd;">
-                                    {field_data['value']}
-                                </td>
-                            </tr>
-                            '''
-            html += '</table>'
-            record.repository_info_html = html
+            if isinstance(record.id, int):
+                values = tuple(record[name] for name in REPOSITORY_INFO_FIELDS) + (record.default_branch_id.name,)
+                record.repository_info_html = self._get_repository_info_html(record.id, values)
+            else:
+                record.repository_info_html = record._render_repository_info()
+
+    def _render_repository_info(self):
+        self.ensure_one()
+        return self.env['ir.qweb']._render('lm_project_github.repository_info_table', {
+            'repo': self,
+            'default_branch': self.default_branch_id.name,
+            'show_id': True,
+        })
+
+    @api.model
+    @tools.ormcache('repository_id', 'values', 'self.env.lang')
+    def _get_repository_info_html(self, repository_id, values):
+        """Return the rendered information table of a repository
+
+        ``values`` are the displayed values of the repository, which are part
+        of the cache key: a changed repository is rendered again while the
+        stale entry ages out of the LRU cache. Unlike the ``write_date``, they
+        also change between two writes of one transaction.
+        """
+        return self.browse(repository_id)._render_repository_info()
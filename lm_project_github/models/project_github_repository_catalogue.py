@@ -0,0 +1,174 @@
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+
+from .project_github_api import DEFAULT_MAX_PAGES, parse_github_datetime
+from .project_github_metric import instrumented
+
+_logger = logging.getLogger(__name__)
+
+# Incremental refreshes overlap the previous one to absorb clock skew
+CATALOGUE_REFRESH_MARGIN = timedelta(minutes=5)
+# A full listing (which also drops deleted repositories) is done at least this often
+CATALOGUE_FULL_REFRESH_INTERVAL = timedelta(days=1)
+
+
+class ProjectGithubRepositoryCatalogue(models.Model):
+    _name = "project.github.repository.catalogue"
+    _description = "GitHub Repository Catalogue"
+    _order = "updated_at desc, id desc"
+
+    user_id = fields.Many2one(
+        comodel_name="res.users",
+        string="User",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    name = fields.Char(string="Repository Name", required=True)
+    repository_id = fields.Char(string="ID", required=True, readonly=True)
+    owner = fields.Char(string="Owner", required=True)
+    description = fields.Text(string="Description", readonly=True)
+    private = fields.Boolean(string="Private", readonly=True)
+    full_name = fields.Char(string="Full Name", readonly=True)
+    html_url = fields.Char(string="URL", readonly=True)
+    clone_url = fields.Char(string="Clone URL", readonly=True)
+    ssh_url = fields.Char(string="SSH URL", readonly=True)
+    default_branch = fields.Char(string="Default Branch", readonly=True)
+    language = fields.Char(string="Primary Language", readonly=True)
+    stars_count = fields.Integer(string="Stars", readonly=True)
+    forks_count = fields.Integer(string="Forks", readonly=True)
+    open_issues_count = fields.Integer(string="Open Issues", readonly=True)
+    archive = fields.Boolean(string="Archived", readonly=True)
+    disabled = fields.Boolean(string="Disabled", readonly=True)
+    visibility = fields.Char(string="Visibility", readonly=True)
+    created_at = fields.Datetime(string="Created At", readonly=True)
+    updated_at = fields.Datetime(string="Updated At", readonly=True)
+    pushed_at = fields.Datetime(string="Pushed At", readonly=True)
+
+    _sql_constraints = [
+        ('unique_user_repository', 'unique(user_id, repository_id)',
+         'A repository can only appear once in the catalogue of a user.'),
+    ]
+
+    @api.model
+    def _prepare_catalogue_vals(self, repo):
+        """Return the catalogue values of a GitHub repository payload"""
+        return {
+            'name': repo.get('name') or '',
+            'repository_id': str(repo.get('id', '')),
+            'owner': (repo.get('owner') or {}).get('login') or '',
+            'description': repo.get('description') or False,
+            'private': repo.get('private', False),
+            'full_name': repo.get('full_name') or False,
+            'html_url': repo.get('html_url') or False,
+            'clone_url': repo.get('clone_url') or False,
+            'ssh_url': repo.get('ssh_url') or False,
+            'default_branch': repo.get('default_branch') or 'main',
+            'language': repo.get('language') or False,
+            'open_issues_count': repo.get('open_issues_count', 0),
+            'stars_count': repo.get('stargazers_count', 0),
+            'forks_count': repo.get('forks_count', 0),
+            'archive': repo.get('archived', False),
+            'disabled': repo.get('disabled', False),
+            'visibility': repo.get('visibility') or 'public',
+            'created_at': parse_github_datetime(repo.get('created_at')),
+            'updated_at': parse_github_datetime(repo.get('updated_at')),
+            'pushed_at': parse_github_datetime(repo.get('pushed_at')),
+        }
+
+    @api.model
+    def _upsert_catalogue(self, user, repositories, prune=False):
+        """Create or update the catalogue entries of a user in batch
+
+        Only entries whose values changed are written. With ``prune``, the
+        repositories are a complete listing and entries missing from it are
+        removed.
+        """
+        vals_by_id = {}
+        for repo in repositories:
+            vals = self._prepare_catalogue_vals(repo)
+            vals_by_id[vals['repository_id']] = vals
+
+        domain = [('user_id', '=', user.id)]
+        if not prune:
+            domain.append(('repository_id', 'in', list(vals_by_id)))
+        existing = self.sudo().search(domain)
+
+        to_unlink = self.sudo()
+        for entry in existing:
+            vals = vals_by_id.pop(entry.repository_id, None)
+            if vals is None:
+                to_unlink |= entry
+                continue
+            changed = {name: value for name, value in vals.items() if entry[name] != value}
+            if changed:
+                entry.write(changed)
+
+        to_unlink.unlink()
+        self.sudo().create([dict(vals, user_id=user.id) for vals in vals_by_id.values()])
+
+    @api.model
+    @instrumented('refresh_catalogue')
+    def _refresh_user_catalogue(self, user, full=False):
+        """Refresh the catalogue of a user from GitHub
+
+        A full refresh lists every repository of the token. Otherwise only the
+        delta since the last refresh is read: ``/user/repos`` is walked sorted
+        by ``updated`` and stops at the first page older than the last
+        refresh. Returns the number of repositories read.
+        """
+        user = user.sudo()
+        github_api = self.env['project.github.api'].with_company(user.company_id)
+        token = github_api._get_token(user)
+        now = fields.Datetime.now()
+        cutoff = not full and user.git_catalogue_refreshed_at
+        params = {'type': 'all', 'sort': 'updated', 'direction': 'desc', 'per_page': 100}
+
+        if cutoff:
+            cutoff -= CATALOGUE_REFRESH_MARGIN
+            max_pages = int(self.env['ir.config_parameter'].sudo().get_param(
+                'lm_project_github.fetch_max_pages', DEFAULT_MAX_PAGES))
+            repositories = []
+            for page in range(1, max_pages + 1):
+                data, headers = github_api._get_json('user/repos', token=token, params=dict(params, page=page))
+                repositories.extend(
+                    repo for repo in data if (parse_github_datetime(repo.get('updated_at')) or now) >= cutoff
+                )
+                if (not data or page >= github_api._get_last_page(headers)
+                        or (parse_github_datetime(data[-1].get('updated_at')) or now) < cutoff):
+                    break
+            truncated = user.git_catalogue_truncated
+        else:
+            repositories, truncated = github_api._get_json_pages('user/repos', token=token, params=params)
+
+        self._upsert_catalogue(user, repositories, prune=not cutoff and not truncated)
+        user_vals = {'git_catalogue_refreshed_at': now, 'git_catalogue_truncated': truncated}
+        if not cutoff:
+            user_vals['git_catalogue_full_refresh_at'] = now
+        user.write(user_vals)
+        _logger.info(f"Refreshed GitHub catalogue of {user.login}: {len(repositories)} repositories read")
+        return len(repositories)
+
+    @api.model
+    def _cron_refresh_catalogues(self, limit=50):
+        """Incrementally refresh the catalogues of the users with a GitHub token"""
+        users = self.env['res.users'].sudo().search(
+            [('git_token', '!=', False)],
+            order='git_catalogue_refreshed_at asc nulls first',
+            limit=limit,
+        )
+        full_before = fields.Datetime.now() - CATALOGUE_FULL_REFRESH_INTERVAL
+        for user in users:
+            full = not user.git_catalogue_full_refresh_at or user.git_catalogue_full_refresh_at < full_before
+            try:
+                with self.env.cr.savepoint():
+                    self.with_context(github_priority='low')._refresh_user_catalogue(user, full=full)
+            except UserError as e:
+                _logger.warning(f"Failed to refresh the GitHub catalogue of {user.login}: {e}")
+            except Exception:
+                _logger.exception(f"Unexpected error while refreshing the GitHub catalogue of {user.login}")
+            # The catalogues already refreshed are kept if a later user fails
+            self.env.cr.commit()
@@ -0,0 +1,293 @@
+import hashlib
+import hmac
+import json
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import api, fields, models, _
+from odoo.tools import SQL
+
+from .project_github_ci_status import check_suite_key, check_suite_state, commit_status_state
+from .project_github_commit import PUSH_COMMITS_LIMIT
+from .project_github_metric import instrumented
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_DELIVERY_BATCH_SIZE = 1000
+DEFAULT_DELIVERY_RETENTION_DAYS = 7
+DEFAULT_DELIVERY_RETENTION_COUNT = 100000
+
+
+def verify_signature(secret, body, signature):
+    """Check the ``X-Hub-Signature-256`` header of a delivery against its raw body"""
+    if not secret or not signature or not signature.startswith('sha256='):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len('sha256='):])
+
+
+class ProjectGithubWebhookDelivery(models.Model):
+    _name = 'project.github.webhook.delivery'
+    _description = 'GitHub Webhook Delivery'
+    _order = 'id desc'
+
+    delivery_guid = fields.Char(string='Delivery', readonly=True, help='X-GitHub-Delivery header of the delivery')
+    event = fields.Char(string='Event', required=True, readonly=True)
+    action = fields.Char(string='Action', readonly=True)
+    repository_id = fields.Many2one(
+        comodel_name='project.github.repository',
+        string='Repository',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+        index=True,
+    )
+    payload = fields.Text(string='Payload', readonly=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='State', default='pending', required=True, readonly=True, index=True)
+    error = fields.Text(string='Error', readonly=True)
+    processed_at = fields.Datetime(string='Processed At', readonly=True, index=True)
+
+    _sql_constraints = [
+        ('unique_delivery_guid', 'unique(delivery_guid)', 'This webhook delivery was already received.'),
+    ]
+
+    @api.model
+    def _enqueue_delivery(self, repository, event, delivery_guid, body):
+        """Store a verified delivery and wake up the consumer
+
+        Redeliveries of a delivery already received are ignored, unless it
+        failed: it is then queued again. Returns whether the delivery was
+        queued.
+        """
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO %(table)s (delivery_guid, event, repository_id, payload, state,
+                                   create_uid, create_date, write_uid, write_date)
+            VALUES (%(guid)s, %(event)s, %(repository_id)s, %(payload)s, 'pending',
+                    %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC')
+            ON CONFLICT (delivery_guid) DO UPDATE
+               SET state = 'pending', error = NULL, processed_at = NULL
+             WHERE %(table)s.state = 'failed'
+            """,
+            table=SQL.identifier(self._table),
+            guid=delivery_guid,
+            event=event,
+            repository_id=repository.id,
+            payload=body.decode(),
+            uid=self.env.uid,
+        ))
+        if not self.env.cr.rowcount:
+            return False
+        self.env.ref('lm_project_github.ir_cron_github_webhook_consumer')._trigger()
+        return True
+
+    @api.model
+    def _cron_process_deliveries(self, limit=None):
+        """Apply the pending deliveries in batches, one repository at a time
+
+        The deliveries of a repository are folded in the order GitHub sent
+        them, so that a push storm on a branch ends up as a single write of
+        its last head. A batch that fails is replayed delivery by delivery to
+        isolate the faulty one.
+        """
+        limit = limit or int(self.env['ir.config_parameter'].sudo().get_param(
+            'lm_project_github.webhook_batch_size', DEFAULT_DELIVERY_BATCH_SIZE))
+        deliveries = self.search([('state', '=', 'pending')], order='id asc', limit=limit)
+        deliveries_by_repository = defaultdict(lambda: self.browse())
+        for delivery in deliveries:
+            deliveries_by_repository[delivery.repository_id] |= delivery
+
+        for repository, batch in deliveries_by_repository.items():
+            try:
+                with self.env.cr.savepoint():
+                    batch._process()
+                batch.write({'state': 'done', 'processed_at': fields.Datetime.now()})
+            except Exception:
+                _logger.warning(f"Batch of {len(batch)} GitHub deliveries for {repository.full_name} failed, "
+                                f"applying them one by one", exc_info=True)
+                self.env.invalidate_all()
+                for delivery in batch:
+                    try:
+                        with self.env.cr.savepoint():
+                            delivery._process()
+                        delivery.write({'state': 'done', 'processed_at': fields.Datetime.now()})
+                    except Exception as e:
+                        _logger.exception(f"Failed to process GitHub {delivery.event} delivery "
+                                          f"{delivery.delivery_guid}")
+                        delivery.write({'state': 'failed', 'error': str(e), 'processed_at': fields.Datetime.now()})
+            self.env.cr.commit()
+
+        if len(deliveries) == limit:
+            self.env.ref('lm_project_github.ir_cron_github_webhook_consumer')._trigger()
+
+    @instrumented('webhook_apply')
+    def _process(self):
+        """Fold the deliveries of one repository, in order, and apply the result"""
+        repository = self.repository_id
+        repository.ensure_one()
+        changes = {
+            'heads': {},
+            'pushes': {},
+            'issues': {},
+            'pull_requests': {},
+            'ci': defaultdict(dict),
+            'removed': set(),
+            'metadata': {},
+            'default_branch': None,
+            'deleted': False,
+        }
+        actions = defaultdict(list)
+        for delivery in self.sorted('id'):
+            payload = json.loads(delivery.payload)
+            actions[payload.get('action') or False].append(delivery.id)
+            merge = getattr(delivery, f'_merge_{delivery.event}', None)
+            if merge:
+                merge(changes, payload)
+        # One write per distinct action instead of one per delivery
+        for action, delivery_ids in actions.items():
+            self.browse(delivery_ids).write({'action': action})
+        self._apply_changes(repository, changes)
+
+    @api.model
+    def _apply_changes(self, repository, changes):
+        if changes['removed']:
+            repository._remove_branches(list(changes['removed']))
+        if changes['heads']:
+            repository._apply_branch_heads(changes['heads'], complete=False)
+        for name, push in changes['pushes'].items():
+            self.env['project.github.commit']._ingest_push(repository, name, push)
+        if (changes['pushes'] or changes['removed']) and repository.mirror_enabled:
+            # The diff stats of the pushed commits come with the next fetch of the mirror
+            self.env['project.github.job']._enqueue(
+                'sync_mirror', repository, name=_("Fetch the local mirror of %s", repository.full_name),
+                priority='low')
+        if changes['pull_requests']:
+            self.env['project.github.pull_request']._upsert_pull_requests(
+                repository, list(changes['pull_requests'].values()))
+        if changes['ci']:
+            self.env['project.github.ci.status']._fold(repository, changes['ci'])
+        if changes['issues'] and repository.project_id.import_issues:
+            self.env['project.task']._upsert_github_issues(repository.project_id, changes['issues'].values())
+        if changes['metadata']:
+            changed = repository._apply_metadata(changes['metadata'])
+            if 'html_url' in changed and repository.project_id:
+                repository.project_id.github_url = changed['html_url']
+        default_branch = changes['default_branch']
+        if default_branch and default_branch != repository.default_branch_id.name:
+            repository._apply_branch_heads({default_branch: None}, complete=False)
+            repository._set_default_branch(default_branch)
+        if changes['deleted']:
+            repository.is_connected = False
+            if repository.project_id:
+                repository.project_id.message_post(
+                    body=_("Repository %s was deleted on GitHub.", repository.full_name))
+
+    def _merge_push(self, changes, payload):
+        ref = payload.get('ref') or ''
+        if not ref.startswith('refs/heads/'):
+            return
+        name = ref[len('refs/heads/'):]
+        if payload.get('deleted'):
+            changes['heads'].pop(name, None)
+            changes['pushes'].pop(name, None)
+            changes['removed'].add(name)
+            return
+        changes['heads'][name] = payload.get('after')
+        changes['removed'].discard(name)
+
+        # Consecutive pushes to a branch are ingested as one
+        commits = payload.get('commits') or []
+        complete = len(commits) < PUSH_COMMITS_LIMIT
+        push = changes['pushes'].get(name)
+        if push:
+            push['complete'] = push['complete'] and complete and push['after'] == payload.get('before')
+            push['after'] = payload.get('after')
+            push['commits'].extend(commits)
+        else:
+            changes['pushes'][name] = {
+                'before': payload.get('before'),
+                'after': payload.get('after'),
+                'commits': list(commits),
+                'complete': complete,
+            }
+
+    def _merge_create(self, changes, payload):
+        if payload.get('ref_type') == 'branch':
+            # The head arrives with the push event that follows
+            changes['heads'].setdefault(payload['ref'], None)
+            changes['removed'].discard(payload['ref'])
+
+    def _merge_delete(self, changes, payload):
+        if payload.get('ref_type') == 'branch':
+            changes['heads'].pop(payload['ref'], None)
+            changes['removed'].add(payload['ref'])
+
+    def _merge_repository(self, changes, payload):
+        if payload.get('action') == 'deleted':
+            changes['deleted'] = True
+            return
+        data = payload.get('repository') or {}
+        changes['metadata'].update(self.repository_id._prepare_metadata_vals(data))
+        changes['default_branch'] = data.get('default_branch') or changes['default_branch']
+
+    def _merge_issues(self, changes, payload):
+        self._merge_open_issues_count(changes, payload)
+        issue = payload.get('issue')
+        if issue and payload.get('action') != 'deleted':
+            # The last state of an issue wins
+            changes['issues'][issue['id']] = issue
+
+    def _merge_pull_request(self, changes, payload):
+        self._merge_open_issues_count(changes, payload)
+        pull = payload.get('pull_request')
+        if pull:
+            # The last state of a pull request wins
+            changes['pull_requests'][pull['number']] = pull
+
+    def _merge_check_suite(self, changes, payload):
+        suite = payload.get('check_suite') or {}
+        if suite.get('head_branch') and suite.get('head_sha'):
+            changes['ci'][suite['head_branch'], suite['head_sha']][check_suite_key(suite)] = check_suite_state(suite)
+
+    def _merge_status(self, changes, payload):
+        sha = payload.get('sha')
+        state = commit_status_state(payload.get('state'))
+        # The branches whose head is the commit, as listed by GitHub
+        for branch in payload.get('branches') or []:
+            if (branch.get('commit') or {}).get('sha') == sha:
+                changes['ci'][branch['name'], sha][f"status:{payload.get('context') or 'default'}"] = state
+
+    def _merge_open_issues_count(self, changes, payload):
+        count = (payload.get('repository') or {}).get('open_issues_count')
+        if count is not None:
+            changes['metadata']['open_issues_count'] = count
+
+    @api.model
+    def _gc_deliveries(self):
+        """Remove the processed deliveries beyond the retention age or count"""
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        retention_days = int(get_param('lm_project_github.webhook_retention_days', DEFAULT_DELIVERY_RETENTION_DAYS))
+        retention_count = int(get_param('lm_project_github.webhook_retention_count', DEFAULT_DELIVERY_RETENTION_COUNT))
+        self.env.cr.execute(SQL(
+            """
+            DELETE FROM %(table)s
+             WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, processed_at, ROW_NUMBER() OVER (ORDER BY id DESC) AS position
+                      FROM %(table)s
+                     WHERE state != 'pending'
+                ) ranked
+                WHERE ranked.processed_at < %(cutoff)s OR ranked.position > %(retention_count)s
+             )
+            """,
+            table=SQL.identifier(self._table),
+            cutoff=fields.Datetime.now() - timedelta(days=retention_days),
+            retention_count=retention_count,
+        ))
+        if self.env.cr.rowcount:
+            _logger.info(f"Removed {self.env.cr.rowcount} processed GitHub webhook deliveries")
@@ -0,0 +1,135 @@
+from odoo import fields, models, api
+from odoo.tools import html2plaintext, plaintext2html
+
+from odoo.addons.project.models.project_task import CLOSED_STATES
+
+from .project_github_ci_status import CI_STATES
+
+# Task fields reflected on the GitHub issue
+ISSUE_SYNC_FIELDS = {'name', 'description', 'state'}
+
+
+class ProjectTask(models.Model):
+    _inherit = "project.task"
+
+    github_commit_ids = fields.Many2many(
+        comodel_name="project.github.commit",
+        relation="project_github_commit_project_task_rel",
+        column1="task_id",
+        column2="commit_id",
+        string="Commits",
+        readonly=True,
+        help="GitHub commits referencing this task with the commit prefix of its project.",
+    )
+    github_commit_count = fields.Integer(string="Commit Count", compute="_compute_github_commit_count")
+
+    github_pull_request_ids = fields.One2many(
+        comodel_name="project.github.pull_request",
+        inverse_name="task_id",
+        string="Pull Requests",
+        readonly=True,
+    )
+
+    github_ci_state = fields.Selection(
+        CI_STATES,
+        string="Build",
+        compute="_compute_github_ci_state",
+        store=True,
+        help="Build state of the branch of the open pull request of the task, or of its last pull request",
+    )
+
+    # Issues management
+    github_issue_id = fields.Char(string="GitHub Issue ID", readonly=True, copy=False, index="btree_not_null")
+    github_issue_number = fields.Integer(string="GitHub Issue", readonly=True, copy=False)
+    github_issue_url = fields.Char(string="GitHub Issue URL", readonly=True, copy=False)
+
+    @api.depends("github_commit_ids")
+    def _compute_github_commit_count(self):
+        for task in self:
+            task.github_commit_count = len(task.github_commit_ids)
+
+    @api.depends("github_pull_request_ids.state", "github_pull_request_ids.branch_id.ci_state")
+    def _compute_github_ci_state(self):
+        for task in self:
+            pulls = task.github_pull_request_ids.sorted(
+                lambda pull: (pull.state in ("open", "draft"), pull.number), reverse=True)
+            task.github_ci_state = pulls[:1].branch_id.ci_state or False
+
+    @api.model
+    def _lookup_by_github_issue_id(self, issue_id):
+        """Return the task synchronised with a GitHub issue id, through its index"""
+        return self.with_context(active_test=False).search([('github_issue_id', '=', str(issue_id))], limit=1)
+
+    @api.model
+    def _prepare_task_vals_from_issue(self, issue, task=None):
+        """Return the task values of a GitHub issue payload, only the changed ones for an existing task"""
+        if issue.get("state") == "closed":
+            state = "1_canceled" if issue.get("state_reason") == "not_planned" else "1_done"
+        else:
+            state = "01_in_progress" if task and task.state in CLOSED_STATES else None
+        body = (issue.get("body") or "").strip()
+        vals = {
+            "name": issue.get("title") or "",
+            "github_issue_id": str(issue["id"]),
+            "github_issue_number": issue["number"],
+            "github_issue_url": issue.get("html_url"),
+        }
+        if state:
+            vals["state"] = state
+        if not task:
+            vals["description"] = plaintext2html(body) if body else False
+            return vals
+        if html2plaintext(task.description or "").strip() != body:
+            vals["description"] = plaintext2html(body) if body else False
+        return {name: value for name, value in vals.items() if name == "description" or task[name] != value}
+
+    @api.model
+    def _upsert_github_issues(self, project, issues):
+        """Create or update the tasks of a chunk of GitHub issues
+
+        The existing tasks of the chunk are found with a single query on the
+        indexed issue id, new tasks are created in one batch and existing ones
+        only get their changed values written. Pull requests are skipped.
+        Returns the created and updated tasks.
+        """
+        issues = {str(issue["id"]): issue for issue in issues if "pull_request" not in issue}
+        Task = self.with_context(
+            github_issue_sync=True,
+            active_test=False,
+            mail_create_nolog=True,
+            mail_notrack=True,
+        )
+        existing = Task.search([("project_id", "=", project.id), ("github_issue_id", "in", list(issues))])
+        updated = Task.browse()
+        for task in existing:
+            vals = self._prepare_task_vals_from_issue(issues.pop(task.github_issue_id), task)
+            if vals:
+                task.write(vals)
+                updated |= task
+        created = Task.create([
+            dict(self._prepare_task_vals_from_issue(issue), project_id=project.id)
+            for issue in issues.values()
+        ])
+        return created, updated
+
+    def _get_issue_sync_tasks(self):
+        """Return the tasks whose issue must be created or updated on GitHub"""
+        if self.env.context.get("github_issue_sync"):
+            return self.browse()
+        return self.filtered(lambda task: task.project_id.is_connected_github and (
+            task.project_id.auto_update_issues if task.github_issue_number
+            else task.project_id.auto_create_issues
+        ))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        tasks = super().create(vals_list)
+        # The issues are sent by a cron, saving never waits for GitHub
+        self.env["project.github.issue.outbox"]._enqueue_tasks(tasks._get_issue_sync_tasks())
+        return tasks
+
+    def write(self, vals):
+        res = super().write(vals)
+        if ISSUE_SYNC_FIELDS.intersection(vals):
+            self.env["project.github.issue.outbox"]._enqueue_tasks(self._get_issue_sync_tasks())
+        return res
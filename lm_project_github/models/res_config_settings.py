@@ -11,6 +11,10 @@ class ResCompany(models.Model):
     github_instance_url = fields.Char(
         string='GitHub Instance URL',
     )
+    github_use_graphql = fields.Boolean(
+        string='Use GitHub GraphQL API',
+        help='Fetch repository metadata and branches in bulk through the GraphQL API',
+    )
 
 
 class ResConfigSettings(models.TransientModel):
@@ -33,3 +37,15 @@ class ResConfigSettings(models.TransientModel):
         readonly=False,
         help='The base URL of your GitHub instance.',
     )
+    github_use_graphql = fields.Boolean(
+        string='Use GitHub GraphQL API',
+        related='company_id.github_use_graphql',
+        readonly=False,
+        help='Fetch repository metadata, default branch, branch heads and open issues in one query.',
+    )
+    github_metrics_token = fields.Char(
+        string='Metrics Token',
+        config_parameter='lm_project_github.metrics_token',
+        groups='base.group_system',
+        help='Bearer token of the Prometheus endpoint /lm_project_github/metrics, which is disabled when empty.',
+    )
@@ -1,9 +1,10 @@
 from odoo import fields, models, api
 import hashlib
-import requests
-from requests.auth import HTTPBasicAuth
+import logging
 from odoo.exceptions import UserError
 
+_logger = logging.getLogger(__name__)
+
 
 class ResUsers(models.Model):
     _inherit = 'res.users'
@@ -21,6 +22,29 @@ class ResUsers(models.Model):
     is_connected = fields.Boolean(
         string='Connected to Github',
     )
+    git_catalogue_refreshed_at = fields.Datetime(
+        string='Repository Catalogue Refreshed At',
+        readonly=True,
+        help='Last refresh of the GitHub repository catalogue of the user',
+    )
+    git_catalogue_full_refresh_at = fields.Datetime(
+        string='Repository Catalogue Fully Refreshed At',
+        readonly=True,
+    )
+    git_catalogue_truncated = fields.Boolean(
+        string='Repository Catalogue Truncated',
+        readonly=True,
+        help='The last full listing reached the configured page limit',
+    )
+
+    def _reset_git_catalogue(self):
+        """Drop the repository catalogue, e.g. when the token changes"""
+        self.env['project.github.repository.catalogue'].sudo().search([('user_id', 'in', self.ids)]).unlink()
+        self.sudo().write({
+            'git_catalogue_refreshed_at': False,
+            'git_catalogue_full_refresh_at': False,
+            'git_catalogue_truncated': False,
+        })
 
     def action_config_git_connection(self):
         self.ensure_one()
@@ -41,18 +65,8 @@ class ResUsers(models.Model):
         if not self.git_username or not self.git_token:
             raise UserError("GitHub credentials are not set.")
 
-        # Here you would implement the actual connection test to GitHub
-        # For demonstration, we'll just simulate a successful connection
-        # In a real scenario, you might use requests or a GitHub API client
-
-        # Simulated connection test
         try:
-            # Simulate API call to GitHub
-            response = requests.get(
-                'https://api.github.com/user',
-                auth=HTTPBasicAuth(self.git_username, self.git_token),
-                timeout=10
-            )
+            response = self.env['project.github.api']._get('user', token=self.git_token, timeout=10)
             if response.status_code == 200:
                 self.write({'is_connected': True})
                 msg = f"Connected as {response.json().get('login')}"
@@ -61,7 +75,7 @@ class ResUsers(models.Model):
                 self.write({'is_connected': False})
                 msg = f"Connection failed: {response.json().get('message')}"
                 msg_type = "danger"
-                print('GitHub connection test failed with status code:', response.status_code)
+                _logger.warning('GitHub connection test failed with status code: %s', response.status_code)
         except Exception as e:
             self.write({'is_connected': False})
             raise UserError(f"Failed to connect to GitHub: {str(e)}")
@@ -82,6 +96,7 @@ class ResUsers(models.Model):
         self.git_username = False
         self.git_token = False
         self.is_connected = False
+        self._reset_git_catalogue()
         return {
             "type": "ir.actions.client",
             "tag": "reload",
@@ -14,3 +14,22 @@ GitConnectionStatus.template = "lm_project_git.GitConnectionStatus";
 registry.category("fields").add("git_connection_status", {
     component: GitConnectionStatus,
 });
+
+class GitBuildStatus extends Component {
+    get state() {
+        return this.props.record.data[this.props.name];
+    }
+
+    get label() {
+        const selection = this.props.record.fields[this.props.name].selection;
+        const option = selection.find(([value]) => value === this.state);
+        return option ? option[1] : "";
+    }
+}
+
+GitBuildStatus.template = "lm_project_git.GitBuildStatus";
+
+registry.category("fields").add("git_build_status", {
+    component: GitBuildStatus,
+    supportedTypes: ["selection"],
+});
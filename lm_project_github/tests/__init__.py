@@ -0,0 +1,3 @@
+from . import test_github_sync
+from . import test_github_mirror
+from . import test_github_benchmark
@@ -0,0 +1,100 @@
+import json
+import logging
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+from odoo.tests import TransactionCase
+
+from .fake_github import FakeGithub
+
+_logger = logging.getLogger(__name__)
+
+
+class GithubCase(TransactionCase):
+    """Base class of the tests running against the fake GitHub server
+
+    Every session of the API client is served by ``cls.github``. The
+    registry is put in test mode so that the cursors opened for the shared
+    rate limit and response cache tables work in the test transaction.
+    """
+
+    github_latency = 0.0
+    github_repository_count = 0
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if cls.registry.test_cr is None:
+            cls.registry.enter_test_mode(cls.cr)
+            cls.addClassCleanup(cls.registry.leave_test_mode)
+
+        cls.github = FakeGithub(latency=cls.github_latency)
+        cls.token = f'ghp_{uuid.uuid4().hex}'
+        cls.github.add_account(cls.token, 'odoo-tests', repository_count=cls.github_repository_count)
+        sessions = {}
+
+        def _get_session(api, token):
+            if token not in sessions:
+                sessions[token] = cls.github.session(token)
+            return sessions[token]
+
+        cls.classPatch(cls.registry['project.github.api'], '_get_session', _get_session)
+        cls.env.company.github_use_graphql = False
+        cls.env.user.write({'git_username': 'odoo-tests', 'git_token': cls.token})
+        cls.project = cls.env['project.project'].create({'name': 'GitHub Tests'})
+
+    @classmethod
+    def connect_repository(cls, fake_repository, project=None):
+        """Return a connected repository record mirroring a repository of the fake server"""
+        vals = cls.env['project.github.repository']._prepare_metadata_vals(fake_repository.data)
+        project = project or cls.project
+        repository = cls.env['project.github.repository'].create(dict(
+            vals,
+            project_id=project.id,
+            company_id=cls.env.company.id,
+            is_connected=True,
+        ))
+        project.write({'repository_id': repository.id, 'enable_github': True, 'is_connected_github': True})
+        return repository
+
+    def enqueue_deliveries(self, repository, events):
+        """Store ``(event, payload)`` pairs as pending deliveries of a repository"""
+        Delivery = self.env['project.github.webhook.delivery']
+        for event, payload in events:
+            Delivery._enqueue_delivery(repository, event, str(uuid.uuid4()), json.dumps(payload).encode())
+        return Delivery.search([('repository_id', '=', repository.id), ('state', '=', 'pending')])
+
+    @contextmanager
+    def measure(self, name):
+        """Measure the wall time, HTTP calls, SQL queries and peak Python memory of a block
+
+        The figures are logged and stored in the yielded dict. The wall time
+        includes the overhead of the memory tracing.
+        """
+        self.env.flush_all()
+        result = {}
+        calls = self.github.call_count
+        queries = self.cr.sql_log_count
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield result
+            self.env.flush_all()
+        finally:
+            result.update({
+                'wall_time': time.perf_counter() - start,
+                'http_calls': self.github.call_count - calls,
+                'queries': self.cr.sql_log_count - queries,
+                'peak_memory': tracemalloc.get_traced_memory()[1],
+            })
+            if not tracing:
+                tracemalloc.stop()
+            _logger.info(
+                f"{name}: {result['wall_time']:.3f}s, {result['http_calls']} HTTP calls, "
+                f"{result['queries']} queries, {result['peak_memory'] / 2 ** 20:.1f} MiB peak"
+            )
@@ -0,0 +1,644 @@
+"""In-process stand-in for the GitHub API, used by the tests and the benchmarks
+
+The server is a ``requests`` transport adapter: the sessions of the API
+client are pointed at it and no socket is ever opened. It serves the
+endpoints the module calls with GitHub's pagination (``Link`` headers),
+conditional requests (``ETag`` / ``If-None-Match``) and rate limit headers,
+and can inject latency and errors to exercise the retry and back-off paths.
+"""
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Timestamps of the synthetic data are relative to this date
+EPOCH = datetime(2024, 1, 1)
+MAX_PER_PAGE = 100
+
+
+def format_datetime(value):
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def fake_sha(*parts):
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+class FakeRepository:
+    """Repository of the fake server: metadata, branch heads, commits, issues and hooks"""
+
+    def __init__(self, github, owner, name, index, private=False, default_branch='main'):
+        self.id = github._next_id()
+        self.owner = owner
+        self.name = name
+        self.full_name = f'{owner}/{name}'
+        created = EPOCH + timedelta(minutes=index)
+        self.data = {
+            'id': self.id,
+            'node_id': f'R_{self.id}',
+            'name': name,
+            'full_name': self.full_name,
+            'owner': {'login': owner},
+            'private': private,
+            'visibility': 'private' if private else 'public',
+            'description': f'Synthetic repository {index}',
+            'html_url': f'https://github.com/{self.full_name}',
+            'clone_url': f'https://github.com/{self.full_name}.git',
+            'ssh_url': f'git@github.com:{self.full_name}.git',
+            'language': ('Python', 'JavaScript', 'Go', None)[index % 4],
+            'stargazers_count': index % 97,
+            'forks_count': index % 13,
+            'open_issues_count': 0,
+            'archived': False,
+            'disabled': False,
+            'default_branch': default_branch,
+            'created_at': format_datetime(created),
+            'updated_at': format_datetime(created),
+            'pushed_at': format_datetime(created),
+        }
+        self.branches = {default_branch: fake_sha(self.full_name, default_branch, 0)}
+        # Commits per branch, newest first
+        self.commits = defaultdict(list)
+        self.issues = []
+        self.pulls = []
+        # Check suites and commit statuses of a commit, by app and context
+        self.check_suites = defaultdict(dict)
+        self.statuses = defaultdict(dict)
+        self.hooks = {}
+        # Files of a commit by path
+        self.files = {}
+
+    @property
+    def default_branch(self):
+        return self.data['default_branch']
+
+    def touch(self, when=None):
+        self.data['updated_at'] = self.data['pushed_at'] = format_datetime(when or datetime.utcnow())
+
+
+class FakeGithub:
+    """State and request handlers of the fake GitHub server
+
+    Every request is recorded in ``calls``. ``latency`` seconds are spent on
+    each request, ``fail()`` queues error responses for the requests matching
+    a pattern, and each token has its own rate limit budget that conditional
+    requests answered with a 304 do not consume.
+    """
+
+    def __init__(self, latency=0.0, rate_limit=5000):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.tokens = {}
+        self.budgets = {}
+        self.repositories = {}
+        self.repositories_by_token = defaultdict(list)
+        self.calls = []
+        self._failures = []
+        self._lock = threading.Lock()
+        self._ids = iter(range(1000000, 100000000))
+
+    def _next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    # ------------------------------------------------------------------
+    # Synthetic data
+    # ------------------------------------------------------------------
+
+    def add_account(self, token, login, repository_count=0):
+        """Register a token of ``login`` owning ``repository_count`` repositories"""
+        self.tokens[token] = login
+        self.budgets[token] = {'core': self.rate_limit, 'graphql': self.rate_limit}
+        for index in range(repository_count):
+            self.add_repository(token, f'repo-{index:05d}', index=index)
+        return login
+
+    def add_repository(self, token, name, index=0, branch_count=1, commit_count=0, issue_count=0, private=None):
+        """Create a repository of the account of ``token`` with synthetic branches, commits and issues"""
+        owner = self.tokens[token]
+        repository = FakeRepository(self, owner, name, index, private=index % 3 == 0 if private is None else private)
+        self.repositories[repository.full_name] = repository
+        self.repositories_by_token[token].append(repository)
+        for branch_index in range(1, branch_count):
+            branch = f'feature/{branch_index:05d}'
+            repository.branches[branch] = fake_sha(repository.full_name, branch, 0)
+        if commit_count:
+            self.add_commits(repository, repository.default_branch, commit_count)
+        for _index in range(issue_count):
+            self.add_issue(repository)
+        return repository
+
+    def add_commits(self, repository, branch, count, message='Synthetic commit'):
+        """Push ``count`` new commits on a branch, returning them oldest first"""
+        commits = repository.commits[branch]
+        start = len(commits)
+        base = EPOCH + timedelta(days=1)
+        new = []
+        for number in range(start + 1, start + count + 1):
+            sha = fake_sha(repository.full_name, branch, number)
+            date = format_datetime(base + timedelta(minutes=number))
+            new.append({
+                'sha': sha,
+                'html_url': f'{repository.data["html_url"]}/commit/{sha}',
+                'author': {'login': repository.owner},
+                'commit': {
+                    'message': f'{message} {number}',
+                    'author': {'name': repository.owner, 'email': f'{repository.owner}@example.com', 'date': date},
+                    'committer': {'name': repository.owner, 'email': f'{repository.owner}@example.com',
+                                  'date': date},
+                },
+            })
+        commits[:0] = reversed(new)
+        repository.branches[branch] = commits[0]['sha']
+        return new
+
+    def add_files(self, repository, branch, files):
+        """Attach files (path: bytes) to the head commit of a branch"""
+        repository.files[repository.branches[branch]] = dict(files)
+
+    def add_issue(self, repository, title=None, state='open'):
+        number = len(repository.issues) + 1
+        issue = {
+            'id': self._next_id(),
+            'number': number,
+            'title': title or f'Synthetic issue {number}',
+            'body': f'Body of issue {number}',
+            'state': state,
+            'state_reason': None,
+            'html_url': f'{repository.data["html_url"]}/issues/{number}',
+            'updated_at': format_datetime(EPOCH + timedelta(hours=number)),
+        }
+        repository.issues.append(issue)
+        repository.data['open_issues_count'] = sum(1 for issue in repository.issues if issue['state'] == 'open')
+        return issue
+
+    def _tick(self):
+        """Return a timestamp later than all the previous ones"""
+        return format_datetime(EPOCH + timedelta(days=30, minutes=self._next_id() - 1000000))
+
+    def add_pull_request(self, repository, head, title=None, body=None):
+        """Open a pull request of a branch into the default branch"""
+        number = len(repository.pulls) + 1
+        now = self._tick()
+        pull = {
+            'id': self._next_id(),
+            'number': number,
+            'title': title or f'Synthetic pull request {number}',
+            'body': body,
+            'state': 'open',
+            'draft': False,
+            'merged_at': None,
+            'closed_at': None,
+            'user': {'login': repository.owner},
+            'head': {'ref': head, 'sha': repository.branches.get(head), 'repo': {'full_name': repository.full_name}},
+            'base': {'ref': repository.default_branch},
+            'html_url': f'{repository.data["html_url"]}/pull/{number}',
+            'created_at': now,
+            'updated_at': now,
+        }
+        repository.pulls.append(pull)
+        return pull
+
+    def update_pull_request(self, repository, number, merged=False, **values):
+        """Change a pull request, merging it with ``merged``, and return it"""
+        pull = repository.pulls[number - 1]
+        pull.update(values, updated_at=self._tick())
+        if merged:
+            pull.update(state='closed', merged_at=pull['updated_at'], closed_at=pull['updated_at'])
+        return pull
+
+    # ------------------------------------------------------------------
+    # Webhook payloads
+    # ------------------------------------------------------------------
+
+    def push_event(self, repository, branch, commit_count=1):
+        """Push commits on a branch and return the matching ``push`` delivery payload"""
+        before = repository.branches.get(branch) or '0' * 40
+        commits = self.add_commits(repository, branch, commit_count) if commit_count else []
+        return {
+            'ref': f'refs/heads/{branch}',
+            'before': before,
+            'after': repository.branches[branch],
+            'created': before == '0' * 40,
+            'deleted': False,
+            'commits': [{
+                'id': commit['sha'],
+                'message': commit['commit']['message'],
+                'timestamp': commit['commit']['committer']['date'],
+                'url': commit['html_url'],
+                'author': {
+                    'name': commit['commit']['author']['name'],
+                    'email': commit['commit']['author']['email'],
+                    'username': repository.owner,
+                },
+            } for commit in commits],
+            'repository': repository.data,
+        }
+
+    def pull_request_event(self, repository, pull, action='opened'):
+        """Return the ``pull_request`` delivery payload of a pull request"""
+        return {'action': action, 'number': pull['number'], 'pull_request': dict(pull), 'repository': repository.data}
+
+    def check_suite_event(self, repository, branch, conclusion=None, app='ci'):
+        """Run the checks of an app on the head of a branch, completed with ``conclusion`` if given"""
+        sha = repository.branches[branch]
+        suite = {
+            'id': self._next_id(),
+            'head_branch': branch,
+            'head_sha': sha,
+            'status': 'completed' if conclusion else 'in_progress',
+            'conclusion': conclusion,
+            'app': {'slug': app},
+        }
+        repository.check_suites[sha][app] = suite
+        return {'action': 'completed' if conclusion else 'requested', 'check_suite': suite,
+                'repository': repository.data}
+
+    def status_event(self, repository, branch, state, context='ci/build'):
+        """Set a commit status on the head of a branch"""
+        sha = repository.branches[branch]
+        repository.statuses[sha][context] = {'context': context, 'state': state}
+        return {
+            'sha': sha,
+            'state': state,
+            'context': context,
+            'branches': [{'name': name, 'commit': {'sha': head}}
+                         for name, head in repository.branches.items() if head == sha],
+            'repository': repository.data,
+        }
+
+    def create_event(self, repository, branch):
+        """Create a branch and return the matching ``create`` delivery payload"""
+        repository.branches[branch] = repository.branches[repository.default_branch]
+        return {'ref': branch, 'ref_type': 'branch', 'repository': repository.data}
+
+    def delete_event(self, repository, branch):
+        """Delete a branch and return the matching ``delete`` delivery payload"""
+        repository.branches.pop(branch, None)
+        repository.commits.pop(branch, None)
+        return {'ref': branch, 'ref_type': 'branch', 'repository': repository.data}
+
+    # ------------------------------------------------------------------
+    # Transport
+    # ------------------------------------------------------------------
+
+    def session(self, token):
+        """Return a session sending its requests to the fake server"""
+        session = requests.Session()
+        adapter = FakeGithubAdapter(self)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Authorization': f'Bearer {token}',
+            'Accept': 'application/vnd.github.v3+json',
+            'User-Agent': 'Odoo-lm_project_github',
+        })
+        return session
+
+    def fail(self, pattern, status=502, count=1, headers=None, body=None):
+        """Answer the next ``count`` requests matching ``pattern`` (``"<METHOD> <path>"``) with an error"""
+        with self._lock:
+            self._failures.append([re.compile(pattern), status, count, headers or {}, body])
+
+    @property
+    def call_count(self):
+        return len(self.calls)
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls = []
+
+    def _pop_failure(self, method, path):
+        with self._lock:
+            for failure in self._failures:
+                pattern, status, count, headers, body = failure
+                if pattern.search(f'{method} {path}'):
+                    failure[2] -= 1
+                    if failure[2] <= 0:
+                        self._failures.remove(failure)
+                    return status, headers, body
+        return None
+
+    def _charge(self, token, resource):
+        """Consume one call of the budget of a token, returning the rate limit headers"""
+        with self._lock:
+            budget = self.budgets[token]
+            remaining = budget[resource]
+            if remaining:
+                budget[resource] = remaining - 1
+            return remaining > 0, self._rate_limit_headers(token, resource)
+
+    def _rate_limit_headers(self, token, resource):
+        remaining = self.budgets[token][resource]
+        return {
+            'X-RateLimit-Limit': str(self.rate_limit),
+            'X-RateLimit-Remaining': str(remaining),
+            'X-RateLimit-Used': str(self.rate_limit - remaining),
+            'X-RateLimit-Reset': str(int(time.time()) + 3600),
+            'X-RateLimit-Resource': resource,
+        }
+
+    def handle(self, request):
+        """Return the status, headers and JSON body answering a prepared request"""
+        if self.latency:
+            time.sleep(self.latency)
+        url = urlparse(request.url)
+        path = url.path
+        if path.startswith('/api/v3/'):
+            path = path[len('/api/v3'):]
+        elif path == '/api/graphql':
+            path = '/graphql'
+        method = request.method.upper()
+        with self._lock:
+            self.calls.append((method, path))
+
+        authorization = request.headers.get('Authorization') or ''
+        token = authorization.split(' ', 1)[1] if ' ' in authorization else None
+        if token not in self.tokens:
+            return 401, {}, {'message': 'Bad credentials'}
+
+        failure = self._pop_failure(method, path)
+        if failure:
+            status, headers, body = failure
+            return status, dict(self._rate_limit_headers(token, 'core'), **headers), body or {
+                'message': HTTPStatus(status).phrase}
+
+        resource = 'graphql' if path == '/graphql' else 'core'
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = json.loads(request.body) if request.body else {}
+        status, headers, payload = self._dispatch(token, method, path, params, body)
+
+        etag = None
+        if method == 'GET' and status == 200:
+            etag = 'W/"%s"' % hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+            headers['ETag'] = etag
+            if request.headers.get('If-None-Match') == etag:
+                # Conditional requests answered from the client cache are free
+                return 304, dict(self._rate_limit_headers(token, resource), **headers), None
+
+        allowed, rate_headers = self._charge(token, resource)
+        if not allowed:
+            return 403, rate_headers, {'message': 'API rate limit exceeded'}
+        return status, dict(rate_headers, **headers), payload
+
+    def _dispatch(self, token, method, path, params, body):
+        if path == '/graphql' and method == 'POST':
+            return self._graphql(token, body)
+        if path == '/markdown' and method == 'POST':
+            paragraphs = [line for line in body.get('text', '').splitlines() if line.strip()]
+            return 200, {}, ''.join(f'<p>{line.lstrip("# ")}</p>' for line in paragraphs)
+        if path == '/user' and method == 'GET':
+            return 200, {}, {'login': self.tokens[token]}
+        if path == '/user/repos' and method == 'GET':
+            return self._list_user_repositories(token, path, params)
+        if path == '/search/repositories' and method == 'GET':
+            return self._search_repositories(token, params)
+
+        match = re.fullmatch(r'/repos/([^/]+/[^/]+)(/.*)?', path)
+        repository = match and self.repositories.get(match.group(1))
+        if not repository:
+            return 404, {}, {'message': 'Not Found'}
+        resource = match.group(2) or ''
+        if not resource and method == 'GET':
+            return 200, {}, repository.data
+        if resource == '/branches' and method == 'GET':
+            branches = [
+                {'name': name, 'commit': {'sha': sha}, 'protected': False}
+                for name, sha in sorted(repository.branches.items())
+            ]
+            return self._paginate(path, params, branches)
+        match = re.fullmatch(r'/branches/(.+)', resource)
+        if match and method == 'GET':
+            sha = repository.branches.get(match.group(1))
+            if sha is None:
+                return 404, {}, {'message': 'Branch not found'}
+            return 200, {}, {'name': match.group(1), 'commit': {'sha': sha}, 'protected': False}
+        if resource == '/commits' and method == 'GET':
+            return self._list_commits(repository, path, params)
+        if resource == '/issues' and method == 'GET':
+            return self._list_issues(repository, path, params)
+        match = re.fullmatch(r'/commits/(\w+)/(check-suites|status)', resource)
+        if match and method == 'GET':
+            sha = match.group(1)
+            if match.group(2) == 'check-suites':
+                suites = list(repository.check_suites[sha].values())
+                return 200, {}, {'total_count': len(suites), 'check_suites': suites}
+            return 200, {}, {'sha': sha, 'statuses': list(repository.statuses[sha].values())}
+        if resource == '/pulls' and method == 'GET':
+            state = params.get('state') or 'open'
+            pulls = [pull for pull in repository.pulls if state == 'all' or pull['state'] == state]
+            pulls.sort(key=lambda pull: (pull['updated_at'], pull['id']), reverse=params.get('direction') != 'asc')
+            return self._paginate(path, params, pulls)
+        if resource == '/issues' and method == 'POST':
+            issue = self.add_issue(repository, title=body.get('title'))
+            issue['body'] = body.get('body')
+            return 201, {}, issue
+        match = re.fullmatch(r'/issues/(\d+)', resource)
+        if match and method == 'PATCH':
+            number = int(match.group(1))
+            if not 0 < number <= len(repository.issues):
+                return 404, {}, {'message': 'Not Found'}
+            issue = repository.issues[number - 1]
+            issue.update({key: value for key, value in body.items() if key in ('title', 'body', 'state')})
+            issue['updated_at'] = format_datetime(datetime.utcnow())
+            return 200, {}, issue
+        match = re.fullmatch(r'/git/trees/(\w+)', resource)
+        if match and method == 'GET':
+            return self._get_tree(repository, match.group(1), params)
+        match = re.fullmatch(r'/git/blobs/(\w+)', resource)
+        if match and method == 'GET':
+            content = next((content for files in repository.files.values() for content in files.values()
+                            if fake_sha('blob', content) == match.group(1)), None)
+            if content is None:
+                return 404, {}, {'message': 'Not Found'}
+            return 200, {}, {'sha': match.group(1), 'size': len(content), 'encoding': 'base64',
+                             'content': base64.b64encode(content).decode()}
+        if resource == '/hooks' and method == 'POST':
+            hook_id = self._next_id()
+            repository.hooks[hook_id] = body
+            return 201, {}, dict(body, id=hook_id)
+        match = re.fullmatch(r'/hooks/(\d+)', resource)
+        if match and method == 'DELETE':
+            if not repository.hooks.pop(int(match.group(1)), None):
+                return 404, {}, {'message': 'Not Found'}
+            return 204, {}, None
+        return 404, {}, {'message': 'Not Found'}
+
+    def _paginate(self, path, params, items):
+        """Return one page of ``items`` with the ``Link`` header of GitHub"""
+        per_page = min(int(params.get('per_page') or 30), MAX_PER_PAGE)
+        page = max(int(params.get('page') or 1), 1)
+        last = max(1, -(-len(items) // per_page))
+        links = []
+        for rel, number in (('prev', page - 1), ('next', page + 1), ('last', last), ('first', 1)):
+            if 1 <= number <= last and (rel in ('prev', 'next') or page != number):
+                query = urlencode(dict(params, page=number))
+                links.append(f'<https://api.github.com{path}?{query}>; rel="{rel}"')
+        headers = {'Link': ', '.join(links)} if links else {}
+        return 200, headers, items[(page - 1) * per_page:page * per_page]
+
+    def _list_user_repositories(self, token, path, params):
+        repositories = [repository.data for repository in self.repositories_by_token[token]]
+        sort = {'full_name': 'full_name', 'created': 'created_at', 'pushed': 'pushed_at'}.get(
+            params.get('sort'), 'updated_at')
+        direction = params.get('direction') or ('asc' if sort == 'full_name' else 'desc')
+        repositories.sort(key=lambda data: (data[sort], data['id']), reverse=direction == 'desc')
+        return self._paginate(path, params, repositories)
+
+    def _search_repositories(self, token, params):
+        terms = [term for term in (params.get('q') or '').split() if ':' not in term]
+        items = [
+            repository.data for repository in self.repositories_by_token[token]
+            if all(term.lower() in repository.full_name.lower() for term in terms)
+        ]
+        per_page = min(int(params.get('per_page') or 30), MAX_PER_PAGE)
+        return 200, {}, {'total_count': len(items), 'incomplete_results': False, 'items': items[:per_page]}
+
+    def _list_commits(self, repository, path, params):
+        branch = params.get('sha') or repository.default_branch
+        if branch not in repository.branches:
+            return 404, {}, {'message': 'No commit found for SHA: %s' % branch}
+        commits = repository.commits.get(branch, [])
+        since, until = params.get('since'), params.get('until')
+        # The ISO-8601 timestamps of the fake data compare as strings
+        commits = [
+            commit for commit in commits
+            if (not since or commit['commit']['committer']['date'] >= since)
+            and (not until or commit['commit']['committer']['date'] <= until)
+        ]
+        return self._paginate(path, params, commits)
+
+    def _get_tree(self, repository, commit_sha, params):
+        """Return the tree of a commit, with the folders implied by the file paths when recursive"""
+        files = repository.files.get(commit_sha)
+        if files is None:
+            return 404, {}, {'message': 'Not Found'}
+        recursive = params.get('recursive')
+        entries = {}
+        for path, content in files.items():
+            parts = path.split('/')
+            if not recursive and len(parts) > 1:
+                entries[parts[0]] = {'path': parts[0], 'type': 'tree', 'sha': fake_sha('tree', commit_sha, parts[0])}
+                continue
+            for depth in range(1, len(parts)):
+                folder = '/'.join(parts[:depth])
+                entries[folder] = {'path': folder, 'type': 'tree', 'sha': fake_sha('tree', commit_sha, folder)}
+            entries[path] = {'path': path, 'type': 'blob', 'sha': fake_sha('blob', content), 'size': len(content)}
+        return 200, {}, {
+            'sha': fake_sha('tree', commit_sha),
+            'tree': sorted(entries.values(), key=lambda entry: entry['path']),
+            'truncated': False,
+        }
+
+    def _list_issues(self, repository, path, params):
+        state = params.get('state') or 'open'
+        since = params.get('since')
+        issues = [
+            issue for issue in repository.issues
+            if (state == 'all' or issue['state'] == state) and (not since or issue['updated_at'] >= since)
+        ]
+        issues.sort(key=lambda issue: (issue['updated_at'], issue['id']), reverse=params.get('direction') != 'asc')
+        return self._paginate(path, params, issues)
+
+    # ------------------------------------------------------------------
+    # GraphQL
+    # ------------------------------------------------------------------
+
+    def _graphql_repository(self, repository):
+        data = repository.data
+        default_branch = repository.default_branch
+        return {
+            'id': data['node_id'],
+            'databaseId': data['id'],
+            'name': data['name'],
+            'nameWithOwner': data['full_name'],
+            'description': data['description'],
+            'isPrivate': data['private'],
+            'url': data['html_url'],
+            'sshUrl': data['ssh_url'],
+            'visibility': data['visibility'].upper(),
+            'stargazerCount': data['stargazers_count'],
+            'forkCount': data['forks_count'],
+            'isArchived': data['archived'],
+            'isDisabled': data['disabled'],
+            'createdAt': data['created_at'],
+            'updatedAt': data['updated_at'],
+            'primaryLanguage': {'name': data['language']} if data['language'] else None,
+            'issues': {'totalCount': data['open_issues_count']},
+            'defaultBranchRef': {'name': default_branch, 'target': {'oid': repository.branches.get(default_branch)}},
+        }
+
+    def _graphql(self, token, body):
+        """Answer the ``nodes`` and ``repository`` queries of the module from their variables"""
+        variables = body.get('variables') or {}
+        if 'ids' in variables:
+            by_node_id = {repository.data['node_id']: repository for repository in self.repositories.values()}
+            nodes, errors = [], []
+            for node_id in variables['ids']:
+                repository = by_node_id.get(node_id)
+                nodes.append(self._graphql_repository(repository) if repository else None)
+                if not repository:
+                    errors.append({
+                        'type': 'NOT_FOUND',
+                        'message': f"Could not resolve to a node with the global id of '{node_id}'",
+                    })
+            payload = {'data': {'nodes': nodes}}
+            if errors:
+                payload['errors'] = errors
+            return 200, {}, payload
+        if 'owner' in variables:
+            repository = self.repositories.get(f"{variables['owner']}/{variables['name']}")
+            if not repository:
+                return 200, {}, {
+                    'data': {'repository': None},
+                    'errors': [{'type': 'NOT_FOUND', 'message': 'Could not resolve to a Repository'}],
+                }
+            names = sorted(repository.branches)
+            start = int(variables.get('cursor') or 0)
+            end = start + MAX_PER_PAGE
+            node = self._graphql_repository(repository)
+            node['refs'] = {
+                'pageInfo': {'hasNextPage': end < len(names), 'endCursor': str(end)},
+                'nodes': [{'name': name, 'target': {'oid': repository.branches[name]}} for name in names[start:end]],
+            }
+            return 200, {}, {'data': {'repository': node}}
+        return 200, {}, {'errors': [{'message': 'Query not served by the fake GitHub server'}]}
+
+
+class FakeGithubAdapter(BaseAdapter):
+    """Transport adapter answering the requests of a session from a ``FakeGithub``"""
+
+    def __init__(self, github):
+        super().__init__()
+        self.github = github
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        status, headers, payload = self.github.handle(request)
+        response = requests.Response()
+        response.status_code = status
+        response.reason = HTTPStatus(status).phrase
+        response.headers = CaseInsensitiveDict(headers)
+        if isinstance(payload, str):
+            response._content = payload.encode()
+            response.headers['Content-Type'] = 'text/html; charset=utf-8'
+        else:
+            response._content = b'' if payload is None else json.dumps(payload).encode()
+            if payload is not None:
+                response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,94 @@
+from odoo.tests import tagged
+
+from .common import GithubCase
+
+
+@tagged('post_install', '-at_install', '-standard', 'lm_project_github_benchmark')
+class TestGithubBenchmark(GithubCase):
+    """End-to-end benchmarks of the GitHub flows on a large synthetic account
+
+    Not part of the standard run, start them with
+    ``--test-tags lm_project_github_benchmark``. Each flow logs its wall
+    time, HTTP calls, SQL queries and peak Python memory against a fake
+    server answering with ``github_latency`` seconds of latency.
+    """
+
+    github_latency = 0.02
+    github_repository_count = 10000
+    branch_count = 5000
+    delivery_count = 1000
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        ICP = cls.env['ir.config_parameter'].sudo()
+        ICP.set_param('lm_project_github.fetch_max_pages', 200)
+        ICP.set_param('lm_project_github.branch_max_pages', cls.branch_count // 100)
+        cls.fake_repository = cls.github.add_repository(
+            cls.token, 'monorepo', index=cls.github_repository_count, branch_count=cls.branch_count)
+
+    def setUp(self):
+        super().setUp()
+        self.github.reset_calls()
+
+    def test_wizard_fetch(self):
+        Catalogue = self.env['project.github.repository.catalogue']
+        wizard = self.env['project.github.connect.repository'].create({'project_id': self.project.id})
+        with self.measure('wizard fetch, full catalogue') as result:
+            Catalogue._refresh_user_catalogue(self.env.user, full=True)
+            wizard.action_fetch_repositories()
+        self.assertEqual(wizard.total_repositories, self.github_repository_count + 1)
+        self.assertEqual(result['http_calls'], 101)
+
+        with self.measure('wizard fetch, incremental refresh') as result:
+            Catalogue._refresh_user_catalogue(self.env.user)
+        self.assertEqual(result['http_calls'], 1)
+
+        with self.measure('wizard fetch, revalidated catalogue') as result:
+            Catalogue._refresh_user_catalogue(self.env.user, full=True)
+        self.assertEqual(result['http_calls'], 101)
+
+    def test_connect(self):
+        self.env['project.github.repository.catalogue']._refresh_user_catalogue(self.env.user, full=True)
+        wizard = self.env['project.github.connect.repository'].create({'project_id': self.project.id})
+        wizard.action_fetch_repositories()
+        wizard.selected_repository_id = wizard.repository_ids.filtered(lambda repo: repo.name == 'monorepo')
+        self.assertTrue(wizard.selected_repository_id)
+        with self.measure('connect') as result:
+            wizard.action_connect_repository()
+        self.assertEqual(self.project.repository_id.full_name, self.fake_repository.full_name)
+        self.assertEqual(result['http_calls'], 0)
+
+    def test_branch_sync(self):
+        repository = self.connect_repository(self.fake_repository)
+        with self.measure('branch sync, initial') as result:
+            created, _updated, _pruned = repository._sync_branches()
+        self.assertEqual(len(created), self.branch_count)
+        self.assertEqual(result['http_calls'], self.branch_count // 100)
+
+        with self.measure('branch sync, unchanged') as result:
+            created, updated, pruned = repository._sync_branches()
+        self.assertFalse(created or updated or pruned)
+
+        self.env.company.github_use_graphql = True
+        with self.measure('branch sync, unchanged through GraphQL') as result:
+            created, updated, pruned = repository._sync_branches()
+        self.assertFalse(created or updated or pruned)
+
+    def test_webhook_apply(self):
+        repository = self.connect_repository(self.fake_repository)
+        repository._sync_branches()
+        branches = sorted(self.fake_repository.branches)[:200]
+        deliveries = self.enqueue_deliveries(repository, [
+            ('push', self.github.push_event(self.fake_repository, branches[index % len(branches)], 3))
+            for index in range(self.delivery_count)
+        ])
+        with self.measure(f'webhook apply, {self.delivery_count} pushes') as result:
+            deliveries._process()
+        self.assertEqual(result['http_calls'], 0)
+
+        heads = dict(self.env['project.github.branch'].search([
+            ('repository_id', '=', repository.id),
+            ('name', 'in', branches),
+        ]).mapped(lambda branch: (branch.name, branch.head_sha)))
+        self.assertEqual(heads, {name: self.fake_repository.branches[name] for name in branches})
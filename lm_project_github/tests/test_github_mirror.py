@@ -0,0 +1,82 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from odoo.tests import tagged
+
+from .common import GithubCase
+
+
+@unittest.skipUnless(shutil.which('git'), "git is not installed")
+@tagged('post_install', '-at_install')
+class TestGithubMirror(GithubCase):
+    """Branches and commits read from a local mirror of a bare repository standing in for GitHub"""
+
+    def setUp(self):
+        super().setUp()
+        self.github.reset_calls()
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.env['ir.config_parameter'].sudo().set_param('lm_project_github.mirror_path', os.path.join(tmp, 'mirrors'))
+
+        self.remote = os.path.join(tmp, 'remote.git')
+        self.work = os.path.join(tmp, 'work')
+        self.git(None, 'init', '--bare', '--quiet', '--initial-branch=main', self.remote)
+        self.git(None, 'clone', '--quiet', self.remote, self.work)
+        self.commit('README.md', 'Hello\n', 'Initial commit')
+        self.git(self.work, 'push', '--quiet', 'origin', 'main')
+
+        fake_repository = self.github.add_repository(self.token, 'mirrored')
+        self.repository = self.connect_repository(fake_repository)
+        self.repository.write({'clone_url': self.remote, 'mirror_enabled': True})
+        self.project.commit_prefix = 'TASK'
+
+    def git(self, cwd, *args):
+        return subprocess.run(
+            ['git', *args], cwd=cwd, check=True, capture_output=True, text=True,
+            env=dict(os.environ, GIT_AUTHOR_NAME='Dev', GIT_AUTHOR_EMAIL='dev@example.com',
+                     GIT_COMMITTER_NAME='Dev', GIT_COMMITTER_EMAIL='dev@example.com'),
+        ).stdout.strip()
+
+    def commit(self, filename, content, message):
+        with open(os.path.join(self.work, filename), 'a') as file:
+            file.write(content)
+        self.git(self.work, 'add', filename)
+        self.git(self.work, 'commit', '--quiet', '-m', message)
+        return self.git(self.work, 'rev-parse', 'HEAD')
+
+    def commits(self):
+        return self.env['project.github.commit'].search([('repository_id', '=', self.repository.id)])
+
+    def test_sync_from_mirror(self):
+        task = self.env['project.task'].create({'name': 'Mirrored task', 'project_id': self.project.id})
+        self.git(self.work, 'checkout', '--quiet', '-b', 'feature')
+        sha = self.commit('app.py', 'print(1)\nprint(2)\n', f'TASK-{task.id} Add the app')
+        self.git(self.work, 'push', '--quiet', 'origin', 'feature')
+
+        self.assertEqual(self.repository._sync_mirror(), 2)
+        self.assertEqual(self.github.call_count, 0, "Nothing is read from the GitHub API")
+        branches = self.env['project.github.branch'].search([('repository_id', '=', self.repository.id)])
+        self.assertEqual(sorted(branches.mapped('name')), ['feature', 'main'])
+        self.assertEqual(branches.filtered(lambda branch: branch.name == 'feature').head_sha, sha)
+
+        commit = self.commits().filtered(lambda commit: commit.sha == sha)
+        self.assertEqual((commit.changed_files, commit.additions, commit.deletions), (1, 2, 0))
+        self.assertEqual(commit.task_ids, task)
+        self.assertEqual(commit.author_email, 'dev@example.com')
+
+        # Only the new commits are walked and inserted
+        self.commit('app.py', 'print(3)\n', 'Extend the app')
+        self.git(self.work, 'push', '--quiet', 'origin', 'feature')
+        self.assertEqual(self.repository._sync_mirror(), 1)
+        self.assertEqual(len(self.commits()), 3)
+
+        # Deleted branches are pruned
+        self.git(self.work, 'push', '--quiet', 'origin', '--delete', 'feature')
+        self.repository._sync_mirror()
+        branch = self.env['project.github.branch'].with_context(active_test=False).search([
+            ('repository_id', '=', self.repository.id), ('name', '=', 'feature'),
+        ])
+        self.assertFalse(branch.active)
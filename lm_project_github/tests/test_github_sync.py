@@ -0,0 +1,337 @@
+from odoo.tests import tagged
+
+from odoo.addons.lm_project_github.models.project_github_api import GithubRateLimitError
+from odoo.addons.lm_project_github.models.project_github_metric import endpoint_of
+
+from .common import GithubCase
+
+
+@tagged('post_install', '-at_install')
+class TestGithubSync(GithubCase):
+    """The GitHub flows against the fake server, with their HTTP and SQL costs"""
+
+    github_repository_count = 250
+
+    def setUp(self):
+        super().setUp()
+        self.github.reset_calls()
+
+    def test_catalogue_refresh(self):
+        Catalogue = self.env['project.github.repository.catalogue']
+        count = Catalogue._refresh_user_catalogue(self.env.user, full=True)
+        self.assertEqual(count, 250)
+        self.assertEqual(self.github.call_count, 3, "The 3 pages of the listing are requested once")
+        self.assertEqual(Catalogue.search_count([('user_id', '=', self.env.user.id)]), 250)
+        self.assertFalse(self.env.user.git_catalogue_truncated)
+
+        remaining = self.github.budgets[self.token]['core']
+        Catalogue._refresh_user_catalogue(self.env.user, full=True)
+        self.assertEqual(self.github.call_count, 6)
+        self.assertEqual(self.github.budgets[self.token]['core'], remaining,
+                         "Unchanged pages are revalidated without spending the rate limit")
+
+    def test_connect_repository(self):
+        self.env['project.github.repository.catalogue']._refresh_user_catalogue(self.env.user, full=True)
+        wizard = self.env['project.github.connect.repository'].create({'project_id': self.project.id})
+        wizard.action_fetch_repositories()
+        self.assertEqual(wizard.state, 'select_repo')
+        self.assertEqual(wizard.total_repositories, 250)
+
+        wizard.selected_repository_id = wizard.repository_ids[0]
+        with self.measure('connect repository') as result:
+            wizard.action_connect_repository()
+        self.assertEqual(result['http_calls'], 0, "The webhook is registered in the background")
+        repository = self.project.repository_id
+        self.assertEqual(repository.full_name, wizard.selected_repository_id.full_name)
+
+        job = self.env['project.github.job'].search([
+            ('job_type', '=', 'register_webhook'),
+            ('res_model', '=', repository._name),
+            ('res_id', '=', repository.id),
+        ])
+        self.assertEqual(len(job), 1)
+        job._run()
+        fake_repository = self.github.repositories[repository.full_name]
+        self.assertEqual(repository.webhook_id, str(next(iter(fake_repository.hooks))))
+
+    def test_sync_branches(self):
+        fake_repository = self.github.add_repository(self.token, 'branches', branch_count=250)
+        repository = self.connect_repository(fake_repository)
+        created, updated, pruned = repository._sync_branches()
+        self.assertEqual(len(created), 250)
+        self.assertEqual(self.github.call_count, 3)
+
+        remaining = self.github.budgets[self.token]['core']
+        with self.measure('branch resync, unchanged') as result:
+            created, updated, pruned = repository._sync_branches()
+        self.assertFalse(created or updated or pruned)
+        self.assertEqual(result['http_calls'], 3)
+        self.assertEqual(self.github.budgets[self.token]['core'], remaining)
+
+        self.github.add_commits(fake_repository, 'feature/00001', 1)
+        del fake_repository.branches['feature/00002']
+        created, updated, pruned = repository._sync_branches()
+        self.assertFalse(created)
+        self.assertEqual(updated.mapped('name'), ['feature/00001'])
+        self.assertEqual(updated.head_sha, fake_repository.branches['feature/00001'])
+        self.assertEqual(pruned.mapped('name'), ['feature/00002'])
+        self.assertFalse(pruned.active)
+
+    def test_sync_branches_graphql(self):
+        self.env.company.github_use_graphql = True
+        fake_repository = self.github.add_repository(self.token, 'graphql', branch_count=250)
+        repository = self.connect_repository(fake_repository)
+        created, _updated, _pruned = repository._sync_branches()
+        self.assertEqual(len(created), 250)
+        self.assertEqual(self.github.calls, [('POST', '/graphql')] * 3)
+        self.assertEqual(repository.default_branch_id.name, 'main')
+
+    def test_retry_server_error(self):
+        fake_repository = self.github.add_repository(self.token, 'flaky', branch_count=10)
+        repository = self.connect_repository(fake_repository)
+        self.github.fail(r'^GET /repos/odoo-tests/flaky/branches$', status=502, headers={'Retry-After': '0'})
+        created, _updated, _pruned = repository._sync_branches()
+        self.assertEqual(len(created), 10)
+        self.assertEqual(self.github.call_count, 2)
+
+    def test_rate_limit_exhausted(self):
+        fake_repository = self.github.add_repository(self.token, 'limited', branch_count=10)
+        repository = self.connect_repository(fake_repository)
+        budget = self.github.budgets[self.token]
+        self.addCleanup(budget.update, dict(budget))
+        budget['core'] = 0
+        with self.assertRaises(GithubRateLimitError):
+            repository._sync_branches()
+
+        # The exhausted budget is recorded, background calls wait for its reset
+        calls = self.github.call_count
+        with self.assertRaises(GithubRateLimitError):
+            repository.with_context(github_priority='low')._sync_branches()
+        self.assertEqual(self.github.call_count, calls)
+
+    def test_webhook_push_storm(self):
+        fake_repository = self.github.add_repository(self.token, 'storm', branch_count=20)
+        repository = self.connect_repository(fake_repository)
+        repository._sync_branches()
+
+        deliveries = self.enqueue_deliveries(repository, [
+            ('push', self.github.push_event(fake_repository, 'main', 2)) for _index in range(10)
+        ])
+        with self.measure('webhook apply, 10 pushes') as small:
+            deliveries._process()
+
+        events = [('push', self.github.push_event(fake_repository, 'main', 2)) for _index in range(100)]
+        events += [
+            ('create', self.github.create_event(fake_repository, 'feature/new')),
+            ('delete', self.github.delete_event(fake_repository, 'feature/00003')),
+        ]
+        deliveries = self.enqueue_deliveries(repository, events)
+        with self.measure('webhook apply, 100 pushes') as large:
+            deliveries._process()
+
+        self.assertEqual(large['http_calls'], 0)
+        self.assertLessEqual(large['queries'], small['queries'] + 10,
+                             "A push storm on a branch is applied as a single write")
+        branches = self.env['project.github.branch'].with_context(active_test=False).search([
+            ('repository_id', '=', repository.id),
+        ])
+        heads = {branch.name: branch.head_sha for branch in branches if branch.active}
+        self.assertEqual(heads['main'], fake_repository.branches['main'])
+        self.assertIn('feature/new', heads)
+        self.assertNotIn('feature/00003', heads)
+        self.assertEqual(
+            self.env['project.github.commit'].search_count([('repository_id', '=', repository.id)]), 220)
+
+    def test_metrics(self):
+        Metric = self.env['project.github.metric']
+        Metric._flush(force=True)
+        Metric.search([]).unlink()
+        fake_repository = self.github.add_repository(self.token, 'metrics', branch_count=150)
+        repository = self.connect_repository(fake_repository)
+        repository._sync_branches()
+        repository._sync_branches()
+
+        def counts(metric, name):
+            metrics = Metric.search([('metric', '=', metric), ('name', '=', name)])
+            return dict(zip(metrics.mapped('label'), metrics.mapped('count')))
+
+        self.assertEqual(counts('http_requests', '/repos/:owner/:repo/branches'), {'GET 200': 2, 'GET 304': 2})
+        self.assertEqual(counts('cache', '/repos/:owner/:repo/branches'), {'miss': 2, 'hit': 2})
+        action = Metric.search([('metric', '=', 'action'), ('name', '=', 'sync_branches')])
+        self.assertEqual(action.count, 2)
+        self.assertTrue(action.queries)
+
+        body = Metric._render_prometheus()
+        self.assertIn('lm_project_github_http_requests_total'
+                      '{endpoint="/repos/:owner/:repo/branches",method="GET",status="304"} 2', body)
+        self.assertIn('lm_project_github_action_duration_seconds_count{action="sync_branches"} 2', body)
+        self.assertIn('lm_project_github_cache_hit_ratio 0.500000', body)
+
+        # Commits and branches do not add endpoints
+        base = 'https://api.github.com/repos/odoo/odoo'
+        self.assertEqual(endpoint_of(f'{base}/commits/{"a" * 40}/status'),
+                         endpoint_of(f'{base}/commits/{"b" * 40}/status'))
+        self.assertEqual(endpoint_of(f'{base}/git/trees/{"c" * 40}'), '/repos/:owner/:repo/git/trees/:sha')
+        self.assertEqual(endpoint_of(f'{base}/branches/feature/metrics'), '/repos/:owner/:repo/branches/:branch')
+        self.assertEqual(endpoint_of(f'{base}/issues/42'), '/repos/:owner/:repo/issues/:id')
+
+    def test_browse_files(self):
+        fake_repository = self.github.add_repository(self.token, 'browse')
+        self.github.add_files(fake_repository, 'main', {
+            'README.md': b'# Browse\nSynthetic readme',
+            'src/app.py': b'print("app")\n',
+            'src/lib/util.py': b'print("util")\n',
+        })
+        repository = self.connect_repository(fake_repository)
+        repository._sync_branches()
+        self.github.reset_calls()
+
+        browser = self.env['project.github.file.browser'].browse(repository.action_browse_files()['res_id'])
+        self.assertEqual(browser.entry_ids.mapped('name'), ['src', 'README.md'])
+        self.assertIn('Synthetic readme', browser.readme_html)
+        self.assertEqual(self.github.call_count, 4, "The branch, the recursive tree, the README blob and its rendering")
+
+        browser.entry_ids.filtered(lambda entry: entry.name == 'src').action_open()
+        self.assertEqual(browser.path, 'src')
+        self.assertEqual(browser.entry_ids.mapped('name'), ['lib', 'app.py'])
+        browser.entry_ids.filtered(lambda entry: entry.name == 'app.py').action_open()
+        self.assertEqual(browser.state, 'file')
+        self.assertEqual(browser.file_content, 'print("app")\n')
+        self.assertEqual(self.github.call_count, 5, "Folders are browsed at the commit resolved on opening")
+
+        with self.measure('browse files, cached') as result:
+            other = self.env['project.github.file.browser'].browse(repository.action_browse_files()['res_id'])
+            other.action_go_up()
+            other.entry_ids.filtered(lambda entry: entry.name == 'README.md').action_open()
+        self.assertEqual(result['http_calls'], 1, "Only the branch head is revalidated, trees and blobs are cached")
+
+        # A push not delivered by a webhook is shown on refresh
+        self.github.add_commits(fake_repository, 'main', 1)
+        self.github.add_files(fake_repository, 'main', {'README.md': b'# Browse', 'CHANGES.md': b'# Changes'})
+        other.action_refresh()
+        self.assertNotEqual(other.commit_sha, repository.default_branch_id.head_sha)
+        self.assertIn('CHANGES.md', other.entry_ids.mapped('name'))
+
+        self.env['ir.config_parameter'].sudo().set_param('lm_project_github.object_cache_max_size', 0)
+        self.env['project.github.object']._gc_objects()
+        self.assertFalse(self.env['project.github.object'].search([]))
+
+    def test_sync_pull_requests(self):
+        fake_repository = self.github.add_repository(self.token, 'pulls', branch_count=4)
+        repository = self.connect_repository(fake_repository)
+        repository._sync_branches()
+        self.project.commit_prefix = 'TASK'
+        task = self.env['project.task'].create({'name': 'Reviewed', 'project_id': self.project.id})
+        self.github.add_pull_request(fake_repository, 'feature/00001', body=f'Fixes TASK-{task.id}')
+        self.github.add_pull_request(fake_repository, 'feature/00002')
+        for index in range(118):
+            self.github.add_pull_request(fake_repository, f'topic-{index}')
+        self.github.reset_calls()
+
+        self.assertEqual(repository._sync_pull_requests(), 120)
+        self.assertEqual(self.github.call_count, 2)
+        pull = self.env['project.github.pull_request'].search([
+            ('repository_id', '=', repository.id), ('number', '=', 1),
+        ])
+        self.assertEqual(pull.task_id, task)
+        self.assertEqual(pull.branch_id.name, 'feature/00001')
+        self.assertEqual(self.project.github_open_pull_request_count, 120)
+
+        branches = self.env['project.github.branch'].search([('repository_id', '=', repository.id)])
+        branches.invalidate_recordset()
+        with self.measure('branch pull request states') as result:
+            states = dict(zip(branches.mapped('name'), branches.mapped('pull_request_state')))
+        self.assertLessEqual(result['queries'], 3, "The pull requests of all the branches are read in one batch")
+        self.assertEqual(states['feature/00001'], 'open')
+        self.assertFalse(states['feature/00003'])
+
+        # Only the pull requests updated since the cursor are read
+        self.github.update_pull_request(fake_repository, 1, merged=True)
+        self.github.reset_calls()
+        self.assertEqual(repository._sync_pull_requests(), 1)
+        self.assertEqual(self.github.call_count, 1)
+        self.assertEqual(pull.state, 'merged')
+
+        closed = self.github.update_pull_request(fake_repository, 2, state='closed')
+        self.enqueue_deliveries(repository, [
+            ('pull_request', self.github.pull_request_event(fake_repository, closed, action='closed')),
+        ])
+        self.env['project.github.webhook.delivery']._cron_process_deliveries()
+        self.env.invalidate_all()
+        self.assertEqual(branches.filtered(lambda branch: branch.name == 'feature/00002').pull_request_state, 'closed')
+        self.assertEqual(self.project.github_open_pull_request_count, 118)
+
+        # More updates than one run reads: the next run resumes below them instead of reading them again
+        for number in range(3, 113):
+            self.github.update_pull_request(fake_repository, number, state='closed')
+        self.assertEqual(repository._sync_pull_requests(max_pages=1), 100)
+        self.assertEqual(repository.pull_request_resume_page, 2)
+        self.assertEqual(repository._sync_pull_requests(max_pages=1), 12)
+        self.assertFalse(repository.pull_request_resume_page)
+        self.assertEqual(self.project.github_open_pull_request_count, 8)
+
+    def test_ci_status(self):
+        fake_repository = self.github.add_repository(self.token, 'builds', branch_count=2)
+        repository = self.connect_repository(fake_repository)
+        repository._sync_branches()
+        self.project.commit_prefix = 'TASK'
+        task = self.env['project.task'].create({'name': 'Built', 'project_id': self.project.id})
+        self.github.add_pull_request(fake_repository, 'feature/00001', body=f'TASK-{task.id}')
+        repository._sync_pull_requests()
+        branch = self.env['project.github.branch'].search([
+            ('repository_id', '=', repository.id), ('name', '=', 'feature/00001'),
+        ])
+        Delivery = self.env['project.github.webhook.delivery']
+        Status = self.env['project.github.ci.status']
+
+        self.enqueue_deliveries(repository, [
+            ('check_suite', self.github.check_suite_event(fake_repository, 'feature/00001')),
+            ('status', self.github.status_event(fake_repository, 'feature/00001', 'pending')),
+            ('check_suite', self.github.check_suite_event(fake_repository, 'feature/00001', conclusion='success')),
+            ('status', self.github.status_event(fake_repository, 'feature/00001', 'success')),
+            ('status', self.github.status_event(fake_repository, 'feature/00001', 'failure', context='ci/lint')),
+        ])
+        Delivery._cron_process_deliveries()
+        self.env.invalidate_all()
+        status = Status.search([('branch_id', '=', branch.id)])
+        self.assertEqual(len(status), 1, "All the events of a commit are folded into one row")
+        self.assertEqual((status.total_count, status.success_count, status.failure_count), (3, 2, 1))
+        self.assertEqual(status.conclusion, 'failure')
+        self.assertEqual(branch.ci_state, 'failure')
+        self.assertEqual(task.github_ci_state, 'failure')
+
+        # A new head has no build state until its checks are received
+        self.enqueue_deliveries(repository, [('push', self.github.push_event(fake_repository, 'feature/00001'))])
+        Delivery._cron_process_deliveries()
+        self.env.invalidate_all()
+        self.assertFalse(branch.ci_state)
+
+        self.github.status_event(fake_repository, 'feature/00001', 'success')
+        branch.action_refresh_ci_state()
+        self.assertEqual(branch.ci_state, 'success')
+        self.assertEqual(task.github_ci_state, 'success')
+
+        self.env['ir.config_parameter'].sudo().set_param('lm_project_github.ci_history', 1)
+        Status._gc_statuses()
+        self.env.invalidate_all()
+        self.assertEqual(Status.search([('branch_id', '=', branch.id)]).sha, branch.head_sha)
+
+    def test_concurrent_writers(self):
+        fake_repository = self.github.add_repository(self.token, 'race', branch_count=3)
+        repository = self.connect_repository(fake_repository)
+        # A webhook delivery created the branch after the listing was read
+        Branch = self.env['project.github.branch']
+        raced = Branch.create({'name': 'feature/00001', 'repository_id': repository.id})
+        created, updated = repository._upsert_branches(dict(fake_repository.branches))
+        self.assertEqual(len(created), 2)
+        self.assertEqual(updated, raced)
+        self.assertEqual(raced.head_sha, fake_repository.branches['feature/00001'])
+        self.assertEqual(Branch.search_count([('repository_id', '=', repository.id)]), 3)
+
+        created, updated = repository._upsert_branches(dict(fake_repository.branches))
+        self.assertFalse(created or updated, "Unchanged branches are not written")
+
+        vals = dict(name=repository.name, owner=repository.owner, repository_id=repository.repository_id,
+                    company_id=repository.company_id.id)
+        self.assertFalse(self.env['project.github.repository']._create_connection(vals),
+                         "A repository already connected in the company is not connected twice")
@@ -1,2 +1,3 @@
 from . import res_users_git_credential
-from . import project_github_connect_repository
\ No newline at end of file
+from . import project_github_connect_repository
+from . import project_github_file_browser
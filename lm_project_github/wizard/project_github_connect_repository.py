@@ -1,18 +1,37 @@
-from odoo import fields, models, api, _
+from odoo import fields, models, api, Command, _
 from odoo.exceptions import UserError
-import requests
 import json
 import logging
+import math
 from markupsafe import Markup
 
+from ..models.project_github_metric import instrumented
+
 _logger = logging.getLogger(__name__)
 
+REPOSITORY_PAGE_SIZE = 20
+
+# Catalogue fields copied on the list records of the displayed page
+CATALOGUE_LIST_FIELDS = [
+    'name', 'repository_id', 'owner', 'description', 'private', 'full_name', 'html_url',
+    'clone_url', 'ssh_url', 'default_branch', 'language', 'stars_count', 'forks_count',
+    'open_issues_count', 'archive', 'disabled', 'visibility', 'created_at', 'updated_at',
+]
+CATALOGUE_SORT_FIELDS = {
+    'created': 'created_at',
+    'updated': 'updated_at',
+    'pushed': 'pushed_at',
+    'full_name': 'full_name',
+}
+
 
 class ProjectGithubConnectRepositoryList(models.TransientModel):
     _name = "project.github.connect.repository.list"
     _description = "Connect GitHub Repository List"
+    _order = "sequence, id"
 
     name = fields.Char(string="Repository Name", required=True)
+    sequence = fields.Integer(string="Sequence", default=0)
     connect_repository_id = fields.Many2one(
         comodel_name="project.github.connect.repository",
         string="Connect Repository",
@@ -97,6 +116,7 @@ class ProjectGithubConnectRepository(models.TransientModel):
     # State management
     state = fields.Selection([
         ('form', 'Form Validation'),
+        ('loading', 'Loading Repositories'),
         ('select_repo', 'Select Repository'),
         ('preview', 'Preview Data'),
     ], string='State', default='form')
@@ -146,147 +166,202 @@ class ProjectGithubConnectRepository(models.TransientModel):
     total_repositories = fields.Integer(string="Total Repositories", readonly=True)
     public_count = fields.Integer(string="Public Repositories", readonly=True)
     private_count = fields.Integer(string="Private Repositories", readonly=True)
+    is_truncated = fields.Boolean(
+        string="Truncated",
+        readonly=True,
+        help="The listing reached the configured page limit, some repositories were not fetched.",
+    )
 
-    def _header_authentication(self):
-        """Get authentication headers for GitHub API"""
-        token = self.env.user.git_token
-        if not token:
-            raise UserError(_('GitHub token is not configured. Please set up your GitHub token in user preferences.'))
+    # Search and pagination over the repository catalogue
+    search_term = fields.Char(string="Search", help="Filter repositories by name, description or language")
+    page = fields.Integer(string="Page", default=1, readonly=True)
+    result_count = fields.Integer(string="Results", readonly=True)
+    page_count = fields.Integer(string="Pages", compute="_compute_page_count")
+    catalogue_refreshed_at = fields.Datetime(
+        string="Catalogue Refreshed At",
+        compute="_compute_catalogue_refreshed_at",
+        help="Last refresh of your repository catalogue from GitHub",
+    )
 
-        return {
-            'Authorization': f'Bearer {token}',
-            'Accept': 'application/vnd.github.v3+json',
-            'Content-Type': 'application/json',
-        }
+    # Background catalogue refresh
+    job_id = fields.Many2one(
+        comodel_name="project.github.job",
+        string="Catalogue Refresh Job",
+        readonly=True,
+    )
+    job_state = fields.Selection(related="job_id.state", string="Refresh State")
+    job_progress = fields.Float(related="job_id.progress", string="Refresh Progress")
+    job_message = fields.Text(related="job_id.result_message", string="Refresh Result")
+
+    @api.depends('result_count')
+    def _compute_page_count(self):
+        for wizard in self:
+            wizard.page_count = max(1, math.ceil(wizard.result_count / REPOSITORY_PAGE_SIZE))
+
+    @api.depends_context('uid')
+    def _compute_catalogue_refreshed_at(self):
+        self.catalogue_refreshed_at = self.env.user.git_catalogue_refreshed_at
 
     def _get_github_api_url(self):
         """Get the appropriate GitHub API URL based on username"""
-        return "https://api.github.com/user/repos"
+        return self.env['project.github.api']._get_url('user/repos')
 
+    @instrumented('fetch_repositories')
     def action_fetch_repositories(self):
-        """Fetch repositories from GitHub"""
+        """Show the repositories of the user's catalogue, fetching it from GitHub the first time"""
         self.ensure_one()
+        user = self.env.user
+        if not user.git_catalogue_refreshed_at:
+            # The first listing can take a while on large accounts, it runs in the background
+            self.env['project.github.api']._get_token()
+            _logger.info(f"Queuing repository fetch from GitHub API: {self._get_github_api_url()}")
+            self.write({
+                'job_id': self.env['project.github.job']._enqueue('refresh_catalogue', user, payload={'full': True}).id,
+                'state': 'loading',
+            })
+            return self._action_reopen()
 
-        try:
-            headers = self._header_authentication()
-        except UserError as e:
-            raise e
-
-        # Build API URL with parameters
-        url = self._get_github_api_url()
-        params = {
-            'type': self.repo_type,
-            'sort': self.sort_by,
-            'direction': self.sort_direction,
-            'per_page': 100,  # Maximum per page
-        }
-
-        all_repositories = []
-        page = 1
-
-        try:
-            while True:
-                params['page'] = page
-                _logger.info(f"Fetching repositories from GitHub API: {url}, page {page}")
-
-                response = requests.get(url, headers=headers, params=params, timeout=30)
-
-                if response.status_code == 401:
-                    raise UserError(_('GitHub authentication failed. Please check your token.'))
-                elif response.status_code == 403:
-                    raise UserError(_('GitHub API rate limit exceeded. Please try again later.'))
-                elif response.status_code == 404:
-                    raise UserError(_('Unable to access your repositories. Please check your token permissions.'))
-                elif response.status_code != 200:
-                    raise UserError(_('GitHub API error: %s') % response.text)
-
-                repositories = response.json()
-
-                if not repositories:  # No more repositories
-                    break
-
-                all_repositories.extend(repositories)
-                page += 1
-
-                # Safety check to prevent infinite loops
-                if page > 10:  # Max 1000 repositories
-                    break
-
-        except requests.exceptions.RequestException as e:
-            _logger.error(f"Error fetching GitHub repositories: {e}")
-            raise UserError(_('Failed to connect to GitHub. Please check your internet connection.'))
-
-        if not all_repositories:
+        self.write({
+            'search_term': False,
+            'page': 1,
+            'state': 'select_repo',
+        })
+        self._update_statistics()
+        if not self.total_repositories:
             raise UserError(_('No repositories found for the specified criteria.'))
 
-        # Clear existing repository records
-        self.repository_ids.unlink()
-
-        # Create repository records
-        repo_vals = []
-        public_count = 0
-        private_count = 0
-
-        for repo in all_repositories:
-            try:
-                # Parse created and updated dates
-                created_at = None
-                updated_at = None
-
-                if repo.get('created_at'):
-                    from datetime import datetime
-                    created_at = datetime.strptime(repo['created_at'], '%Y-%m-%dT%H:%M:%SZ')
-
-                if repo.get('updated_at'):
-                    updated_at = datetime.strptime(repo['updated_at'], '%Y-%m-%dT%H:%M:%SZ')
-
-                repo_data = {
-                    'name': repo.get('name', ''),
-                    'repository_id': str(repo.get('id', '')),
-                    'owner': repo.get('owner', {}).get('login', ''),
-                    'description': repo.get('description', ''),
-                    'private': repo.get('private', False),
-                    'full_name': repo.get('full_name', ''),
-                    'html_url': repo.get('html_url', ''),
-                    'clone_url': repo.get('clone_url', ''),
-                    'ssh_url': repo.get('ssh_url', ''),
-                    'default_branch': repo.get('default_branch', 'main'),
-                    'language': repo.get('language', ''),
-                    'open_issues_count': repo.get('open_issues_count', 0),
-                    'stars_count': repo.get('stargazers_count', 0),
-                    'forks_count': repo.get('forks_count', 0),
-                    'archive': repo.get('archived', False),
-                    'disabled': repo.get('disabled', False),
-                    'visibility': repo.get('visibility', 'public'),
-                    'created_at': created_at,
-                    'updated_at': updated_at,
-                }
-
-                repo_vals.append((0, 0, repo_data))
+        # Only the first page becomes list records
+        self._load_repository_page()
+        return self._action_reopen()
 
-                if repo.get('private'):
-                    private_count += 1
-                else:
-                    public_count += 1
-
-            except Exception as e:
-                _logger.error(f"Error processing repository {repo.get('name', 'unknown')}: {e}")
-                continue
+    def action_refresh_catalogue(self):
+        """Refresh the catalogue with the repositories changed since its last refresh"""
+        self.ensure_one()
+        self.job_id = self.env['project.github.job']._enqueue('refresh_catalogue', self.env.user)
+        return self._action_reopen()
 
-        if not repo_vals:
-            raise UserError(_('No valid repositories found to import.'))
+    def action_cancel_job(self):
+        """Cancel the background catalogue refresh"""
+        self.ensure_one()
+        self.job_id.action_cancel()
+        if self.state == 'loading':
+            self.state = 'form'
+        return self._action_reopen()
 
-        # Update wizard with repositories and statistics
+    def _update_statistics(self):
+        """Compute the statistics of the catalogue entries matching the filters"""
+        counts = dict(self.env['project.github.repository.catalogue']._read_group(
+            self._get_catalogue_domain(), ['private'], ['__count'],
+        ))
         self.write({
-            'repository_ids': repo_vals,
-            'total_repositories': len(repo_vals),
-            'public_count': public_count,
-            'private_count': private_count,
-            'state': 'select_repo'
+            'total_repositories': sum(counts.values()),
+            'public_count': counts.get(False, 0),
+            'private_count': counts.get(True, 0),
+            'is_truncated': self.env.user.git_catalogue_truncated,
         })
 
-        _logger.info(f"Successfully fetched {len(repo_vals)} repositories from GitHub")
+    def _get_catalogue_domain(self, term=None):
+        """Return the catalogue domain of the repository type filter and a search term"""
+        domain = [('user_id', '=', self.env.user.id)]
+        login = self.env.user.git_username
+        if self.repo_type == 'owner' and login:
+            domain.append(('owner', '=ilike', login))
+        elif self.repo_type == 'member' and login:
+            domain.append(('owner', 'not ilike', login))
+        elif self.repo_type == 'public':
+            domain.append(('private', '=', False))
+        elif self.repo_type == 'private':
+            domain.append(('private', '=', True))
+        if term:
+            domain += ['|', '|',
+                       ('full_name', 'ilike', term),
+                       ('description', 'ilike', term),
+                       ('language', 'ilike', term)]
+        return domain
+
+    def _get_catalogue_order(self):
+        return f"{CATALOGUE_SORT_FIELDS[self.sort_by or 'updated']} {self.sort_direction or 'desc'}, id"
+
+    def _search_repository_page(self):
+        """Return the list values of the current page of results and the total number of results
+
+        The catalogue is searched first. When its listing was truncated and
+        nothing matches locally, GitHub's search API is queried for the same
+        page instead.
+        """
+        self.ensure_one()
+        catalogue = self.env['project.github.repository.catalogue']
+        term = (self.search_term or '').strip()
+        domain = self._get_catalogue_domain(term)
+        result_count = catalogue.search_count(domain)
+        if term and not result_count and self.is_truncated:
+            return self._search_github_repositories(term)
+
+        entries = catalogue.search(
+            domain,
+            offset=(self.page - 1) * REPOSITORY_PAGE_SIZE,
+            limit=REPOSITORY_PAGE_SIZE,
+            order=self._get_catalogue_order(),
+        )
+        return entries.read(CATALOGUE_LIST_FIELDS), result_count
+
+    def _search_github_repositories(self, term):
+        """Return one page of GitHub search API results for a term"""
+        query = f'{term} in:name'
+        if self.github_username:
+            query += f' user:{self.github_username}'
+        data, _headers = self.env['project.github.api']._get_json('search/repositories', params={
+            'q': query,
+            'page': self.page,
+            'per_page': REPOSITORY_PAGE_SIZE,
+        })
+        catalogue = self.env['project.github.repository.catalogue']
+        repo_vals = [catalogue._prepare_catalogue_vals(repo) for repo in data.get('items', [])]
+        # The search API never returns more than 1000 results
+        return repo_vals, min(data.get('total_count', 0), 1000)
+
+    def _get_repository_page_values(self, repo_vals):
+        """Return the list record values of a page of results"""
+        selected = self.selected_repository_id
+        vals_list = []
+        for sequence, vals in enumerate(repo_vals, start=1):
+            if selected and vals['repository_id'] == selected.repository_id:
+                continue
+            vals = {name: vals[name] for name in CATALOGUE_LIST_FIELDS}
+            vals['sequence'] = sequence
+            vals_list.append(vals)
+        return vals_list
 
+    def _load_repository_page(self):
+        """Materialise only the current page of results as list records"""
+        self.ensure_one()
+        repo_vals, result_count = self._search_repository_page()
+
+        # The selected repository is kept and pinned on top of the page
+        (self.repository_ids - self.selected_repository_id).unlink()
+        self.selected_repository_id.sequence = 0
+
+        vals_list = self._get_repository_page_values(repo_vals)
+        for vals in vals_list:
+            vals['connect_repository_id'] = self.id
+        self.env['project.github.connect.repository.list'].create(vals_list)
+        self.result_count = result_count
+
+    @api.onchange('search_term')
+    def _onchange_search_term(self):
+        if self.state != 'select_repo':
+            return
+        self.page = 1
+        repo_vals, result_count = self._search_repository_page()
+        selected = self.selected_repository_id._origin
+        self.repository_ids = [
+            Command.unlink(line.id) for line in self.repository_ids._origin - selected
+        ] + [
+            Command.create(vals) for vals in self._get_repository_page_values(repo_vals)
+        ]
+        self.result_count = result_count
+
+    def _action_reopen(self):
         return {
             'name': _("Connect GitHub Repository: %s") % self.project_id.name,
             'type': 'ir.actions.act_window',
@@ -297,6 +372,27 @@ class ProjectGithubConnectRepository(models.TransientModel):
             'context': self.env.context,
         }
 
+    def action_search_repositories(self):
+        """Search the fetched repositories and show the first page of results"""
+        self.ensure_one()
+        self.page = 1
+        self._load_repository_page()
+        return self._action_reopen()
+
+    def action_next_page(self):
+        self.ensure_one()
+        if self.page < self.page_count:
+            self.page += 1
+            self._load_repository_page()
+        return self._action_reopen()
+
+    def action_previous_page(self):
+        self.ensure_one()
+        if self.page > 1:
+            self.page -= 1
+            self._load_repository_page()
+        return self._action_reopen()
+
     def action_preview_repository(self):
         """Preview selected repository data"""
         self.ensure_one()
@@ -306,66 +402,12 @@ class ProjectGithubConnectRepository(models.TransientModel):
 
         repo = self.selected_repository_id
 
-        # Generate preview HTML
-        preview_html = '<div style="margin: 10px 0;">'
-
-        # Repository Information
-        # preview_html += '<h4>Repository Information:</h4>'
-        preview_html += '<table style="width: 100%; border-collapse: collapse;">'
-
-        info_items = [
-            ('Name', repo.name),
-            ('Full Name', repo.full_name),
-            ('Owner', repo.owner),
-            ('Description', repo.description or 'No description'),
-            ('Private', 'Yes' if repo.private else 'No'),
-            ('Primary Language', repo.language or 'Not specified'),
-            ('Default Branch', repo.default_branch),
-            ('Open Issues', str(repo.open_issues_count)),
-            ('Stars', str(repo.stars_count)),
-            ('Forks', str(repo.forks_count)),
-            ('Archived', 'Yes' if repo.archive else 'No'),
-            ('Disabled', 'Yes' if repo.disabled else 'No'),
-            ('Visibility', repo.visibility.capitalize() if repo.visibility else 'Not specified'),
-            ('Repository URL', f'<a href="{repo.html_url}" target="_blank">{repo.html_url}</a>'),
-            ('Clone URL (HTTPS)', repo.clone_url),
-            ('Clone URL (SSH)', repo.ssh_url),
-        ]
-
-        for label, value in info_items:
-            preview_html += f'''
-            <tr>
-                <td style="padding: 8px; border: 1px solid #ddd; font-weight: bold; background-color: #f5f5f5; width: 200px;">
-                    {label}
-                </td>
-                <td style="padding: 8px; border: 1px solid #ddd;">
-                    {value}
-                </td>
-            </tr>
-            '''
-
-        preview_html += '</table>'
-
-        # Connection Details
-        preview_html += '<h4 style="margin-top: 20px;">Connection Details:</h4>'
-        preview_html += '<ul>'
-        preview_html += f'<li><b>Project:</b> {self.project_id.name}</li>'
-        preview_html += f'<li><b>Connected On:</b> {self.date_connected.strftime("%Y-%m-%d %H:%M:%S")}</li>'
-        if repo.created_at:
-            preview_html += f'<li><b>Repository Created:</b> {repo.created_at.strftime("%Y-%m-%d %H:%M:%S")}</li>'
-        if repo.updated_at:
-            preview_html += f'<li><b>Last Updated:</b> {repo.updated_at.strftime("%Y-%m-%d %H:%M:%S")}</li>'
-        preview_html += '</ul>'
-
-        # Warning for private repositories
-        if repo.private:
-            preview_html += '''
-            <div style="background-color: #fff3cd; border: 1px solid #ffeaa7; color: #856404; padding: 10px; margin: 10px 0; border-radius: 4px;">
-                <b>⚠️ Private Repository:</b> Make sure you have proper access permissions for this private repository.
-            </div>
-            '''
-
-        preview_html += '</div>'
+        preview_html = self.env['ir.qweb']._render('lm_project_github.repository_preview', {
+            'repo': repo,
+            'default_branch': repo.default_branch,
+            'project': self.project_id,
+            'date_connected': self.date_connected,
+        })
 
         self.preview_data = preview_html
         self.state = 'preview'
@@ -386,7 +428,7 @@ class ProjectGithubConnectRepository(models.TransientModel):
 
         if self.state == 'preview':
             self.state = 'select_repo'
-        elif self.state == 'select_repo':
+        elif self.state in ('select_repo', 'loading'):
             self.state = 'form'
 
         return {
@@ -399,6 +441,7 @@ class ProjectGithubConnectRepository(models.TransientModel):
             'context': self.env.context,
         }
 
+    @instrumented('connect_repository')
     def action_connect_repository(self):
         """Final action to connect the selected repository to the project"""
         self.ensure_one()
@@ -409,16 +452,13 @@ class ProjectGithubConnectRepository(models.TransientModel):
         repo = self.selected_repository_id
 
         # Check if repository is already connected to other projects
-        existing_repos = self.env['project.github.repository'].search([
-            ('repository_id', '=', repo.repository_id),
-            ('full_name', '=', repo.full_name),
-            ('name', '=', repo.name),
-        ])
+        existing_repos = self.env['project.github.repository']._lookup_by_github_id(
+            repo.repository_id, self.company_id)
 
         if existing_repos:
             raise UserError(_(
                 'Repository "%s" is already connected to project "%s".'
-            ) % (repo.full_name, self.project_id.name))
+            ) % (repo.full_name, existing_repos.project_id.name))
 
         # Create the connection (adjust this based on your actual model structure)
         connection_vals = {
@@ -445,10 +485,16 @@ class ProjectGithubConnectRepository(models.TransientModel):
             'is_connected': True,
         }
 
+        # Create the repository connection, another user may have connected it meanwhile
+        repo_id = self.env['project.github.repository']._create_connection(connection_vals)
+        if not repo_id:
+            existing_repos = self.env['project.github.repository']._lookup_by_github_id(
+                repo.repository_id, self.company_id)
+            raise UserError(_(
+                'Repository "%s" is already connected to project "%s".'
+            ) % (repo.full_name, existing_repos.project_id.name))
+
         try:
-            # Create the repository connection
-            # Note: Adjust the model name based on your actual implementation
-            repo_id = self.env['project.github.repository'].create(connection_vals)
             # create or update the default branch record
             branch_id = self._create_write_branches(
                 project_id=self.project_id.id,
@@ -469,6 +515,13 @@ class ProjectGithubConnectRepository(models.TransientModel):
             # Update the repository with the default branch
             repo_id.write({'default_branch_id': branch_id.id})
 
+            # With GraphQL, metadata and every branch head come in one or two queries
+            if self.env['project.github.api']._use_graphql():
+                repo_id._sync_branches()
+
+            # Branches and metadata are then kept current by the webhook deliveries
+            repo_id.action_register_webhook()
+
             message = _(
                 'Repository "%s" has been successfully connected to project "%s".'
             ) % (repo.full_name, self.project_id.name)
@@ -499,20 +552,10 @@ class ProjectGithubConnectRepository(models.TransientModel):
 
     def _create_write_branches(self, project_id, default_branch, repo_id):
         """Create or update the default branch record for the connected repository"""
-        branch_model = self.env['project.github.branch']
-        branch = branch_model.search([
+        repository = self.env['project.github.repository'].browse(repo_id)
+        # A webhook delivery or a branch sync may create the branch at the same time
+        repository._upsert_branches({default_branch: None}, is_default=True)
+        return self.env['project.github.branch'].search([
             ('name', '=', default_branch),
             ('repository_id', '=', repo_id),
-            ('project_id', '=', project_id)
-        ], limit=1)
-
-        if not branch:
-            branch = branch_model.create({
-                'name': default_branch,
-                'repository_id': repo_id,
-                'project_id': project_id,
-                'is_default': True,
-            })
-        else:
-            branch.write({'is_default': True})
-        return branch
\ No newline at end of file
+        ], limit=1)
\ No newline at end of file
@@ -0,0 +1,198 @@
+import posixpath
+import re
+
+from markupsafe import Markup
+
+from odoo import fields, models, api, Command, _
+from odoo.exceptions import UserError
+
+from ..models.project_github_object import MAX_BLOB_SIZE
+
+README_PATTERN = re.compile(r'^readme(\.(md|markdown|rst|txt))?$', re.IGNORECASE)
+MARKDOWN_EXTENSIONS = ('.md', '.markdown')
+
+
+class ProjectGithubFileBrowserEntry(models.TransientModel):
+    _name = "project.github.file.browser.entry"
+    _description = "GitHub File Browser Entry"
+    _order = "sequence, id"
+
+    browser_id = fields.Many2one(
+        comodel_name="project.github.file.browser",
+        string="Browser",
+        required=True,
+        ondelete="cascade",
+    )
+    sequence = fields.Integer(string="Sequence", default=0)
+    name = fields.Char(string="Name", required=True)
+    path = fields.Char(string="Path", required=True)
+    type = fields.Selection([
+        ('tree', 'Folder'),
+        ('blob', 'File'),
+        ('commit', 'Submodule'),
+    ], string="Type", required=True)
+    sha = fields.Char(string="SHA")
+    size = fields.Integer(string="Size (bytes)")
+
+    def action_open(self):
+        """Open the folder or the file of the entry in the browser"""
+        self.ensure_one()
+        browser = self.browser_id
+        if self.type == 'tree':
+            browser._load(path=self.path)
+        elif self.type == 'blob':
+            browser._open_file(self)
+        else:
+            raise UserError(_('Submodules cannot be browsed.'))
+        return browser._get_action()
+
+
+class ProjectGithubFileBrowser(models.TransientModel):
+    _name = "project.github.file.browser"
+    _description = "GitHub File Browser"
+
+    repository_id = fields.Many2one(
+        comodel_name="project.github.repository",
+        string="Repository",
+        required=True,
+        readonly=True,
+        ondelete="cascade",
+    )
+    branch_id = fields.Many2one(
+        comodel_name="project.github.branch",
+        string="Branch",
+        domain="[('repository_id', '=', repository_id)]",
+    )
+    commit_sha = fields.Char(string="Commit", readonly=True)
+    state = fields.Selection([
+        ('tree', 'Folder'),
+        ('file', 'File'),
+    ], string="State", default='tree')
+    path = fields.Char(string="Path", readonly=True, default='')
+    truncated = fields.Boolean(
+        string="Truncated",
+        readonly=True,
+        help="The repository has too many files to be listed by GitHub in one call",
+    )
+    entry_ids = fields.One2many(
+        comodel_name="project.github.file.browser.entry",
+        inverse_name="browser_id",
+        string="Files",
+    )
+    readme_html = fields.Html(string="README", readonly=True)
+    file_path = fields.Char(string="File", readonly=True)
+    file_content = fields.Text(string="Content", readonly=True)
+    file_html = fields.Html(string="Rendered Content", readonly=True)
+    file_url = fields.Char(string="File on GitHub", readonly=True)
+
+    @api.onchange('branch_id')
+    def _onchange_branch_id(self):
+        if self.branch_id:
+            self._load(path='', refresh=True)
+
+    def _get_action(self):
+        return {
+            'name': _("Files of %s", self.repository_id.full_name),
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'view_mode': 'form',
+            'res_id': self.id,
+            'target': 'new',
+            'context': self.env.context,
+        }
+
+    def _get_commit_sha(self):
+        """Return the current head commit of the selected branch
+
+        The stored head of the branch is stale without webhooks: the branch
+        is read again, a conditional request answered with a 304 while it did
+        not move.
+        """
+        branch = self.branch_id
+        payload, _headers = self.env['project.github.api']._get_json(
+            f'repos/{self.repository_id.full_name}/branches/{branch.name}',
+            not_found_message=_('Branch %s was not found on GitHub.', branch.name),
+        )
+        return payload['commit']['sha']
+
+    def _load(self, path='', refresh=False):
+        """List the folder ``path`` at the head of the branch, with its README
+
+        The head is resolved when the browser opens and with ``refresh``, the
+        folders are otherwise browsed at the same commit.
+        """
+        if not self.branch_id:
+            raise UserError(_('Please select a branch.'))
+        Object = self.env['project.github.object']
+        commit_sha = self.commit_sha if self.commit_sha and not refresh else self._get_commit_sha()
+        entries, truncated = Object._get_tree(self.repository_id, commit_sha)
+
+        children = sorted(
+            (entry for entry in entries if posixpath.dirname(entry['path']) == path),
+            key=lambda entry: (entry['type'] != 'tree', entry['path'].lower()),
+        )
+        readme_html = False
+        readme = next((entry for entry in children
+                       if entry['type'] == 'blob' and README_PATTERN.match(posixpath.basename(entry['path']))), None)
+        if readme and readme['size'] <= MAX_BLOB_SIZE:
+            readme_html = self._render_file(readme)
+
+        self.update({
+            'commit_sha': commit_sha,
+            'state': 'tree',
+            'path': path,
+            'truncated': truncated,
+            'readme_html': readme_html,
+            'file_path': False,
+            'file_content': False,
+            'file_html': False,
+            'file_url': False,
+            'entry_ids': [Command.clear()] + [
+                Command.create({
+                    'sequence': sequence,
+                    'name': posixpath.basename(entry['path']),
+                    'path': entry['path'],
+                    'type': entry['type'],
+                    'sha': entry['sha'],
+                    'size': entry['size'],
+                })
+                for sequence, entry in enumerate(children)
+            ],
+        })
+
+    def _render_file(self, entry):
+        """Return the HTML of a Markdown file, or its text in a preformatted block"""
+        Object = self.env['project.github.object']
+        if entry['path'].lower().endswith(MARKDOWN_EXTENSIONS):
+            return Markup(Object._render_markdown(self.repository_id, entry['sha'], size=entry['size']))
+        text = Object._get_blob(self.repository_id, entry['sha'], size=entry['size']).decode(errors='replace')
+        return Markup('<pre>%s</pre>') % text
+
+    def _open_file(self, entry):
+        Object = self.env['project.github.object']
+        data = Object._get_blob(self.repository_id, entry.sha, size=entry.size)
+        is_binary = b'\0' in data[:8000]
+        is_markdown = entry.path.lower().endswith(MARKDOWN_EXTENSIONS)
+        self.update({
+            'state': 'file',
+            'file_path': entry.path,
+            'file_content': _('Binary file, %s bytes.', len(data)) if is_binary else data.decode(errors='replace'),
+            'file_html': Markup(Object._render_markdown(self.repository_id, entry.sha, size=entry.size))
+            if is_markdown else False,
+            'file_url': self.repository_id.html_url and
+            f'{self.repository_id.html_url}/blob/{self.commit_sha}/{entry.path}',
+        })
+
+    def action_go_up(self):
+        """Open the parent folder, or the folder of the displayed file"""
+        self.ensure_one()
+        if self.state == 'file':
+            self._load(path=self.path)
+        else:
+            self._load(path=posixpath.dirname(self.path or ''))
+        return self._get_action()
+
+    def action_refresh(self):
+        self.ensure_one()
+        self._load(path=self.path or '', refresh=True)
+        return self._get_action()
@@ -25,6 +25,8 @@ class ResUsersGitCredential(models.TransientModel):
     def action_confirm(self):
         for record in self:
             record.user_id.git_username = record.git_username
+            if record.user_id.git_token != record.git_token:
+                record.user_id._reset_git_catalogue()
             record.user_id.git_token = record.git_token
             record.user_id.is_connected = False
         return {'type': 'ir.actions.act_window_close'}
\ No newline at end of file